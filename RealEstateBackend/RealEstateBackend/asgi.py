@@ -3,6 +3,10 @@ ASGI config for RealEstateBackend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this module (e.g. ``uvicorn RealEstateBackend.asgi:application``)
+to use the /api/stream/ server-sent events feed: under ASGI each open stream is a
+coroutine rather than a blocked worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
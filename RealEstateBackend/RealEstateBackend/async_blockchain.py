@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+
+import aiohttp
+from web3 import AsyncWeb3
+
+from .blockchain import PROPERTY_TYPE_MAP, tracker
+from . import metrics
+from .contracts import registry
+from .rpc import BLOCKCHAIN_BACKEND, RPC_TIMEOUT, RPC_URLS
+from .tracing import TransactionLifecycle, function_name
+
+# Async counterpart of blockchain.py for the ASGI views. Every coroutine here
+# awaits the node instead of blocking a worker thread, so a single event loop
+# can keep thousands of chain requests in flight.
+
+RPC_MAX_CONNECTIONS = int(os.environ.get('RPC_MAX_CONNECTIONS', 100))
+
+_clients = {}
+
+
+class TimedAsyncHTTPProvider(AsyncWeb3.AsyncHTTPProvider):
+    """Reports every call to the request metrics, like the sync FailoverHTTPProvider."""
+
+    async def _make_request(self, method, request_data):
+        raw_response = await super()._make_request(method, request_data)
+        metrics.record_rpc_payload(method, request_data, raw_response)
+        return raw_response
+
+    async def make_request(self, method, params):
+        started = time.perf_counter()
+        try:
+            response = await super().make_request(method, params)
+        except Exception:
+            metrics.rpc_errors.inc(1, method, 'transport')
+            raise
+        finally:
+            metrics.record_rpc(method, time.perf_counter() - started)
+        metrics.record_rpc_errors(method, response)
+        return response
+
+    async def make_batch_request(self, batch_requests):
+        started = time.perf_counter()
+        try:
+            response = await super().make_batch_request(batch_requests)
+        except Exception:
+            metrics.rpc_errors.inc(1, 'batch', 'transport')
+            raise
+        finally:
+            metrics.record_rpc('batch', time.perf_counter() - started, calls=len(batch_requests))
+        metrics.record_rpc_errors('batch', response)
+        return response
+
+
+async def get_async_web3():
+    """
+    Return the AsyncWeb3 client and contract bound to the running event loop.
+
+    One aiohttp session (and so one connection pool) is shared by every request
+    served on the loop; aiohttp sessions cannot be used across loops, so a new
+    client is built if the views run under a different loop (e.g. runserver).
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        if BLOCKCHAIN_BACKEND == 'eth_tester':
+            from .local_chain import get_local_chain
+
+            chain = get_local_chain()
+            chain.use_for_roles()
+            w3 = chain.async_web3()
+        else:
+            provider = TimedAsyncHTTPProvider(RPC_URLS[0])
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=RPC_MAX_CONNECTIONS),
+                timeout=aiohttp.ClientTimeout(total=RPC_TIMEOUT),
+            )
+            await provider.cache_async_session(session)
+            w3 = AsyncWeb3(provider)
+        client = (w3, registry.contract(w3))
+        for stale_loop in [other for other in _clients if other.is_closed()]:
+            del _clients[stale_loop]
+        _clients[loop] = client
+    return client
+
+
+async def _transact(w3, contract_function, private_key, value=0):
+    account = w3.eth.account.from_key(private_key)
+    async with TransactionLifecycle(function_name(contract_function), account.address) as lifecycle:
+        nonce, gas_price = await asyncio.gather(
+            w3.eth.get_transaction_count(account.address),
+            w3.eth.gas_price,
+        )
+        tx = await contract_function.build_transaction({
+            'from': account.address,
+            'value': value,
+            'nonce': nonce,
+            'gasPrice': gas_price
+        })
+        lifecycle.built(tx)
+        signed_tx = w3.eth.account.sign_transaction(tx, private_key=private_key)
+        tx_hash = await w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        lifecycle.sent(tx_hash)
+        # Awaits the tracker shared with the sync code, which polls every pending receipt in one batch
+        tx_receipt = await tracker.wait_async(tx_hash, tx, private_key)
+        lifecycle.mined(tx_receipt)
+    return tx_receipt.transactionHash.hex()
+
+
+async def list_property_on_blockchain(seller_private_key, price_wei, location, property_type, area, bedrooms, bathrooms, agent_address, agent_commission):
+    w3, contract = await get_async_web3()
+    return await _transact(w3, contract.functions.listProperty(
+        price_wei,
+        location,
+        PROPERTY_TYPE_MAP.get(property_type, 0),
+        area,
+        bedrooms,
+        bathrooms,
+        agent_address,
+        agent_commission
+    ), seller_private_key)
+
+
+async def submit_offer_on_blockchain(buyer_private_key, property_id, amount_wei, expires_in_seconds):
+    w3, contract = await get_async_web3()
+    return await _transact(
+        w3,
+        contract.functions.submitOffer(property_id, expires_in_seconds),
+        buyer_private_key,
+        value=amount_wei,
+    )
+
+
+async def accept_offer_on_blockchain(seller_private_key, property_id, buyer_address):
+    w3, contract = await get_async_web3()
+    return await _transact(w3, contract.functions.acceptOffer(property_id, buyer_address), seller_private_key)
+
+
+async def update_inspection_status_on_blockchain(appraiser_private_key, property_id, is_passed):
+    w3, contract = await get_async_web3()
+    return await _transact(w3, contract.functions.updateInspectionStatus(property_id, is_passed), appraiser_private_key)
+
+
+async def complete_transaction_on_blockchain(signer_private_key, property_id):
+    w3, contract = await get_async_web3()
+    return await _transact(w3, contract.functions.completeTransaction(property_id), signer_private_key)
+
+
+async def get_property_chain_status(property_id):
+    w3, contract = await get_async_web3()
+    # The reads are independent, so they share the wall-clock time of one round trip
+    is_listed, is_sold, auction_active, auction_end_time = await asyncio.gather(
+        contract.functions.isPropertyListed(property_id).call(),
+        contract.functions.isPropertySold(property_id).call(),
+        contract.functions.isAuctionActive(property_id).call(),
+        contract.functions.getAuctionEndTime(property_id).call(),
+    )
+    return {
+        'is_listed': is_listed,
+        'is_sold': is_sold,
+        'auction_active': auction_active,
+        'auction_end_time': auction_end_time,
+    }
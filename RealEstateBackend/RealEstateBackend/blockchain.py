@@ -1,48 +1,68 @@
 
-from web3 import Web3
-import json
-import os
-
-# Configure Web3 to connect to Ganache
-GANACHE_URL = os.environ.get('GANACHE_URL')
-w3 = Web3(Web3.HTTPProvider(GANACHE_URL))
-
-# Load contract ABI and address
-# Make sure RealEstate.json is in the same directory or provide the full path
-with open(os.path.join(os.path.dirname(__file__), '../../artifacts/contracts/RealEstate.sol/RealEstate.json'), 'r') as f:
-    real_estate_artifact = json.load(f)
-
-REAL_ESTATE_ABI = real_estate_artifact['abi']
-
-with open(os.path.join(os.path.dirname(__file__), '../../deployments/ganache-deployment.json'), 'r') as f:
-    ganache_deployment = json.load(f)
-
-REAL_ESTATE_ADDRESS = ganache_deployment['address']
-
-real_estate_contract = w3.eth.contract(address=REAL_ESTATE_ADDRESS, abi=REAL_ESTATE_ABI)
-
-def list_property_on_blockchain(seller_private_key, price, location, property_type, area, bedrooms, bathrooms, agent_address, agent_commission):
-    # Convert price to Wei (assuming price is in ETH)
-    price_wei = w3.to_wei(price, 'ether')
-
-    # Get the seller's address from the private key
-    seller_account = w3.eth.account.from_key(seller_private_key)
-    seller_address = seller_account.address
+import logging
+
+from hexbytes import HexBytes
+from web3.exceptions import Web3RPCError
+
+from .contracts import ContractNotAvailable, get_contract
+from .rpc import get_web3, single_node
+from .tracing import TransactionLifecycle, function_name, save_traces
+from .tx_tracker import PendingTransactionTracker, fetch_receipts
+
+logger = logging.getLogger(__name__)
+
+# Shared client: pooled keep-alive connections, timeouts, retries and failover across RPC_URLS
+w3 = get_web3()
+
+# Receipts of every transaction sent here are polled together, one batch per block
+# (see tx_tracker.py); w3 is looked up on each round so tests can patch it
+tracker = PendingTransactionTracker(lambda: w3)
+
+# The contract ABI and address are loaded on first use (see contracts.py);
+# BLOCKCHAIN_NETWORK selects the deployment file
+
+def warm_up():
+    # Build the contract now instead of on the first request (used when FAST_BOOT=0)
+    try:
+        get_contract(w3)
+    except ContractNotAvailable as e:
+        logger.warning("Contract not loaded at startup: %s", e)
+
+# propertyType is an enum, so we need to pass its integer representation
+# PropertyType enum order: RESIDENTIAL=0, COMMERCIAL=1, LAND=2, APARTMENT=3, OFFICE=4
+PROPERTY_TYPE_MAP = {
+    'RESIDENTIAL': 0,
+    'COMMERCIAL': 1,
+    'LAND': 2,
+    'APARTMENT': 3,
+    'OFFICE': 4
+}
+
+# Amounts are passed in wei (ints), exactly as stored by properties.money.WeiField
+
+def _transact(contract_function, private_key, value=0):
+    """Build, sign and send one contract call, wait for it to be mined and return its hash."""
+    account = w3.eth.account.from_key(private_key)
+    with TransactionLifecycle(function_name(contract_function), account.address) as lifecycle:
+        tx = contract_function.build_transaction({
+            'from': account.address,
+            'value': value,
+            'nonce': w3.eth.get_transaction_count(account.address),
+            'gasPrice': w3.eth.gas_price
+        })
+        lifecycle.built(tx)
+        signed_tx = w3.eth.account.sign_transaction(tx, private_key=private_key)
+        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        lifecycle.sent(tx_hash)
+        tx_receipt = tracker.wait(tx_hash, tx, private_key)
+        lifecycle.mined(tx_receipt)
+    return tx_receipt.transactionHash.hex()
 
-    # Build the transaction
+def list_property_on_blockchain(seller_private_key, price_wei, location, property_type, area, bedrooms, bathrooms, agent_address, agent_commission):
     # Note: The contract's listProperty function expects a string for details, not bytes32
-    # Also, propertyType is an enum, so we need to pass its integer representation
-    # Assuming PropertyType enum order: RESIDENTIAL=0, COMMERCIAL=1, LAND=2, APARTMENT=3, OFFICE=4
-    property_type_map = {
-        'RESIDENTIAL': 0,
-        'COMMERCIAL': 1,
-        'LAND': 2,
-        'APARTMENT': 3,
-        'OFFICE': 4
-    }
-    property_type_int = property_type_map.get(property_type, 0) # Default to RESIDENTIAL
+    property_type_int = PROPERTY_TYPE_MAP.get(property_type, 0) # Default to RESIDENTIAL
 
-    tx = real_estate_contract.functions.listProperty(
+    return _transact(get_contract(w3).functions.listProperty(
         price_wei,
         location, # Using location as details for now
         property_type_int,
@@ -51,126 +71,257 @@ def list_property_on_blockchain(seller_private_key, price, location, property_ty
         bathrooms,
         agent_address,
         agent_commission
-    ).build_transaction({
-        'from': seller_address,
-        'nonce': w3.eth.get_transaction_count(seller_address),
-        'gasPrice': w3.eth.gas_price
-    })
-
-    # Sign the transaction
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=seller_private_key)
-
-    # Send the transaction
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-    # Wait for the transaction to be mined
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-
-    return tx_receipt.transactionHash.hex()
-
-def submit_offer_on_blockchain(buyer_private_key, property_id, amount, expires_in_seconds):
-    # Convert amount to Wei
-    amount_wei = w3.to_wei(amount, 'ether')
-
-    # Get the buyer's address from the private key
-    buyer_account = w3.eth.account.from_key(buyer_private_key)
-    buyer_address = buyer_account.address
-
-    # Build the transaction
-    tx = real_estate_contract.functions.submitOffer(
-        property_id,
-        expires_in_seconds
-    ).build_transaction({
-        'from': buyer_address,
-        'value': amount_wei, # Attach the offer amount as value
-        'nonce': w3.eth.get_transaction_count(buyer_address),
-        'gasPrice': w3.eth.gas_price
-    })
-
-    # Sign the transaction
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=buyer_private_key)
-
-    # Send the transaction
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-    # Wait for the transaction to be mined
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-
-    return tx_receipt.transactionHash.hex()
+    ), seller_private_key)
+
+def _accepted(address, nonce):
+    """Whether the node holds a transaction of address with this nonce, after a send that failed midway."""
+    try:
+        return w3.eth.get_transaction_count(address, 'pending') > nonce
+    except Exception:
+        return False
+
+def send_transactions_pipelined(private_key, contract_calls):
+    """
+    Sign and send several contract calls from one account back to back, with
+    consecutive nonces, without waiting for each to be mined. Their receipts
+    are then polled together, so N transactions cost about one block time instead of N.
+
+    Returns one dict per call, in order: {'status': 'confirmed' | 'reverted' | 'failed',
+    'transaction_hash': ..., 'error': ...}. When a send fails in a way that
+    may have reached the node and the pending nonce shows it did not take the
+    transaction, the remaining calls are not sent.
+    """
+    account = w3.eth.account.from_key(private_key)
+    # 'pending' counts this account's transactions that are not mined yet
+    nonce = w3.eth.get_transaction_count(account.address, 'pending')
+    gas_price = w3.eth.gas_price
+
+    results, lifecycles, txs = [], [], []
+    for index, contract_call in enumerate(contract_calls):
+        lifecycle = TransactionLifecycle(function_name(contract_call), account.address)
+        lifecycles.append(lifecycle)
+        txs.append(None)
+        try:
+            tx = contract_call.build_transaction({
+                'from': account.address,
+                'nonce': nonce,
+                'gasPrice': gas_price
+            })
+            lifecycle.built(tx)
+            signed_tx = w3.eth.account.sign_transaction(tx, private_key=private_key)
+        except Exception as e:
+            # Nothing was broadcast, so the nonce is reused by the next call
+            lifecycle.failed(e)
+            results.append({'status': 'failed', 'transaction_hash': None, 'error': str(e)})
+            continue
+        try:
+            tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Web3RPCError as e:
+            # The node answered with an error, so it rejected the transaction and the nonce is reused
+            lifecycle.failed(e)
+            results.append({'status': 'failed', 'transaction_hash': None, 'error': str(e)})
+            continue
+        except Exception as e:
+            # A timeout or dropped connection may come after the node accepted the
+            # transaction; signing another one with its nonce could replace it
+            if not _accepted(account.address, nonce):
+                lifecycle.failed(e)
+                results.append({'status': 'failed', 'transaction_hash': None, 'error': str(e)})
+                not_sent = f'Not sent: the broadcast of the transaction with nonce {nonce} failed ({e})'
+                results.extend({'status': 'failed', 'transaction_hash': None, 'error': not_sent} for _ in contract_calls[index + 1:])
+                break
+            tx_hash = signed_tx.hash
+        lifecycle.sent(tx_hash)
+        nonce += 1
+        txs[-1] = tx
+        results.append({'status': 'sent', 'transaction_hash': tx_hash.hex(), 'error': None})
+
+    def wait(result, lifecycle, tx):
+        try:
+            receipt = tracker.wait(result['transaction_hash'], tx, private_key)
+            lifecycle.mined(receipt)
+            result['status'] = lifecycle.status
+            result['transaction_hash'] = lifecycle.transaction_hash
+        except Exception as e:
+            lifecycle.failed(e)
+            result['status'] = 'failed'
+            result['error'] = str(e)
+
+    pending = [(result, lifecycle, tx) for result, lifecycle, tx in zip(results, lifecycles, txs) if result['status'] == 'sent']
+    # All tracked before waiting on any, so they share receipt batches
+    for result, _, tx in pending:
+        tracker.track(result['transaction_hash'], tx, private_key)
+    for args in pending:
+        wait(*args)
+    save_traces(lifecycles)
+    return results
+
+def list_properties_on_blockchain(seller_private_key, listings, agent_address):
+    """Pipelined listProperty for many listings (dicts of the serializer's validated fields)."""
+    contract = get_contract(w3)
+    calls = [
+        contract.functions.listProperty(
+            listing['price'],
+            listing['location'],
+            PROPERTY_TYPE_MAP.get(listing['property_type'], 0),
+            listing.get('area') or 0,
+            listing.get('bedrooms') or 0,
+            listing.get('bathrooms') or 0,
+            agent_address,
+            int(listing.get('agent_commission') or 0)
+        )
+        for listing in listings
+    ]
+    return send_transactions_pipelined(seller_private_key, calls)
+
+def expire_offers_on_blockchain(signer_private_key, property_ids):
+    """Pipelined expireOffers, one transaction per property; results in the same order."""
+    contract = get_contract(w3)
+    calls = [contract.functions.expireOffers(property_id) for property_id in property_ids]
+    return send_transactions_pipelined(signer_private_key, calls)
+
+def submit_offer_on_blockchain(buyer_private_key, property_id, amount_wei, expires_in_seconds):
+    return _transact(
+        get_contract(w3).functions.submitOffer(property_id, expires_in_seconds),
+        buyer_private_key,
+        value=amount_wei, # Attach the offer amount as value
+    )
 
 def accept_offer_on_blockchain(seller_private_key, property_id, buyer_address):
-    # Get the seller's address from the private key
-    seller_account = w3.eth.account.from_key(seller_private_key)
-    seller_address = seller_account.address
-
-    # Build the transaction
-    tx = real_estate_contract.functions.acceptOffer(
-        property_id,
-        buyer_address
-    ).build_transaction({
-        'from': seller_address,
-        'nonce': w3.eth.get_transaction_count(seller_address),
-        'gasPrice': w3.eth.gas_price
-    })
-
-    # Sign the transaction
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=seller_private_key)
-
-    # Send the transaction
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-    # Wait for the transaction to be mined
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-
-    return tx_receipt.transactionHash.hex()
+    return _transact(get_contract(w3).functions.acceptOffer(property_id, buyer_address), seller_private_key)
 
 def update_inspection_status_on_blockchain(appraiser_private_key, property_id, is_passed):
-    # Get the appraiser's address from the private key
-    appraiser_account = w3.eth.account.from_key(appraiser_private_key)
-    appraiser_address = appraiser_account.address
-
-    # Build the transaction
-    tx = real_estate_contract.functions.updateInspectionStatus(
-        property_id,
-        is_passed
-    ).build_transaction({
-        'from': appraiser_address,
-        'nonce': w3.eth.get_transaction_count(appraiser_address),
-        'gasPrice': w3.eth.gas_price
-    })
-
-    # Sign the transaction
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=appraiser_private_key)
-
-    # Send the transaction
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-    # Wait for the transaction to be mined
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-
-    return tx_receipt.transactionHash.hex()
+    return _transact(get_contract(w3).functions.updateInspectionStatus(property_id, is_passed), appraiser_private_key)
 
 def complete_transaction_on_blockchain(signer_private_key, property_id):
-    # Get the signer's address from the private key
-    signer_account = w3.eth.account.from_key(signer_private_key)
-    signer_address = signer_account.address
-
-    # Build the transaction
-    tx = real_estate_contract.functions.completeTransaction(
-        property_id
-    ).build_transaction({
-        'from': signer_address,
-        'nonce': w3.eth.get_transaction_count(signer_address),
-        'gasPrice': w3.eth.gas_price
-    })
-
-    # Sign the transaction
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=signer_private_key)
-
-    # Send the transaction
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-    # Wait for the transaction to be mined
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return _transact(get_contract(w3).functions.completeTransaction(property_id), signer_private_key)
+
+def start_auction_on_blockchain(seller_private_key, property_id, minimum_bid_wei, duration_seconds):
+    return _transact(
+        get_contract(w3).functions.startAuction(property_id, minimum_bid_wei, duration_seconds),
+        seller_private_key,
+    )
+
+def bid_on_auction_on_blockchain(buyer_private_key, property_id, amount_wei):
+    return _transact(
+        get_contract(w3).functions.bidOnAuction(property_id),
+        buyer_private_key,
+        value=amount_wei, # The bid is escrowed by the contract
+    )
+
+def end_auctions_on_blockchain(signer_private_key, property_ids):
+    """Pipelined endAuction, one transaction per property; results in the same order."""
+    contract = get_contract(w3)
+    calls = [contract.functions.endAuction(property_id) for property_id in property_ids]
+    return send_transactions_pipelined(signer_private_key, calls)
+
+def get_auction_events(from_block=0):
+    """AuctionStarted, OfferSubmitted and AuctionEnded logs since from_block, in chain order."""
+    events = get_contract(w3).events
+    logs = []
+    for event_type in (events.AuctionStarted, events.OfferSubmitted, events.AuctionEnded):
+        logs.extend(event_type.get_logs(from_block=from_block))
+    logs.sort(key=lambda log: (log.blockNumber, log.logIndex))
+    return [{'event': log.event, **log.args} for log in logs]
+
+def get_property_chain_status(property_id):
+    functions = get_contract(w3).functions
+    return {
+        'is_listed': functions.isPropertyListed(property_id).call(),
+        'is_sold': functions.isPropertySold(property_id).call(),
+        'auction_active': functions.isAuctionActive(property_id).call(),
+        'auction_end_time': functions.getAuctionEndTime(property_id).call(),
+    }
 
-    return tx_receipt.transactionHash.hex()
+# Building blocks of the transaction outbox (properties.outbox), which saves each
+# signed transaction before broadcasting it and polls for receipts instead of waiting
+
+def account_address(private_key):
+    return w3.eth.account.from_key(private_key).address
+
+def next_nonce(address):
+    """Nonce after every transaction of address the node has seen, mined or pending."""
+    return w3.eth.get_transaction_count(address, 'pending')
+
+def current_gas_price():
+    return w3.eth.gas_price
+
+def sign_contract_call(private_key, function, args, nonce, gas_price, value=0):
+    """
+    Build and sign a call of the contract function named function with the
+    given nonce, without sending it. Returns (raw transaction, hash) as hex.
+    """
+    account = w3.eth.account.from_key(private_key)
+    tx = getattr(get_contract(w3).functions, function)(*args).build_transaction({
+        'from': account.address,
+        'value': value,
+        'nonce': nonce,
+        'gasPrice': gas_price
+    })
+    signed_tx = w3.eth.account.sign_transaction(tx, private_key=private_key)
+    return signed_tx.raw_transaction.hex(), signed_tx.hash.hex()
+
+def sign_nonce_filler(private_key, nonce, gas_price):
+    """An empty transfer to self with the given nonce, to fill the gap a dropped transaction left."""
+    account = w3.eth.account.from_key(private_key)
+    signed_tx = w3.eth.account.sign_transaction({
+        'to': account.address,
+        'value': 0,
+        'gas': 21000,
+        'nonce': nonce,
+        'gasPrice': gas_price,
+        'chainId': w3.eth.chain_id
+    }, private_key=private_key)
+    return signed_tx.raw_transaction.hex(), signed_tx.hash.hex()
+
+def broadcast_transaction(raw_transaction):
+    return w3.eth.send_raw_transaction(HexBytes(raw_transaction)).hex()
+
+def get_receipt(tx_hash):
+    """The receipt of tx_hash, or None while it is not mined."""
+    from web3.exceptions import TransactionNotFound
+    try:
+        return w3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return None
+
+def mined_nonces_and_receipts(addresses, tx_hashes):
+    """
+    ({address: nonce after its mined transactions}, {hash: receipt or None}),
+    all read from one node, the receipts in one JSON-RPC batch. From nodes at
+    different heights a mined transaction could look like its nonce was taken.
+    The nonces are read first: a nonce already used then, by a transaction
+    that has no receipt after, was used by some other transaction.
+    """
+    with single_node(w3):
+        nonces = {address: w3.eth.get_transaction_count(address) for address in addresses}
+        return nonces, fetch_receipts(w3, tx_hashes)
+
+def get_transaction(tx_hash):
+    """The transaction tx_hash as the node knows it (pending or mined), or None."""
+    from web3.exceptions import TransactionNotFound
+    try:
+        return w3.eth.get_transaction(tx_hash)
+    except TransactionNotFound:
+        return None
+
+def transaction_status(tx_hash):
+    """
+    Where tx_hash is: what the tracker knows if this process sent it, else
+    what the node knows. Adds the confirmations of mined transactions;
+    returns None for a hash neither knows.
+    """
+    status = tracker.status(tx_hash)
+    if status is None:
+        receipt = get_receipt(tx_hash)
+        if receipt is not None:
+            status = {'status': 'confirmed' if receipt.status == 1 else 'reverted', 'block_number': receipt.blockNumber}
+        elif get_transaction(tx_hash) is not None:
+            status = {'status': 'pending', 'block_number': None}
+        else:
+            return None
+        status.update(transaction_hash=HexBytes(tx_hash).to_0x_hex(), replaced_by=None)
+    status['confirmations'] = None
+    if status['block_number'] is not None:
+        status['confirmations'] = max(w3.eth.block_number - status['block_number'] + 1, 0)
+    return status
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from eth_utils import event_abi_to_log_topic
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+ARTIFACTS_DIR = os.environ.get('CONTRACT_ARTIFACTS_DIR', os.path.join(REPO_DIR, 'artifacts', 'contracts'))
+DEPLOYMENTS_DIR = os.environ.get('CONTRACT_DEPLOYMENTS_DIR', os.path.join(REPO_DIR, 'deployments'))
+# Parsed ABIs are cached here, keyed by the artifact's hash; empty disables the cache
+CONTRACT_CACHE_DIR = os.environ.get('CONTRACT_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'contracts'))
+BLOCKCHAIN_NETWORK = os.environ.get('BLOCKCHAIN_NETWORK', 'ganache')
+
+
+class ContractNotAvailable(ImproperlyConfigured):
+    pass
+
+
+class ContractMetadata:
+    """The parts of a Hardhat artifact the backend needs, plus precomputed lookups."""
+
+    def __init__(self, name, abi, artifact_hash):
+        self.name = name
+        self.abi = abi
+        self.artifact_hash = artifact_hash
+        # 'PropertyListed' -> topic0 of its logs, to fetch several events in one eth_getLogs
+        self.event_topics = {
+            entry['name']: '0x' + event_abi_to_log_topic(entry).hex()
+            for entry in abi if entry.get('type') == 'event'
+        }
+
+
+class ContractRegistry:
+    """
+    Loads contract ABIs and deployment files on first use rather than at import,
+    so processes that never touch the chain (migrations, most management
+    commands, tests with patched chain calls) do not pay for it or fail on a
+    missing artifact.
+    """
+
+    def __init__(self, artifacts_dir=ARTIFACTS_DIR, deployments_dir=DEPLOYMENTS_DIR, cache_dir=CONTRACT_CACHE_DIR):
+        self.artifacts_dir = artifacts_dir
+        self.deployments_dir = deployments_dir
+        self.cache_dir = cache_dir
+        self._metadata = {}
+        self._deployments = {}
+        self._lock = threading.RLock()
+
+    def artifact_path(self, name):
+        return os.path.join(self.artifacts_dir, f'{name}.sol', f'{name}.json')
+
+    def deployment_path(self, network):
+        return os.path.join(self.deployments_dir, f'{network}-deployment.json')
+
+    def metadata(self, name='RealEstate'):
+        if name not in self._metadata:
+            with self._lock:
+                if name not in self._metadata:
+                    self._metadata[name] = self._load_metadata(name)
+        return self._metadata[name]
+
+    def deployment(self, network=None):
+        network = network or BLOCKCHAIN_NETWORK
+        if network not in self._deployments:
+            with self._lock:
+                if network not in self._deployments:
+                    path = self.deployment_path(network)
+                    try:
+                        with open(path, 'r') as f:
+                            self._deployments[network] = json.load(f)
+                    except FileNotFoundError:
+                        raise ContractNotAvailable(f"No deployment for network '{network}' at {path}. Deploy the contract with scripts/deploy.js.")
+        return self._deployments[network]
+
+    def _contracts(self, w3):
+        # Kept on the Web3 instance the contracts are bound to, so they are freed
+        # with it; a cache keyed by id(w3) could hand a new instance that reuses
+        # the id a contract bound to the dead one's provider
+        return vars(w3).setdefault('_registry_contracts', {})
+
+    def contract(self, w3, name='RealEstate', network=None):
+        key = (self, name, network or BLOCKCHAIN_NETWORK)
+        contracts = self._contracts(w3)
+        if key not in contracts:
+            with self._lock:
+                if key not in contracts:
+                    address = self.deployment(key[2])['address']
+                    contracts[key] = w3.eth.contract(address=address, abi=self.metadata(name).abi)
+        return contracts[key]
+
+    def register(self, w3, contract, name='RealEstate', network=None):
+        """Use contract for w3 instead of the deployment file (a contract deployed in-process)."""
+        with self._lock:
+            self._contracts(w3)[(self, name, network or BLOCKCHAIN_NETWORK)] = contract
+
+    def _load_metadata(self, name):
+        path = self.artifact_path(name)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raise ContractNotAvailable(f"Contract artifact not found at {path}. Run `npx hardhat compile` first.")
+
+        artifact_hash = hashlib.sha256(raw).hexdigest()
+        cache_path = os.path.join(self.cache_dir, f'{name}-{artifact_hash}.pickle') if self.cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    return pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                pass
+
+        metadata = ContractMetadata(name, json.loads(raw)['abi'], artifact_hash)
+        if cache_path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(metadata, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass
+        return metadata
+
+
+registry = ContractRegistry()
+
+
+def get_contract(w3=None, name='RealEstate', network=None):
+    if w3 is None:
+        from .rpc import get_web3
+        w3 = get_web3()
+    return registry.contract(w3, name, network)
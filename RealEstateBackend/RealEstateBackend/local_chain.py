@@ -0,0 +1,174 @@
+import importlib.util
+import json
+import logging
+import os
+import subprocess
+import threading
+import unittest
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+
+from web3 import AsyncWeb3, Web3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider, EthereumTesterProvider
+
+from .contracts import REPO_DIR, registry
+
+logger = logging.getLogger(__name__)
+
+# In-process chain for tests and local development: RealEstate.sol deployed on
+# eth-tester's py-evm backend, every transaction mined as soon as it is sent,
+# and snapshots to undo what a test did. BLOCKCHAIN_BACKEND=eth_tester (see
+# rpc.py) makes get_web3() return it instead of connecting to RPC_URLS. The
+# chain lives in the memory of one process: a listen_for_events started
+# separately does not see it. Needs eth-tester[py-evm] and the compiled
+# contract artifact, which is built with Hardhat on first use once `npm install`
+# has been run. The tests using it are skipped without them, unless
+# REQUIRE_LOCAL_CHAIN is set (in CI), where that is an error instead.
+
+# Accounts whose keys fill in SELLER/BUYER/APPRAISER_PRIVATE_KEY when they are
+# not set. The deployer is the contract's appraiser.
+DEPLOYER, SELLER, BUYER = 0, 1, 2
+ROLE_KEYS = {'APPRAISER_PRIVATE_KEY': DEPLOYER, 'SELLER_PRIVATE_KEY': SELLER, 'BUYER_PRIVATE_KEY': BUYER}
+
+
+def allow_large_contracts():
+    # RealEstate is over the EIP-170 size limit; the Hardhat config allows it
+    # with allowUnlimitedContractSize, so lift the same limits in py-evm
+    from eth.vm.forks.shanghai import computation as shanghai
+    from eth.vm.forks.spurious_dragon import computation as spurious_dragon
+
+    spurious_dragon.EIP170_CODE_SIZE_LIMIT = float('inf')
+    shanghai.MAX_INITCODE_SIZE = float('inf')
+
+
+def build_artifact(name='RealEstate'):
+    """Compile the contracts with Hardhat if name's artifact is missing; returns whether it exists."""
+    path = registry.artifact_path(name)
+    hardhat = os.path.join(REPO_DIR, 'node_modules', '.bin', 'hardhat')
+    if not os.path.exists(path) and os.path.exists(hardhat):
+        logger.info("Compiling the contracts for %s with Hardhat", name)
+        result = subprocess.run([hardhat, 'compile', '--quiet'], cwd=REPO_DIR, capture_output=True, text=True)
+        if result.returncode:
+            logger.warning("npx hardhat compile failed:\n%s", result.stderr or result.stdout)
+    return os.path.exists(path)
+
+
+def unavailable_reason(name='RealEstate'):
+    """Why a LocalChain cannot be started here, or None."""
+    if not importlib.util.find_spec('eth_tester'):
+        return 'eth-tester[py-evm] is not installed'
+    if not build_artifact(name):
+        return f'the {name} artifact is missing and could not be built (run `npm install` in the repository root)'
+    return None
+
+
+def deploy(w3, name='RealEstate', deployer=None):
+    """Deploy the compiled artifact of contract name and return the contract."""
+    build_artifact(name)
+    metadata = registry.metadata(name)
+    with open(registry.artifact_path(name)) as f:
+        bytecode = json.load(f)['bytecode']
+    factory = w3.eth.contract(abi=metadata.abi, bytecode=bytecode)
+    tx_hash = factory.constructor().transact({'from': deployer or w3.eth.accounts[DEPLOYER]})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3.eth.contract(address=receipt.contractAddress, abi=metadata.abi)
+
+
+class LockedEthereumTesterProvider(EthereumTesterProvider):
+    """eth-tester is not thread-safe; threaded dev servers and pipelined receipts share one chain."""
+
+    def __init__(self, ethereum_tester, lock):
+        super().__init__(ethereum_tester)
+        self.lock = lock
+
+    def make_request(self, method, params):
+        with self.lock:
+            return super().make_request(method, params)
+
+
+class LockedAsyncEthereumTesterProvider(AsyncEthereumTesterProvider):
+    def __init__(self, ethereum_tester, lock):
+        super().__init__()
+        self.ethereum_tester = ethereum_tester
+        self.lock = lock
+
+    async def make_request(self, method, params):
+        # The chain runs in this thread either way; the lock only keeps other threads out
+        with self.lock:
+            return await super().make_request(method, params)
+
+
+class LocalChain:
+    def __init__(self, name='RealEstate'):
+        from eth_tester import EthereumTester, PyEVMBackend
+
+        allow_large_contracts()
+        self.name = name
+        self.lock = threading.RLock()
+        backend = PyEVMBackend()
+        self.tester = EthereumTester(backend)
+        self.w3 = Web3(LockedEthereumTesterProvider(self.tester, self.lock))
+        self.accounts = self.w3.eth.accounts
+        self.private_keys = [key.to_hex() for key in backend.account_keys]
+        self.contract = deploy(self.w3, name)
+        registry.register(self.w3, self.contract, name)
+
+    def async_web3(self):
+        """An AsyncWeb3 client on the same chain, with the contract registered for it."""
+        w3 = AsyncWeb3(LockedAsyncEthereumTesterProvider(self.tester, self.lock))
+        registry.register(w3, w3.eth.contract(address=self.contract.address, abi=self.contract.abi), self.name)
+        return w3
+
+    def snapshot(self):
+        return self.tester.take_snapshot()
+
+    def revert(self, snapshot_id):
+        self.tester.revert_to_snapshot(snapshot_id)
+
+    def use_for_roles(self):
+        """Fill in the role private keys the views read from the environment, if unset."""
+        for variable, account in ROLE_KEYS.items():
+            if not os.environ.get(variable):
+                os.environ[variable] = self.private_keys[account]
+                logger.info("%s is account %s (%s) of the in-process chain", variable, account, self.accounts[account])
+
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def get_local_chain():
+    """Process-wide LocalChain, deployed on first use."""
+    global _chain
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                _chain = LocalChain()
+                logger.info("Deployed %s on the in-process chain at %s", _chain.name, _chain.contract.address)
+    return _chain
+
+
+class LocalChainTestMixin:
+    """
+    Runs the real blockchain.py code against the in-process chain: each test
+    sends transactions to it through RealEstateBackend.blockchain and
+    everything it sent is reverted afterwards.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        reason = unavailable_reason()
+        if reason:
+            if os.environ.get('REQUIRE_LOCAL_CHAIN'):
+                raise ImproperlyConfigured(f'REQUIRE_LOCAL_CHAIN is set but {reason}.')
+            raise unittest.SkipTest(reason)
+        super().setUpClass()
+        cls.chain = get_local_chain()
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(self.chain.revert, self.chain.snapshot())
+        patcher = mock.patch('RealEstateBackend.blockchain.w3', self.chain.w3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
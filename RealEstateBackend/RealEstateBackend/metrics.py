@@ -0,0 +1,306 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import hmac
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# In-process request metrics: latency histograms per endpoint, with the share
+# spent on database queries, web3 RPC calls and DRF serialization/rendering.
+# Served in the Prometheus text format at /metrics and summarized per response
+# in a Server-Timing header. The web3 providers add per-method RPC latency,
+# payload sizes, errors and retries, and tracing.py the transaction lifecycle
+# stages. Each worker process keeps its own registry, so Prometheus should
+# scrape every worker (or run a single one per container).
+#
+# /metrics is not public: scrapers send METRICS_TOKEN as a bearer token, e.g.
+#   scrape_configs:
+#     - job_name: realestate
+#       metrics_path: /metrics
+#       authorization: {credentials: <METRICS_TOKEN>}
+# Staff users logged in to the admin can also open it in a browser.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Mining and indexing take block times, not milliseconds
+TX_STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for label_values, values in series:
+            labels = _format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            cumulative += values[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {values[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, value in series:
+            lines.append(f'{self.name}{{{_format_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _format_labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_LABELS = ('method', 'endpoint', 'status')
+
+request_duration = Histogram('http_request_duration_seconds', 'Request latency.', REQUEST_LABELS)
+request_db_queries = Counter('http_request_db_queries_total', 'Database queries run by requests.', REQUEST_LABELS)
+request_db_seconds = Counter('http_request_db_seconds_total', 'Time requests spent in database queries.', REQUEST_LABELS)
+request_rpc_calls = Counter('http_request_rpc_calls_total', 'web3 RPC calls made by requests.', REQUEST_LABELS)
+request_rpc_seconds = Counter('http_request_rpc_seconds_total', 'Time requests spent waiting on RPC calls.', REQUEST_LABELS)
+request_serialize_seconds = Counter('http_request_serialize_seconds_total', 'Time requests spent in serializers and renderers.', REQUEST_LABELS)
+rpc_duration = Histogram('rpc_request_duration_seconds', 'web3 RPC latency, in and outside requests.', ('method',))
+rpc_request_size = Histogram('rpc_request_size_bytes', 'Encoded web3 RPC request bodies.', ('method',), buckets=SIZE_BUCKETS)
+rpc_response_size = Histogram('rpc_response_size_bytes', 'Raw web3 RPC response bodies.', ('method',), buckets=SIZE_BUCKETS)
+rpc_errors = Counter('rpc_errors_total', 'web3 RPC calls that failed in transport or returned a JSON-RPC error.', ('method', 'kind'))
+rpc_retries = Counter('rpc_retries_total', 'web3 RPC calls retried after a transport error.', ('method',))
+tx_stage_duration = Histogram(
+    'tx_stage_duration_seconds', 'Time transactions spent in each lifecycle stage (see tracing.py).',
+    ('function', 'stage'), buckets=TX_STAGE_BUCKETS,
+)
+tx_total = Counter('tx_total', 'Transactions sent by this process, by outcome.', ('function', 'status'))
+
+REGISTRY = [
+    request_duration, request_db_queries, request_db_seconds, request_rpc_calls,
+    request_rpc_seconds, request_serialize_seconds, rpc_duration, rpc_request_size,
+    rpc_response_size, rpc_errors, rpc_retries, tx_stage_duration, tx_total,
+]
+
+
+class RequestStats:
+    __slots__ = ('db_count', 'db_time', 'rpc_count', 'rpc_time', 'serialize_time')
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.rpc_count = 0
+        self.rpc_time = 0.0
+        self.serialize_time = 0.0
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_count += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def _install_db_wrapper(connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+# Connections opened later (including in sync_to_async threads) are
+# instrumented as they connect; the middleware covers ones already open
+connection_created.connect(_install_db_wrapper)
+
+
+def record_rpc(method, elapsed, calls=1):
+    """Called by the web3 providers after every request (or batch of `calls` requests)."""
+    rpc_duration.observe(elapsed, method)
+    stats = _current.get()
+    if stats is not None:
+        stats.rpc_count += calls
+        stats.rpc_time += elapsed
+
+
+def record_rpc_payload(method, request_data, raw_response):
+    rpc_request_size.observe(len(request_data), method)
+    if raw_response is not None:
+        rpc_response_size.observe(len(raw_response), method)
+
+
+def record_rpc_errors(method, response):
+    """Counts the JSON-RPC error objects in a decoded response (or batch of responses)."""
+    responses = response if isinstance(response, list) else [response]
+    errors = sum(1 for item in responses if isinstance(item, dict) and item.get('error'))
+    if errors:
+        rpc_errors.inc(errors, method, 'rpc')
+
+
+@contextlib.contextmanager
+def timed_serialization():
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.serialize_time += time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """Counts the time spent building `.data` towards the request's serialization time."""
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # many=True returns a plain ListSerializer, whose .data would go untimed
+        serializer = super().many_init(*args, **kwargs)
+        serializer.__class__ = _timed_list_class(type(serializer))
+        return serializer
+
+
+@functools.lru_cache(maxsize=None)
+def _timed_list_class(list_class):
+    return type('Timed' + list_class.__name__, (TimedSerializerMixin, list_class), {})
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed_serialization():
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def _endpoint(request):
+    # The URL name keeps the label set small; raw paths would create a series per id
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Records latency and its DB / RPC / serialization breakdown for every request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _install_db_wrapper(connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, elapsed):
+        labels = (request.method, _endpoint(request), response.status_code)
+        request_duration.observe(elapsed, *labels)
+        request_db_queries.inc(stats.db_count, *labels)
+        request_db_seconds.inc(stats.db_time, *labels)
+        request_rpc_calls.inc(stats.rpc_count, *labels)
+        request_rpc_seconds.inc(stats.rpc_time, *labels)
+        request_serialize_seconds.inc(stats.serialize_time, *labels)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_count} queries"',
+            f'rpc;dur={stats.rpc_time * 1000:.1f};desc="{stats.rpc_count} calls"',
+            f'serialize;dur={stats.serialize_time * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ])
+        if elapsed >= settings.SLOW_REQUEST_THRESHOLD:
+            logger.warning(
+                'Slow request %s %s (%s): %.0f ms total, %d queries in %.0f ms, %d RPC calls in %.0f ms, serialization %.0f ms',
+                request.method, request.path, labels[1], elapsed * 1000, stats.db_count, stats.db_time * 1000,
+                stats.rpc_count, stats.rpc_time * 1000, stats.serialize_time * 1000,
+            )
+        return response
+
+
+def _may_scrape(request):
+    token = settings.METRICS_TOKEN
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if token and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def exposition():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    if not _may_scrape(request):
+        return HttpResponseForbidden('METRICS_TOKEN bearer token or a staff session required\n', content_type='text/plain')
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,240 @@
+import contextlib
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3._utils.batching import sort_batch_response_by_response_ids
+from web3.providers.rpc import HTTPProvider
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated list of node URLs; GANACHE_URL keeps working for a single local node
+RPC_URLS = [url.strip() for url in os.environ.get('RPC_URLS', '').split(',') if url.strip()] or [
+    os.environ.get('GANACHE_URL') or 'http://127.0.0.1:8545'
+]
+# 'rpc' sends calls to the nodes above; 'eth_tester' runs the contract in-process (see local_chain.py)
+BLOCKCHAIN_BACKEND = os.environ.get('BLOCKCHAIN_BACKEND', 'rpc')
+RPC_POOL_SIZE = int(os.environ.get('RPC_POOL_SIZE', 20))
+RPC_CONNECT_TIMEOUT = float(os.environ.get('RPC_CONNECT_TIMEOUT', 3))
+RPC_TIMEOUT = float(os.environ.get('RPC_TIMEOUT', 30))
+RPC_READ_RETRIES = int(os.environ.get('RPC_READ_RETRIES', 3))
+RPC_BACKOFF_BASE = float(os.environ.get('RPC_BACKOFF_BASE', 0.1))
+RPC_BACKOFF_MAX = float(os.environ.get('RPC_BACKOFF_MAX', 2))
+RPC_UNHEALTHY_COOLDOWN = float(os.environ.get('RPC_UNHEALTHY_COOLDOWN', 30))
+
+# Calls that can be repeated without side effects. Anything else (notably
+# eth_sendRawTransaction and filter polling, which advances server-side state)
+# is sent once.
+IDEMPOTENT_METHODS = frozenset([
+    'eth_blockNumber',
+    'eth_call',
+    'eth_chainId',
+    'eth_estimateGas',
+    'eth_feeHistory',
+    'eth_gasPrice',
+    'eth_getBalance',
+    'eth_getBlockByHash',
+    'eth_getBlockByNumber',
+    'eth_getCode',
+    'eth_getLogs',
+    'eth_getTransactionByHash',
+    'eth_getTransactionCount',
+    'eth_getTransactionReceipt',
+    'eth_maxPriorityFeePerGas',
+    'net_version',
+    'web3_clientVersion',
+])
+
+TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+def build_session(pool_size=RPC_POOL_SIZE, hosts=1):
+    """A keep-alive session whose pool holds pool_size connections per node."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max(hosts, 1), pool_maxsize=pool_size, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def backoff_delay(attempt, base=RPC_BACKOFF_BASE, cap=RPC_BACKOFF_MAX):
+    # "Full jitter": spreads retries from many clients instead of synchronizing them
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class Endpoint:
+    """A node URL with a health score between 0 and 1, updated after every call."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.score = 1.0
+        self.latency = None
+        self.unhealthy_until = 0.0
+
+    @property
+    def uri(self):
+        return self.provider.endpoint_uri
+
+    def is_available(self, now):
+        return now >= self.unhealthy_until
+
+    def record_success(self, elapsed):
+        self.score = self.score * 0.8 + 0.2
+        self.latency = elapsed if self.latency is None else self.latency * 0.8 + elapsed * 0.2
+        self.unhealthy_until = 0.0
+
+    def record_failure(self, now):
+        self.score *= 0.5
+        if self.score < 0.25:
+            self.unhealthy_until = now + RPC_UNHEALTHY_COOLDOWN
+
+
+class MeteredHTTPProvider(HTTPProvider):
+    """A single node's provider that reports the size of every request and response body."""
+
+    def _make_request(self, method, request_data):
+        raw_response = super()._make_request(method, request_data)
+        metrics.record_rpc_payload(method, request_data, raw_response)
+        return raw_response
+
+    def make_batch_request(self, batch_requests):
+        # HTTPProvider posts batches directly; route them through _make_request to be measured
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        response = self.decode_rpc_response(self._make_request('batch', request_data))
+        if not isinstance(response, list):
+            # RPC errors return a single error object for the whole batch
+            return response
+        return sort_batch_response_by_response_ids(response)
+
+
+class FailoverHTTPProvider(HTTPProvider):
+    """
+    HTTP provider that spreads requests round-robin over several nodes, skips
+    nodes whose health score dropped after repeated transport errors, and
+    retries idempotent reads on another node with jittered backoff.
+    """
+
+    def __init__(self, endpoint_uris, session=None, timeout=None, read_retries=RPC_READ_RETRIES):
+        session = session or build_session(hosts=len(endpoint_uris))
+        request_kwargs = {'timeout': timeout or (RPC_CONNECT_TIMEOUT, RPC_TIMEOUT)}
+        super().__init__(endpoint_uris[0], request_kwargs=request_kwargs, session=session, exception_retry_configuration=None)
+        self.endpoints = [
+            Endpoint(MeteredHTTPProvider(uri, request_kwargs=request_kwargs, session=session, exception_retry_configuration=None))
+            for uri in endpoint_uris
+        ]
+        self.read_retries = read_retries
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._pinned = threading.local()
+
+    @contextlib.contextmanager
+    def pinned(self):
+        """
+        Send this thread's requests inside the block to a single node. Reads
+        that are compared with each other (a nonce and a receipt) must not come
+        from nodes at different heights.
+        """
+        if getattr(self._pinned, 'endpoint', None) is not None:
+            yield
+            return
+        self._pinned.endpoint = self.ordered_endpoints()[0]
+        try:
+            yield
+        finally:
+            self._pinned.endpoint = None
+
+    def ordered_endpoints(self):
+        pinned = getattr(self._pinned, 'endpoint', None)
+        if pinned is not None:
+            return [pinned]
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._counter) % len(self.endpoints)
+        rotated = self.endpoints[start:] + self.endpoints[:start]
+        available = [endpoint for endpoint in rotated if endpoint.is_available(now)]
+        # Nodes in cooldown are only tried once every healthy node has failed
+        cooling = sorted((e for e in rotated if not e.is_available(now)), key=lambda e: e.unhealthy_until)
+        # sorted() is stable, so nodes with the same rounded score keep the rotation
+        return sorted(available, key=lambda e: -round(e.score, 1)) + cooling
+
+    def _call(self, method, send, idempotent):
+        attempts = self.read_retries + 1 if idempotent else 1
+        endpoints = self.ordered_endpoints()
+        last_error = None
+        for attempt in range(attempts):
+            endpoint = endpoints[attempt % len(endpoints)]
+            started = time.monotonic()
+            try:
+                response = send(endpoint.provider)
+            except TRANSPORT_ERRORS as e:
+                endpoint.record_failure(time.monotonic())
+                logger.warning("RPC call to %s failed (attempt %s/%s): %s", endpoint.uri, attempt + 1, attempts, e)
+                last_error = e
+                if attempt + 1 < attempts:
+                    metrics.rpc_retries.inc(1, method)
+                    time.sleep(backoff_delay(attempt))
+                continue
+            endpoint.record_success(time.monotonic() - started)
+            metrics.record_rpc_errors(method, response)
+            return response
+        metrics.rpc_errors.inc(1, method, 'transport')
+        raise last_error
+
+    def make_request(self, method, params):
+        started = time.perf_counter()
+        try:
+            return self._call(method, lambda provider: provider.make_request(method, params), method in IDEMPOTENT_METHODS)
+        finally:
+            metrics.record_rpc(method, time.perf_counter() - started)
+
+    def make_batch_request(self, batch_requests):
+        idempotent = all(method in IDEMPOTENT_METHODS for method, _ in batch_requests)
+        started = time.perf_counter()
+        try:
+            return self._call('batch', lambda provider: provider.make_batch_request(batch_requests), idempotent)
+        finally:
+            metrics.record_rpc('batch', time.perf_counter() - started, calls=len(batch_requests))
+
+    def is_connected(self, show_traceback=False):
+        return any(endpoint.provider.is_connected(show_traceback) for endpoint in self.endpoints)
+
+
+def single_node(w3):
+    """Context manager sending w3's requests in this thread to one node; a no-op for single-node providers."""
+    pinned = getattr(w3.provider, 'pinned', None)
+    return pinned() if pinned else contextlib.nullcontext()
+
+
+_web3 = None
+_web3_lock = threading.Lock()
+
+
+def get_web3():
+    """Process-wide Web3 client; every caller shares its connection pool."""
+    global _web3
+    if _web3 is None:
+        with _web3_lock:
+            if _web3 is None:
+                _web3 = _build_web3()
+    return _web3
+
+
+def _build_web3():
+    if BLOCKCHAIN_BACKEND == 'eth_tester':
+        from .local_chain import get_local_chain
+
+        chain = get_local_chain()
+        chain.use_for_roles()
+        return chain.w3
+    if BLOCKCHAIN_BACKEND != 'rpc':
+        raise ImproperlyConfigured(f"Unknown BLOCKCHAIN_BACKEND '{BLOCKCHAIN_BACKEND}' (expected 'rpc' or 'eth_tester').")
+    return Web3(FailoverHTTPProvider(RPC_URLS))
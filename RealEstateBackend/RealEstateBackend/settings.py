@@ -16,8 +16,6 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-print(f"SELLER_PRIVATE_KEY from .env: {os.environ.get('SELLER_PRIVATE_KEY')}")
-
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -53,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "RealEstateBackend.metrics.MetricsMiddleware",
+    "RealEstateBackend.routers.ReplicaReadMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -85,12 +85,56 @@ WSGI_APPLICATION = "RealEstateBackend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_ENGINE=postgresql for production (DB_NAME, DB_USER, DB_PASSWORD, DB_HOST,
+# DB_PORT); DB_REPLICA_HOST adds a read replica that serves GET requests.
+# Otherwise SQLite, in WAL mode so the API can read while the listener writes
+# (switched on by migration properties.0013, as it is stored in the file);
+# DB_NAME then names the database file (the benchmarks point it at fixtures).
+
+if os.environ.get('DB_ENGINE', 'sqlite') == 'postgresql':
+    DB_POOL = os.environ.get('DB_POOL', '0') == '1'  # psycopg connection pool (needs psycopg[pool])
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get('DB_NAME', 'realestate'),
+            "USER": os.environ.get('DB_USER', ''),
+            "PASSWORD": os.environ.get('DB_PASSWORD', ''),
+            "HOST": os.environ.get('DB_HOST', 'localhost'),
+            "PORT": os.environ.get('DB_PORT', '5432'),
+            # The pool keeps connections open itself and cannot be combined with CONN_MAX_AGE
+            "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    "max_size": int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                },
+            } if DB_POOL else {},
+        }
+    }
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": os.environ['DB_REPLICA_HOST'],
+            "PORT": os.environ.get('DB_REPLICA_PORT', DATABASES["default"]["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get('DB_NAME') or BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                "init_command": "PRAGMA synchronous=NORMAL;",
+                # Take the write lock at BEGIN, so a second writer waits up to
+                # timeout seconds instead of failing when it upgrades its lock
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+            },
+        }
     }
-}
+
+DATABASE_ROUTERS = ["RealEstateBackend.routers.PrimaryReplicaRouter"]
 
 
 # Password validation
@@ -141,10 +185,106 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'RealEstateBackend.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+
+# Fast boot: web3 and the contract are loaded on the first chain call rather than at
+# startup. Set FAST_BOOT=0 to pay that cost while the worker boots instead.
+FAST_BOOT = os.environ.get('FAST_BOOT', '1') != '0'
+
+# Maximum listings accepted by POST /api/properties/bulk/
+BULK_LISTING_MAX = int(os.environ.get('BULK_LISTING_MAX', 500))
+
+# Server-sent events feed of property/offer/transaction changes (served at /api/stream/)
+FEED_POLL_INTERVAL = float(os.environ.get('FEED_POLL_INTERVAL', 0.5))  # seconds between ChangeEvent polls
+FEED_BATCH_SIZE = 500
+FEED_QUEUE_SIZE = int(os.environ.get('FEED_QUEUE_SIZE', 256))  # per-client backlog before it is dropped
+FEED_REPLAY_LIMIT = 1000  # events replayed to a client reconnecting with Last-Event-ID
+FEED_HEARTBEAT_INTERVAL = 15
+FEED_GAP_TIMEOUT = 30  # seconds a skipped event id is polled for, in case its transaction commits late
+# Change events are deleted after this many hours (by the feed itself every FEED_PRUNE_INTERVAL
+# seconds, or manage.py prune_feed_events); clients reconnecting from an older Last-Event-ID
+# get an overflow event and re-sync from the REST API
+FEED_RETENTION_HOURS = float(os.environ.get('FEED_RETENTION_HOURS', 24))
+FEED_PRUNE_INTERVAL = 3600
+
+# Offer expiry scheduler (manage.py expire_offers)
+OFFER_EXPIRY_REFRESH_INTERVAL = float(os.environ.get('OFFER_EXPIRY_REFRESH_INTERVAL', 30))  # seconds between deadline reloads
+OFFER_EXPIRY_LOOKAHEAD = 1000  # upcoming deadlines held in memory
+OFFER_EXPIRY_CHAIN_ATTEMPTS = 3  # ticks a property's expireOffers is retried after a revert
+
+# Seconds an accept may hold its property while acceptOffer is in flight; older claims were
+# left by a request that died and can be taken over
+OFFER_ACCEPT_CLAIM_TIMEOUT = int(os.environ.get('OFFER_ACCEPT_CLAIM_TIMEOUT', 300))
+
+# Auctions: in-memory bid index and endAuction trigger (manage.py end_auctions)
+AUCTION_BOOK_TTL = float(os.environ.get('AUCTION_BOOK_TTL', 5))  # seconds before a worker reloads its auction book
+AUCTION_END_ATTEMPTS = 3  # endAuction attempts per auction before the scheduler gives up
+
+# Shared cache; REDIS_URL makes it visible to every worker, otherwise it is per process
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ['REDIS_URL'],
+        }
+    }
+
+# Token -> user lookups (users.authentication.CachedTokenAuthentication)
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))  # seconds in the shared cache
+TOKEN_CACHE_LOCAL_TTL = float(os.environ.get('TOKEN_CACHE_LOCAL_TTL', 5))  # seconds in each worker's LRU; bounds cross-worker staleness
+TOKEN_CACHE_LOCAL_SIZE = 1024
+
+# Password hashing. PASSWORD_HASHER=argon2 hashes new passwords with Argon2id (needs
+# argon2-cffi); PBKDF2 hashes keep verifying and are upgraded at the next login.
+# python -m benchmarks.login measures the cost of each.
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 8))
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "users.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+if os.environ.get('PASSWORD_HASHER') == 'argon2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(2))
+
+# Failed logins allowed per sliding window before /api/login/ answers 429 without hashing
+LOGIN_FAILURE_WINDOW = int(os.environ.get('LOGIN_FAILURE_WINDOW', 300))  # seconds
+LOGIN_FAILURE_LIMIT_PER_USER = int(os.environ.get('LOGIN_FAILURE_LIMIT_PER_USER', 5))
+LOGIN_FAILURE_LIMIT_PER_IP = int(os.environ.get('LOGIN_FAILURE_LIMIT_PER_IP', 50))
+# Reverse proxies in front of gunicorn that append to X-Forwarded-For; the client IP
+# is read from the entry the outermost one appended. 0 uses REMOTE_ADDR
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+# Role dashboards (/api/dashboard/<role>/)
+# Changes invalidate cached dashboards in every worker only with the shared cache (REDIS_URL);
+# without it, changes from other processes show after up to DASHBOARD_CACHE_TTL seconds
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))  # seconds
+DASHBOARD_LIST_LIMIT = 50  # properties per dashboard list
+DASHBOARD_RECENT_LIMIT = 10  # recent transactions shown
+
+# Request metrics (RealEstateBackend.metrics): Prometheus text at /metrics, Server-Timing headers
+SLOW_REQUEST_THRESHOLD = float(os.environ.get('SLOW_REQUEST_THRESHOLD', 1.0))  # seconds; slower requests are logged
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # bearer token for scraping /metrics; otherwise staff sessions only
+
+
+# Transaction outbox (properties.outbox). With CHAIN_OUTBOX=1 property and offer creation
+# write the contract call to the outbox in the same database transaction and answer 202;
+# manage.py dispatch_outbox sends it. Run one dispatcher per signing key.
+CHAIN_OUTBOX = os.environ.get('CHAIN_OUTBOX', '0') == '1'
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))  # entries signed per tick
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1))  # seconds between ticks
+OUTBOX_MAX_ATTEMPTS = 5  # transient send failures before an entry is failed
+OUTBOX_REBROADCAST_AFTER = float(os.environ.get('OUTBOX_REBROADCAST_AFTER', 60))  # seconds a signed transaction may go unmined
@@ -0,0 +1,665 @@
+import io
+import itertools
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from web3.exceptions import TransactionNotFound, Web3RPCError
+
+from . import blockchain, metrics, tracing
+from .contracts import ContractNotAvailable, ContractRegistry
+from . import local_chain
+from .local_chain import LocalChainTestMixin
+from .routers import PrimaryReplicaRouter, ReplicaReadMiddleware, replica_reads
+from .rpc import FailoverHTTPProvider, MeteredHTTPProvider, _build_web3
+from .tx_tracker import PendingTransactionTracker, TransactionDropped
+
+
+class FailoverHTTPProviderTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = FailoverHTTPProvider(['http://node-a:8545', 'http://node-b:8545'])
+        self.node_a, self.node_b = self.provider.endpoints
+        self.node_a.provider = MagicMock(endpoint_uri='http://node-a:8545')
+        self.node_b.provider = MagicMock(endpoint_uri='http://node-b:8545')
+
+    @patch('RealEstateBackend.rpc.time.sleep')
+    def test_read_fails_over_to_next_node(self, mock_sleep):
+        """
+        Ensure an idempotent read is retried on another node after a transport error.
+        """
+        self.node_a.provider.make_request.side_effect = requests.exceptions.ConnectionError()
+        self.node_b.provider.make_request.return_value = {'jsonrpc': '2.0', 'id': 1, 'result': '0x10'}
+        with patch.object(self.provider, 'ordered_endpoints', return_value=[self.node_a, self.node_b]):
+            response = self.provider.make_request('eth_blockNumber', [])
+        self.assertEqual(response['result'], '0x10')
+        self.assertLess(self.node_a.score, self.node_b.score)
+        mock_sleep.assert_called_once()
+
+    def test_write_is_not_retried(self):
+        """
+        Ensure a transaction submission is sent only once.
+        """
+        self.node_a.provider.make_request.side_effect = requests.exceptions.Timeout()
+        with patch.object(self.provider, 'ordered_endpoints', return_value=[self.node_a, self.node_b]):
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.provider.make_request('eth_sendRawTransaction', ['0x00'])
+        self.node_b.provider.make_request.assert_not_called()
+
+    @patch('RealEstateBackend.rpc.time.sleep')
+    def test_retries_and_errors_are_counted(self, mock_sleep):
+        """
+        Ensure retries, transport errors and JSON-RPC error responses are counted per method.
+        """
+        def count(counter, *labels):
+            return counter._series.get(labels, 0)
+
+        before = count(metrics.rpc_retries, 'eth_getLogs'), count(metrics.rpc_errors, 'eth_getLogs', 'rpc'), count(metrics.rpc_errors, 'eth_chainId', 'transport')
+        self.node_a.provider.make_request.side_effect = requests.exceptions.ConnectionError()
+        self.node_b.provider.make_request.return_value = {'jsonrpc': '2.0', 'id': 1, 'error': {'code': -32005, 'message': 'query returned more than 10000 results'}}
+        with patch.object(self.provider, 'ordered_endpoints', return_value=[self.node_a, self.node_b]):
+            self.provider.make_request('eth_getLogs', [{}])
+        self.node_b.provider.make_request.side_effect = requests.exceptions.Timeout()
+        with patch.object(self.provider, 'ordered_endpoints', return_value=[self.node_a, self.node_b]):
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.provider.make_request('eth_chainId', [])
+
+        self.assertEqual(count(metrics.rpc_retries, 'eth_getLogs'), before[0] + 1)
+        self.assertEqual(count(metrics.rpc_errors, 'eth_getLogs', 'rpc'), before[1] + 1)
+        self.assertEqual(count(metrics.rpc_errors, 'eth_chainId', 'transport'), before[2] + 1)
+
+    def test_payload_sizes_are_recorded(self):
+        """
+        Ensure each node's provider reports the size of the request and response bodies.
+        """
+        provider = MeteredHTTPProvider('http://node-a:8545')
+        raw_response = b'{"jsonrpc":"2.0","id":0,"result":"0x10"}'
+        with patch.object(provider._request_session_manager, 'make_post_request', return_value=raw_response):
+            with patch('RealEstateBackend.rpc.metrics.record_rpc_payload') as mock_record:
+                self.assertEqual(provider.make_request('eth_blockNumber', [])['result'], '0x10')
+        method, request_data, response_data = mock_record.call_args.args
+        self.assertEqual(method, 'eth_blockNumber')
+        self.assertIn(b'"eth_blockNumber"', request_data)
+        self.assertEqual(response_data, raw_response)
+
+    def test_unhealthy_node_is_tried_last(self):
+        """
+        Ensure a node in cooldown after repeated failures moves behind healthy nodes.
+        """
+        for _ in range(3):
+            self.node_a.record_failure(now=0)
+        self.node_a.unhealthy_until = float('inf')
+        for _ in range(4):
+            self.assertIs(self.provider.ordered_endpoints()[0], self.node_b)
+
+
+class ContractRegistryTests(SimpleTestCase):
+    ABI = [
+        {'type': 'function', 'name': 'listPropertySimple', 'inputs': [{'name': 'price', 'type': 'uint256'}, {'name': 'details', 'type': 'string'}]},
+        {'type': 'event', 'name': 'PriceUpdated', 'inputs': [
+            {'name': 'propertyId', 'type': 'uint256', 'indexed': True},
+            {'name': 'oldPrice', 'type': 'uint256', 'indexed': False},
+            {'name': 'newPrice', 'type': 'uint256', 'indexed': False},
+        ]},
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        artifact_dir = os.path.join(self.tmp.name, 'artifacts', 'RealEstate.sol')
+        os.makedirs(artifact_dir)
+        with open(os.path.join(artifact_dir, 'RealEstate.json'), 'w') as f:
+            json.dump({'abi': self.ABI, 'bytecode': '0x' + '00' * 1024}, f)
+        self.registry_args = (os.path.join(self.tmp.name, 'artifacts'), self.tmp.name, os.path.join(self.tmp.name, 'cache'))
+
+    def test_precomputes_event_topics(self):
+        """
+        Ensure event topics are derived from the ABI.
+        """
+        metadata = ContractRegistry(*self.registry_args).metadata()
+        self.assertEqual(
+            metadata.event_topics['PriceUpdated'],
+            '0x15819dd2fd9f6418b142e798d08a18d0bf06ea368f4480b7b0d3f75bd966bc48',
+        )
+
+    def test_second_load_uses_hash_keyed_cache(self):
+        """
+        Ensure a later process reads the parsed ABI from the cache instead of the artifact JSON.
+        """
+        ContractRegistry(*self.registry_args).metadata()
+        with patch('RealEstateBackend.contracts.json.loads', side_effect=AssertionError('artifact parsed again')):
+            metadata = ContractRegistry(*self.registry_args).metadata()
+        self.assertEqual(metadata.abi, self.ABI)
+
+    def test_missing_artifact_fails_on_first_use(self):
+        """
+        Ensure a missing artifact raises a configuration error only when the contract is needed.
+        """
+        registry = ContractRegistry(self.tmp.name, self.tmp.name, None)
+        with self.assertRaises(ContractNotAvailable):
+            registry.metadata()
+        with self.assertRaises(ContractNotAvailable):
+            registry.deployment('sepolia')
+
+    def test_registered_contract_replaces_deployment_file(self):
+        """
+        Ensure a contract registered for a client is returned without reading a deployment file.
+        """
+        registry = ContractRegistry(self.tmp.name, self.tmp.name, None)
+        w3, contract = MagicMock(), MagicMock()
+        registry.register(w3, contract)
+        self.assertIs(registry.contract(w3), contract)
+        with self.assertRaises(ContractNotAvailable):
+            registry.contract(MagicMock())
+
+    @patch('RealEstateBackend.contracts.BLOCKCHAIN_NETWORK', 'ganache')
+    def test_contracts_are_cached_per_client(self):
+        """
+        Ensure the default network and its explicit name share a cached contract, bound to each client separately.
+        """
+        with open(os.path.join(self.tmp.name, 'ganache-deployment.json'), 'w') as f:
+            json.dump({'address': '0x' + '11' * 20}, f)
+        registry = ContractRegistry(*self.registry_args)
+        w3, other_w3 = MagicMock(), MagicMock()
+        contract = registry.contract(w3)
+        self.assertIs(registry.contract(w3, network='ganache'), contract)
+        w3.eth.contract.assert_called_once()
+        self.assertIsNot(registry.contract(other_w3), contract)
+        self.assertIs(registry.contract(other_w3), other_w3.eth.contract.return_value)
+
+    @patch('RealEstateBackend.rpc.BLOCKCHAIN_BACKEND', 'ganache')
+    def test_unknown_backend_is_rejected(self):
+        """
+        Ensure a misspelled BLOCKCHAIN_BACKEND fails instead of falling back to a node.
+        """
+        with self.assertRaises(ImproperlyConfigured):
+            _build_web3()
+
+
+class PipelinedTransactionTests(SimpleTestCase):
+    @patch('RealEstateBackend.blockchain.save_traces')
+    @patch('RealEstateBackend.blockchain.tracker')
+    @patch('RealEstateBackend.blockchain.w3')
+    def test_consecutive_nonces_and_per_call_status(self, mock_w3, mock_tracker, mock_save_traces):
+        """
+        Ensure calls are sent with consecutive nonces and a failed build does not consume one.
+        """
+        mock_w3.eth.get_transaction_count.return_value = 7
+        mock_w3.eth.send_raw_transaction.side_effect = lambda raw: bytes.fromhex(raw)
+        mock_w3.eth.account.sign_transaction.side_effect = lambda tx, private_key: MagicMock(raw_transaction=f"{tx['nonce']:02x}")
+        mock_tracker.wait.side_effect = lambda tx_hash, tx, private_key: MagicMock(
+            status=0 if tx_hash == '08' else 1, transactionHash=bytes.fromhex(tx_hash),
+        )
+
+        good, broken, other = MagicMock(), MagicMock(), MagicMock()
+        good.build_transaction.side_effect = lambda params: dict(params)
+        other.build_transaction.side_effect = lambda params: dict(params)
+        broken.build_transaction.side_effect = ValueError('execution reverted')
+
+        results = blockchain.send_transactions_pipelined('0x' + '11' * 32, [good, broken, other])
+
+        self.assertEqual([result['status'] for result in results], ['confirmed', 'failed', 'reverted'])
+        self.assertEqual([result['transaction_hash'] for result in results], ['07', None, '08'])
+        lifecycles = mock_save_traces.call_args.args[0]
+        self.assertEqual([lifecycle.status for lifecycle in lifecycles], ['confirmed', 'failed', 'reverted'])
+        self.assertIsNone(lifecycles[1].sent_at)
+
+    @patch('RealEstateBackend.blockchain.save_traces')
+    @patch('RealEstateBackend.blockchain.tracker')
+    @patch('RealEstateBackend.blockchain.w3')
+    def test_nonce_is_only_reused_after_a_rejected_send(self, mock_w3, mock_tracker, mock_save_traces):
+        """
+        Ensure a send that may have reached the node never has its nonce signed again.
+        """
+        def send(raw):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return bytes.fromhex(raw)
+
+        mock_w3.eth.account.sign_transaction.side_effect = lambda tx, private_key: MagicMock(
+            raw_transaction=f"{tx['nonce']:02x}", hash=bytes.fromhex(f"{tx['nonce']:02x}"),
+        )
+        mock_w3.eth.send_raw_transaction.side_effect = send
+        mock_tracker.wait.side_effect = lambda tx_hash, tx, private_key: MagicMock(status=1, transactionHash=bytes.fromhex(tx_hash))
+        calls = [MagicMock() for _ in range(4)]
+        for call in calls:
+            call.build_transaction.side_effect = lambda params: dict(params)
+
+        # The node rejects the first with an error response; the second times out after the node took it
+        outcomes = [Web3RPCError('insufficient funds'), requests.exceptions.ReadTimeout('read timed out'), None, None]
+        mock_w3.eth.get_transaction_count.side_effect = [7, 9]
+        results = blockchain.send_transactions_pipelined('0x' + '11' * 32, calls)
+        self.assertEqual([result['status'] for result in results], ['failed', 'confirmed', 'confirmed', 'confirmed'])
+        self.assertEqual([result['transaction_hash'] for result in results], [None, '07', '08', '09'])
+
+        # A timeout the node did not take stops the pipeline instead of signing its nonce again
+        outcomes = [None, requests.exceptions.ConnectionError('connection reset'), None, None]
+        mock_w3.eth.get_transaction_count.side_effect = [7, 8]
+        results = blockchain.send_transactions_pipelined('0x' + '11' * 32, calls)
+        self.assertEqual([result['status'] for result in results], ['confirmed', 'failed', 'failed', 'failed'])
+        self.assertEqual(results[1]['error'], 'connection reset')
+        self.assertIn('Not sent', results[3]['error'])
+        self.assertEqual(mock_w3.eth.send_raw_transaction.call_count, 6)
+
+
+
+class PendingTransactionTrackerTests(SimpleTestCase):
+    SENDER = '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266'
+
+    def raw_receipt(self, tx_hash, block_number, status=1):
+        return {'transactionHash': tx_hash, 'status': hex(status), 'blockNumber': hex(block_number), 'gasUsed': '0x5208', 'logs': []}
+
+    def test_one_receipt_batch_per_block(self):
+        """
+        Ensure every pending hash is checked in one batch, and only again once a block is mined.
+        """
+        hashes = ['0x' + f'{n:02x}' * 32 for n in range(1, 4)]
+        mined = {}
+        provider = FailoverHTTPProvider(['http://node-a:8545'])
+        w3 = MagicMock(provider=provider)
+        w3.eth.block_number = 10
+        tracker = PendingTransactionTracker(lambda: w3, background=False)
+        futures = [tracker.track(tx_hash) for tx_hash in hashes]
+
+        def batch(requests):
+            return [{'jsonrpc': '2.0', 'id': n, 'result': mined.get(params[0])} for n, (method, params) in enumerate(requests)]
+
+        with patch.object(provider, 'make_batch_request', side_effect=batch) as mock_batch:
+            self.assertEqual(tracker.poll(), 0)
+            self.assertEqual(tracker.poll(), 0)
+            self.assertEqual(mock_batch.call_count, 1)
+            self.assertEqual(len(mock_batch.call_args.args[0]), 3)
+
+            w3.eth.block_number = 11
+            mined.update({tx_hash: self.raw_receipt(tx_hash, 11, status=0 if tx_hash == hashes[2] else 1) for tx_hash in hashes})
+            self.assertEqual(tracker.poll(), 3)
+            self.assertEqual(mock_batch.call_count, 2)
+
+        self.assertEqual([future.result(0).status for future in futures], [1, 1, 0])
+        self.assertEqual(tracker.status(hashes[2]), {'transaction_hash': hashes[2], 'status': 'reverted', 'block_number': 11, 'replaced_by': None})
+        self.assertEqual(tracker.poll(), 0)
+
+    def test_stuck_transaction_is_sped_up(self):
+        """
+        Ensure a transaction not mined after speed_up_blocks is re-signed with the same nonce and bumped fees.
+        """
+        original, replacement = '0x' + 'ab' * 32, '0x' + 'cd' * 32
+        w3 = MagicMock()
+        w3.eth.block_number = 10
+        w3.eth.gas_price = 90
+        w3.eth.get_transaction_count.return_value = 3
+        w3.eth.account.sign_transaction.return_value = MagicMock(hash=bytes.fromhex('cd' * 32), raw_transaction=b'raw')
+        receipts = {}
+
+        def get_receipt(tx_hash):
+            if tx_hash not in receipts:
+                raise TransactionNotFound(tx_hash)
+            return receipts[tx_hash]
+
+        w3.eth.get_transaction_receipt.side_effect = get_receipt
+        tracker = PendingTransactionTracker(lambda: w3, speed_up_blocks=2, fee_bump=1.125, background=False)
+        tx = {'from': self.SENDER, 'nonce': 3, 'gasPrice': 100, 'gas': 50000}
+        future = tracker.track(original, tx, '0x' + '11' * 32)
+
+        tracker.poll()
+        w3.eth.block_number = 12
+        tracker.poll()
+        signed = w3.eth.account.sign_transaction.call_args.args[0]
+        self.assertEqual((signed['nonce'], signed['gasPrice']), (3, 113))
+        w3.eth.send_raw_transaction.assert_called_once_with(b'raw')
+        self.assertEqual(tracker.status(original)['replaced_by'], replacement)
+
+        w3.eth.block_number = 13
+        receipts[replacement] = MagicMock(status=1, blockNumber=13, transactionHash=bytes.fromhex('cd' * 32))
+        self.assertEqual(tracker.poll(), 1)
+        self.assertIs(future.result(0), receipts[replacement])
+        self.assertEqual(tracker.status(original)['status'], 'replaced')
+        self.assertEqual(tracker.status(replacement)['status'], 'confirmed')
+
+    def test_transaction_whose_nonce_was_used_is_dropped(self):
+        """
+        Ensure a stuck transaction whose nonce another transaction used fails instead of being sped up.
+        """
+        w3 = MagicMock()
+        w3.eth.block_number = 10
+        w3.eth.get_transaction_count.return_value = 4
+        w3.eth.get_transaction_receipt.side_effect = TransactionNotFound('not mined')
+        w3.eth.get_transaction.side_effect = TransactionNotFound('unknown')
+        tracker = PendingTransactionTracker(lambda: w3, speed_up_blocks=2, background=False)
+        future = tracker.track('ab' * 32, {'from': self.SENDER, 'nonce': 3, 'gasPrice': 100}, '0x' + '11' * 32)
+
+        tracker.poll()
+        w3.eth.block_number = 12
+        with self.assertLogs('RealEstateBackend.tx_tracker', 'WARNING'):
+            tracker.poll()
+        with self.assertRaises(TransactionDropped):
+            future.result(0)
+        w3.eth.send_raw_transaction.assert_not_called()
+        self.assertEqual(tracker.status('0x' + 'ab' * 32)['status'], 'dropped')
+
+    def test_mined_transaction_is_not_dropped_when_nodes_disagree(self):
+        """
+        Ensure a transaction one node has mined is not dropped because another node lags behind.
+        """
+        from web3 import Web3
+
+        tx_hash = '0x' + 'ab' * 32
+        provider = FailoverHTTPProvider(['http://node-a:8545', 'http://node-b:8545'])
+        # node-a mined the transaction (nonce 3) in block 12; node-b is still at block 11
+        nodes = [
+            {'eth_blockNumber': '0xc', 'eth_getTransactionCount': '0x4', 'eth_getTransactionByHash': {'hash': tx_hash, 'nonce': '0x3', 'blockNumber': '0xc'}, 'receipt': self.raw_receipt(tx_hash, 12)},
+            {'eth_blockNumber': '0xb', 'eth_getTransactionCount': '0x3', 'eth_getTransactionByHash': None, 'receipt': None},
+        ]
+        for endpoint, node in zip(provider.endpoints, nodes):
+            endpoint.provider = MagicMock(endpoint_uri=endpoint.uri)
+            endpoint.provider.make_request.side_effect = lambda method, params, node=node: {'jsonrpc': '2.0', 'id': 0, 'result': node[method]}
+            endpoint.provider.make_batch_request.side_effect = lambda requests, node=node: [{'jsonrpc': '2.0', 'id': n, 'result': node['receipt']} for n in range(len(requests))]
+        w3 = Web3(provider)
+
+        for start in range(2):
+            tracker = PendingTransactionTracker(lambda: w3, speed_up_blocks=2, max_speed_ups=0, background=False)
+            future = tracker.track(tx_hash, {'from': self.SENDER, 'nonce': 3, 'gasPrice': 100}, '0x' + '11' * 32)
+            tracker._pending[tx_hash].first_checked_block = 0
+            provider._counter = itertools.count(start)
+            tracker.poll()
+            self.assertNotEqual((tracker.status(tx_hash) or {}).get('status'), 'dropped')
+            if future.done():
+                self.assertEqual(future.result(0).blockNumber, 12)
+
+    def test_transaction_the_node_still_knows_is_not_dropped(self):
+        """
+        Ensure a transaction whose nonce looks used is only dropped once the node does not know it.
+        """
+        w3 = MagicMock()
+        w3.eth.block_number = 12
+        w3.eth.get_transaction_count.return_value = 4
+        w3.eth.get_transaction_receipt.side_effect = TransactionNotFound('not mined')
+        w3.eth.get_transaction.return_value = MagicMock(blockNumber=12)
+        tracker = PendingTransactionTracker(lambda: w3, speed_up_blocks=2, background=False)
+        future = tracker.track('ab' * 32, {'from': self.SENDER, 'nonce': 3, 'gasPrice': 100}, '0x' + '11' * 32)
+        tracker._pending['0x' + 'ab' * 32].first_checked_block = 10
+
+        tracker.poll()
+        self.assertFalse(future.done())
+        self.assertEqual(tracker.status('ab' * 32)['status'], 'pending')
+        w3.eth.send_raw_transaction.assert_not_called()
+
+    @patch('RealEstateBackend.blockchain.w3')
+    def test_status_of_tracked_and_untracked_transactions(self, mock_w3):
+        """
+        Ensure transaction_status reports the tracker's view, falls back to the node, and counts confirmations.
+        """
+        tracker = PendingTransactionTracker(lambda: mock_w3, background=False)
+        mock_w3.eth.block_number = 20
+        with patch('RealEstateBackend.blockchain.tracker', tracker):
+            tracker.track('ab' * 32)
+            self.assertEqual(blockchain.transaction_status('ab' * 32)['status'], 'pending')
+
+            mock_w3.eth.get_transaction_receipt.return_value = MagicMock(status=1, blockNumber=18)
+            status = blockchain.transaction_status('cd' * 32)
+            self.assertEqual((status['transaction_hash'], status['status'], status['confirmations']), ('0x' + 'cd' * 32, 'confirmed', 3))
+
+            mock_w3.eth.get_transaction_receipt.side_effect = TransactionNotFound('not mined')
+            mock_w3.eth.get_transaction.side_effect = TransactionNotFound('unknown')
+            self.assertIsNone(blockchain.transaction_status('ef' * 32))
+
+
+@patch.dict(settings.DATABASES, {'replica': {}})
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def route_request(self, method):
+        seen = []
+        middleware = ReplicaReadMiddleware(lambda request: seen.append(self.router.db_for_read(None)))
+        middleware(getattr(RequestFactory(), method.lower())('/api/properties/'))
+        return seen[0]
+
+    def test_get_requests_read_from_replica(self):
+        """
+        Ensure reads in GET requests go to the replica and reads in other requests to the primary.
+        """
+        self.assertEqual(self.route_request('GET'), 'replica')
+        self.assertEqual(self.route_request('POST'), 'default')
+        # Outside a request (event listener, schedulers) everything uses the primary
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    @patch('RealEstateBackend.routers.connections')
+    def test_writes_and_transactions_use_primary(self, mock_connections):
+        """
+        Ensure writes, and reads inside a transaction on the primary, stay on the primary.
+        """
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(None), 'default')
+            mock_connections['default'].in_atomic_block = True
+            self.assertEqual(self.router.db_for_read(None), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'properties'))
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsTests(APITestCase):
+    def setUp(self):
+        from properties.models import Property
+        from users.models import CustomUser
+
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.property = Property.objects.create(seller=self.seller, price=1, location='1 Main St', description='Test', property_type='LAND')
+        self.client.force_authenticate(user=self.seller)
+
+    def scrape(self, prefix):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return next((float(line.rsplit(' ', 1)[1]) for line in response.content.decode().splitlines() if line.startswith(prefix)), 0)
+
+    def test_request_breakdown_in_server_timing_and_metrics(self):
+        """
+        Ensure each request reports its DB, RPC and serialization time in Server-Timing and /metrics.
+        """
+        count = 'http_request_duration_seconds_count{method="GET",endpoint="property-chain-status",status="200"}'
+        rpc_calls = 'http_request_rpc_calls_total{method="GET",endpoint="property-chain-status",status="200"}'
+        before = self.scrape(count), self.scrape(rpc_calls)
+
+        def chain_status(property_id):
+            # Stands in for two calls through the instrumented provider
+            metrics.record_rpc('eth_call', 0.002)
+            metrics.record_rpc('eth_call', 0.003)
+            return {'listed': True}
+
+        with patch('RealEstateBackend.blockchain.get_property_chain_status', side_effect=chain_status):
+            response = self.client.get(reverse('property-chain-status', args=[self.property.id]))
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[0-9.]+;desc="[1-9][0-9]* queries"')
+        self.assertIn('rpc;dur=5.0;desc="2 calls"', timing)
+        self.assertRegex(timing, r'serialize;dur=[0-9.]+, total;dur=[0-9.]+')
+
+        self.assertEqual(self.scrape(count), before[0] + 1)
+        self.assertEqual(self.scrape(rpc_calls), before[1] + 2)
+        self.assertGreater(self.scrape('rpc_request_duration_seconds_count{method="eth_call"}'), 1)
+
+    def test_metrics_require_token_or_staff(self):
+        """
+        Ensure /metrics is only served with the scrape token or to staff users.
+        """
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+
+        self.seller.is_staff = True
+        self.seller.save()
+        self.client.force_login(self.seller)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_slow_requests_are_logged(self):
+        """
+        Ensure requests slower than SLOW_REQUEST_THRESHOLD are logged with their breakdown.
+        """
+        with self.settings(SLOW_REQUEST_THRESHOLD=0), self.assertLogs('RealEstateBackend.metrics', 'WARNING') as logs:
+            self.client.get(reverse('property-list'))
+        self.assertIn('Slow request GET /api/properties/ (property-list)', logs.output[0])
+
+    def test_provider_reports_rpc_calls(self):
+        """
+        Ensure the failover provider reports each RPC call and batch to the metrics.
+        """
+        provider = FailoverHTTPProvider(['http://node-a:8545'])
+        provider.endpoints[0].provider = MagicMock(endpoint_uri='http://node-a:8545')
+        with patch('RealEstateBackend.rpc.metrics.record_rpc') as mock_record_rpc:
+            provider.make_request('eth_blockNumber', [])
+            provider.make_batch_request([('eth_blockNumber', []), ('eth_chainId', [])])
+        self.assertEqual([call.args[0] for call in mock_record_rpc.call_args_list], ['eth_blockNumber', 'batch'])
+        self.assertEqual(mock_record_rpc.call_args.kwargs['calls'], 2)
+
+
+
+class TransactionTracingTests(TestCase):
+    SENDER = '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266'
+
+    def setUp(self):
+        patcher = patch('RealEstateBackend.blockchain.w3')
+        self.mock_w3 = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_w3.eth.account.from_key.return_value = MagicMock(address=self.SENDER)
+        self.mock_w3.eth.get_transaction_count.return_value = 3
+        self.mock_w3.eth.send_raw_transaction.return_value = bytes.fromhex('ab' * 32)
+        patcher = patch('RealEstateBackend.blockchain.tracker')
+        self.mock_tracker = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_tracker.wait.return_value = MagicMock(
+            status=1, blockNumber=12, gasUsed=21000, transactionHash=bytes.fromhex('ab' * 32),
+        )
+        self.contract_function = MagicMock(fn_name='listProperty')
+        self.contract_function.build_transaction.side_effect = lambda params: dict(params)
+
+    def test_lifecycle_is_traced_until_indexed(self):
+        """
+        Ensure a sent transaction is saved with its build, send and mine times, and the listener closes its index stage.
+        """
+        from properties.models import TransactionTrace
+
+        def index_observations():
+            # Bucket counts, then the sum
+            return sum(metrics.tx_stage_duration._series.get(('listProperty', 'index'), [0, 0.0])[:-1])
+
+        before = index_observations()
+
+        tx_hash = blockchain._transact(self.contract_function, '0x' + '11' * 32)
+
+        trace = TransactionTrace.objects.get()
+        self.assertEqual((trace.function, trace.sender, trace.nonce, trace.transaction_hash), ('listProperty', self.SENDER, 3, tx_hash))
+        self.assertEqual((trace.status, trace.block_number, trace.gas_used), ('confirmed', 12, 21000))
+        durations = trace.durations()
+        self.assertTrue(all(durations[stage] is not None for stage in ('build', 'send', 'mine')))
+        self.assertIsNone(durations['index'])
+
+        self.assertEqual(tracing.mark_indexed([tx_hash, 'cd' * 32]), 1)
+        trace.refresh_from_db()
+        self.assertIsNotNone(trace.durations()['index'])
+        self.assertEqual(tracing.mark_indexed([tx_hash]), 0)
+        self.assertEqual(index_observations(), before + 1)
+        self.assertIn('tx_stage_duration_seconds_count{function="listProperty",stage="mine"}', metrics.exposition())
+
+    def test_failure_is_traced_with_its_stage(self):
+        """
+        Ensure a transaction the node rejects is saved as failed at the send stage, and the error is re-raised.
+        """
+        from properties.models import TransactionTrace
+
+        self.mock_w3.eth.send_raw_transaction.side_effect = ValueError('nonce too low')
+        with self.assertLogs('RealEstateBackend.tracing', 'WARNING'), self.assertRaises(ValueError):
+            blockchain._transact(self.contract_function, '0x' + '11' * 32)
+
+        trace = TransactionTrace.objects.get()
+        self.assertEqual((trace.status, trace.failed_stage, trace.error), ('failed', 'send', 'nonce too low'))
+        self.assertIsNone(trace.transaction_hash)
+
+    def test_tx_traces_command(self):
+        """
+        Ensure manage.py tx_traces reports stage percentiles per function and lists failures.
+        """
+        blockchain._transact(self.contract_function, '0x' + '11' * 32)
+        self.mock_tracker.wait.side_effect = TimeoutError('not mined in 120 seconds')
+        with self.assertLogs('RealEstateBackend.tracing', 'WARNING'), self.assertRaises(TimeoutError):
+            blockchain._transact(self.contract_function, '0x' + '11' * 32)
+
+        out = io.StringIO()
+        call_command('tx_traces', stdout=out)
+        output = out.getvalue()
+        self.assertRegex(output, r'listProperty\s+2\s+1\s+0\s+1')
+        self.assertIn('failed at mine', output)
+        self.assertIn('not mined in 120 seconds', output)
+
+
+class LocalChainBuildTests(SimpleTestCase):
+    def test_missing_artifact_is_compiled_with_hardhat(self):
+        """
+        Ensure a missing contract artifact is built with the repository's Hardhat before the chain needs it.
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        os.makedirs(os.path.join(tmp.name, 'node_modules', '.bin'))
+        open(os.path.join(tmp.name, 'node_modules', '.bin', 'hardhat'), 'w').close()
+        artifact = os.path.join(tmp.name, 'artifacts', 'contracts', 'RealEstate.sol', 'RealEstate.json')
+
+        def compile(command, **kwargs):
+            os.makedirs(os.path.dirname(artifact))
+            open(artifact, 'w').close()
+            return MagicMock(returncode=0)
+
+        with patch.object(local_chain, 'REPO_DIR', tmp.name), \
+                patch.object(local_chain.registry, 'artifact_path', return_value=artifact), \
+                patch('RealEstateBackend.local_chain.subprocess.run', side_effect=compile) as mock_run:
+            self.assertTrue(local_chain.build_artifact())
+            self.assertTrue(local_chain.build_artifact())
+        mock_run.assert_called_once()
+        self.assertEqual(mock_run.call_args.kwargs['cwd'], tmp.name)
+
+    @patch.dict(os.environ, {'REQUIRE_LOCAL_CHAIN': '1'})
+    @patch('RealEstateBackend.local_chain.unavailable_reason', return_value='the RealEstate artifact is missing')
+    def test_required_local_chain_is_not_skipped(self, mock_unavailable_reason):
+        """
+        Ensure REQUIRE_LOCAL_CHAIN turns a missing chain into an error rather than skipped tests.
+        """
+        with self.assertRaises(ImproperlyConfigured):
+            LocalChainTestMixin.setUpClass()
+
+
+class LocalChainTests(LocalChainTestMixin, TestCase):
+    def test_listing_runs_the_real_transaction_path(self):
+        """
+        Ensure a listing is signed, sent and mined on the in-process chain and its trace saved.
+        """
+        from properties.models import TransactionTrace
+
+        seller_key = self.chain.private_keys[1]
+        tx_hash = blockchain.list_property_on_blockchain(
+            seller_key, 10 ** 18, 'Chain Street', 'LAND', 100, 0, 0, self.chain.accounts[0], 0,
+        )
+        receipt = self.chain.w3.eth.get_transaction_receipt(tx_hash)
+        self.assertEqual(receipt.status, 1)
+        self.assertEqual(receipt['from'], self.chain.accounts[1])
+        self.assertEqual(self.chain.contract.functions.ownerOf(0).call(), self.chain.accounts[1])
+        trace = TransactionTrace.objects.get(transaction_hash=tx_hash)
+        self.assertEqual((trace.function, trace.status), ('listProperty', 'confirmed'))
+
+    def test_revert_undoes_transactions(self):
+        """
+        Ensure reverting to a snapshot restores the chain to the state it was taken in.
+        """
+        snapshot = self.chain.snapshot()
+        block_number = self.chain.w3.eth.block_number
+        blockchain.list_property_on_blockchain(
+            self.chain.private_keys[1], 10 ** 18, 'Chain Street', 'LAND', 100, 0, 0, self.chain.accounts[0], 0,
+        )
+        self.assertEqual(self.chain.w3.eth.block_number, block_number + 1)
+        self.chain.revert(snapshot)
+        self.assertEqual(self.chain.w3.eth.block_number, block_number)
+        self.assertEqual(self.chain.w3.eth.get_transaction_count(self.chain.accounts[1]), 0)
@@ -0,0 +1,148 @@
+import logging
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-transaction lifecycle timings for the contract calls in blockchain.py and
+# async_blockchain.py. Each stage's duration goes to the tx_stage_duration_seconds
+# histogram of the process that observed it, and every transaction is saved as
+# a properties.TransactionTrace row so `manage.py tx_traces` can report stage
+# percentiles and failures across processes. The index stage is observed by
+# listen_for_events, which calls mark_indexed() with the hashes it processed.
+
+ERROR_LENGTH = 1000
+
+
+class TransactionLifecycle:
+    """
+    Timestamps one transaction as it is built, sent and mined. Used as a
+    context manager (sync or async) around the whole sequence, it records an
+    exception as the failure and saves the trace either way.
+    """
+
+    def __init__(self, function, sender=''):
+        self.function = function
+        self.sender = sender
+        self.nonce = None
+        self.transaction_hash = None
+        self.status = None
+        self.error = ''
+        self.block_number = None
+        self.gas_used = None
+        self.started_at = timezone.now()
+        self.built_at = self.sent_at = self.mined_at = None
+
+    def built(self, tx):
+        self.built_at = timezone.now()
+        self.nonce = tx.get('nonce')
+
+    def sent(self, tx_hash):
+        self.sent_at = timezone.now()
+        self.transaction_hash = tx_hash.hex() if isinstance(tx_hash, bytes) else tx_hash
+
+    def mined(self, receipt):
+        self.mined_at = timezone.now()
+        # A sped-up transaction is mined under its replacement's hash
+        self.transaction_hash = receipt.transactionHash.hex()
+        self.status = 'confirmed' if receipt.status == 1 else 'reverted'
+        self.block_number = receipt.blockNumber
+        self.gas_used = receipt.gasUsed
+
+    def failed(self, error):
+        self.status = 'failed'
+        self.error = str(error)[:ERROR_LENGTH]
+
+    def finish(self):
+        """Record the stage durations and outcome in the metrics; returns the unsaved trace row."""
+        from properties.models import TransactionTrace
+
+        if self.status is None:
+            self.failed('Interrupted before a receipt was received')
+        trace = TransactionTrace(
+            function=self.function,
+            sender=self.sender,
+            nonce=self.nonce,
+            transaction_hash=self.transaction_hash,
+            status=self.status,
+            error=self.error,
+            block_number=self.block_number,
+            gas_used=self.gas_used,
+            started_at=self.started_at,
+            built_at=self.built_at,
+            sent_at=self.sent_at,
+            mined_at=self.mined_at,
+        )
+        for stage, seconds in trace.durations().items():
+            if seconds is not None:
+                metrics.tx_stage_duration.observe(seconds, self.function, stage)
+        metrics.tx_total.inc(1, self.function, self.status)
+        if self.status == 'failed':
+            logger.warning(
+                '%s from %s failed at the %s stage: %s',
+                self.function, self.sender or 'unknown sender', trace.failed_stage, self.error,
+            )
+        return trace
+
+    def save(self):
+        save_traces([self])
+
+    async def asave(self):
+        trace = self.finish()
+        try:
+            await trace.asave()
+        except DatabaseError:
+            logger.exception('Could not save the trace of %s %s', self.function, self.transaction_hash)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.failed(exc)
+        self.save()
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.failed(exc)
+        await self.asave()
+        return False
+
+
+def function_name(contract_function):
+    return getattr(contract_function, 'fn_name', None) or 'unknown'
+
+
+def save_traces(lifecycles):
+    """Save finished lifecycles in one insert. A trace is never worth failing the transaction over."""
+    from properties.models import TransactionTrace
+
+    traces = [lifecycle.finish() for lifecycle in lifecycles]
+    try:
+        # A savepoint, so a failed insert does not break the caller's transaction
+        with transaction.atomic():
+            TransactionTrace.objects.bulk_create(traces)
+    except DatabaseError:
+        logger.exception('Could not save %d transaction traces', len(traces))
+
+
+def mark_indexed(transaction_hashes):
+    """Close the index stage of the traced transactions whose events were just processed."""
+    from properties.models import TransactionTrace
+
+    if not transaction_hashes:
+        return 0
+    now = timezone.now()
+    pending = TransactionTrace.objects.filter(
+        transaction_hash__in=set(transaction_hashes), mined_at__isnull=False, indexed_at__isnull=True,
+    )
+    for function, mined_at in pending.values_list('function', 'mined_at'):
+        metrics.tx_stage_duration.observe((now - mined_at).total_seconds(), function, 'index')
+    return pending.update(indexed_at=now)
@@ -0,0 +1,315 @@
+import asyncio
+import concurrent.futures
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from hexbytes import HexBytes
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+from .rpc import single_node
+
+logger = logging.getLogger(__name__)
+
+# One place that waits for the receipts of every transaction this process
+# sent. Instead of each caller polling eth_getTransactionReceipt for its own
+# hash, a background thread checks eth_blockNumber and, when a block was mined
+# (or hashes were added since the last round), fetches the receipts of all
+# pending hashes in one JSON-RPC batch: one batch per block, however many
+# transactions are in flight. HTTP nodes have no new-head notifications, so
+# the block number is polled every TX_POLL_INTERVAL seconds instead.
+#
+# A transaction still not mined TX_SPEED_UP_BLOCKS blocks after it was first
+# checked is sped up: re-signed with the same nonce and its fees raised by
+# TX_FEE_BUMP. Whichever version is mined settles the wait; the others are
+# reported as replaced by it.
+
+TX_POLL_INTERVAL = float(os.environ.get('TX_POLL_INTERVAL', 1))
+TX_RECEIPT_TIMEOUT = float(os.environ.get('TX_RECEIPT_TIMEOUT', 120))
+TX_SPEED_UP_BLOCKS = int(os.environ.get('TX_SPEED_UP_BLOCKS', 10))
+# Nodes only accept a replacement that raises the fees by at least 10%
+TX_FEE_BUMP = float(os.environ.get('TX_FEE_BUMP', 1.125))
+TX_MAX_SPEED_UPS = int(os.environ.get('TX_MAX_SPEED_UPS', 3))
+# Settled hashes kept for status lookups
+TX_STATUS_HISTORY = int(os.environ.get('TX_STATUS_HISTORY', 10000))
+
+
+class TransactionDropped(TransactionNotFound):
+    """Another transaction used the nonce, so no version of this one can be mined."""
+
+
+def normalize_hash(tx_hash):
+    """Lowercase 0x-prefixed hex of a hash given as bytes, or as hex with or without the prefix."""
+    return HexBytes(tx_hash).to_0x_hex()
+
+
+def fetch_receipts(w3, tx_hashes):
+    """
+    {hash: receipt, or None while it is not mined} for tx_hashes, in a single
+    JSON-RPC batch when the provider speaks JSON-RPC (eth-tester does not, so
+    it gets one call per hash). The keys are the hashes as given.
+    """
+    from web3._utils.method_formatters import receipt_formatter
+    from web3.datastructures import AttributeDict
+    from web3.providers.base import JSONBaseProvider
+
+    if not tx_hashes:
+        return {}
+    if not isinstance(w3.provider, JSONBaseProvider):
+        receipts = {}
+        for tx_hash in tx_hashes:
+            try:
+                receipts[tx_hash] = w3.eth.get_transaction_receipt(normalize_hash(tx_hash))
+            except TransactionNotFound:
+                receipts[tx_hash] = None
+        return receipts
+
+    # Sent raw: web3's own batches fail as a whole when one receipt is missing
+    responses = w3.provider.make_batch_request([
+        ('eth_getTransactionReceipt', [normalize_hash(tx_hash)]) for tx_hash in tx_hashes
+    ])
+    if not isinstance(responses, list):
+        raise ValueError(f"Receipt batch failed: {responses.get('error', responses)}")
+    receipts = {}
+    for tx_hash, response in zip(tx_hashes, responses):
+        if response.get('error'):
+            logger.warning('Receipt of %s failed in the batch: %s', tx_hash, response['error'])
+        result = response.get('result')
+        receipts[tx_hash] = AttributeDict.recursive(receipt_formatter(result)) if result else None
+    return receipts
+
+
+def bump_fees(tx, gas_price, bump=TX_FEE_BUMP):
+    """A copy of tx with its fees raised by bump, and at least to the current gas price."""
+    tx = dict(tx)
+    if 'maxFeePerGas' in tx:
+        tx['maxPriorityFeePerGas'] = math.ceil(tx['maxPriorityFeePerGas'] * bump)
+        tx['maxFeePerGas'] = max(math.ceil(tx['maxFeePerGas'] * bump), gas_price + tx['maxPriorityFeePerGas'])
+    else:
+        tx['gasPrice'] = max(math.ceil(tx['gasPrice'] * bump), gas_price)
+    return tx
+
+
+class TrackedTransaction:
+    """One transaction waited for: every hash it was sent as, oldest first."""
+
+    def __init__(self, tx_hash, tx=None, private_key=None):
+        self.hashes = [tx_hash]
+        # The signed fields and key are only needed to speed it up
+        self.tx = tx
+        self.private_key = private_key
+        self.future = concurrent.futures.Future()
+        self.first_checked_block = None
+        self.speed_ups = 0
+
+    @property
+    def can_speed_up(self):
+        return self.tx is not None and self.private_key is not None and 'nonce' in self.tx
+
+
+class PendingTransactionTracker:
+    """
+    Receipts of in-flight transactions, polled together. get_w3 returns the
+    client to poll with, looked up on every round. With background=False no
+    thread is started and poll() is called by the owner.
+    """
+
+    def __init__(self, get_w3, poll_interval=TX_POLL_INTERVAL, speed_up_blocks=TX_SPEED_UP_BLOCKS,
+                 fee_bump=TX_FEE_BUMP, max_speed_ups=TX_MAX_SPEED_UPS, history=TX_STATUS_HISTORY, background=True):
+        self._get_w3 = get_w3
+        self.poll_interval = poll_interval
+        self.speed_up_blocks = speed_up_blocks
+        self.fee_bump = fee_bump
+        self.max_speed_ups = max_speed_ups
+        self.history = history
+        self.background = background
+        # Every hash of every pending transaction, replacements included
+        self._pending = {}
+        self._settled = OrderedDict()
+        self._last_block = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def track(self, tx_hash, tx=None, private_key=None):
+        """Start waiting for tx_hash; returns a Future resolved with the receipt of whichever version is mined."""
+        tx_hash = normalize_hash(tx_hash)
+        with self._lock:
+            tracked = self._pending.get(tx_hash)
+            if tracked is None:
+                tracked = self._pending[tx_hash] = TrackedTransaction(tx_hash, tx, private_key)
+            if self.background and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='tx-tracker', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return tracked.future
+
+    def wait(self, tx_hash, tx=None, private_key=None, timeout=TX_RECEIPT_TIMEOUT):
+        """Block until tx_hash, or its speed-up, is mined and return the receipt."""
+        future = self.track(tx_hash, tx, private_key)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.forget(tx_hash)
+            raise TimeExhausted(f'Transaction {normalize_hash(tx_hash)} is not in the chain after {timeout} seconds')
+
+    async def wait_async(self, tx_hash, tx=None, private_key=None, timeout=TX_RECEIPT_TIMEOUT):
+        future = asyncio.wrap_future(self.track(tx_hash, tx, private_key))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.forget(tx_hash)
+            raise TimeExhausted(f'Transaction {normalize_hash(tx_hash)} is not in the chain after {timeout} seconds')
+
+    def forget(self, tx_hash):
+        """Stop polling for tx_hash and its other versions."""
+        with self._lock:
+            tracked = self._pending.get(normalize_hash(tx_hash))
+            for other in tracked.hashes if tracked else ():
+                self._pending.pop(other, None)
+
+    def status(self, tx_hash):
+        """
+        {'transaction_hash', 'status', 'block_number', 'replaced_by'} for a hash
+        the tracker is waiting for or settled recently, else None. status is
+        pending, confirmed, reverted, replaced or dropped.
+        """
+        tx_hash = normalize_hash(tx_hash)
+        with self._lock:
+            tracked = self._pending.get(tx_hash)
+            if tracked is not None:
+                latest = tracked.hashes[-1]
+                return {
+                    'transaction_hash': tx_hash,
+                    'status': 'pending',
+                    'block_number': None,
+                    'replaced_by': latest if latest != tx_hash else None,
+                }
+            settled = self._settled.get(tx_hash)
+            return dict(settled) if settled else None
+
+    def poll(self):
+        """One round: a receipts batch if a block was mined or hashes were added. Returns how many settled."""
+        w3 = self._get_w3()
+        with self._lock:
+            tracked_list = list({id(tracked): tracked for tracked in self._pending.values()}.values())
+        if not tracked_list:
+            return 0
+        # All from one node: from nodes at different heights a mined
+        # transaction could look like its nonce was taken
+        with single_node(w3):
+            block = w3.eth.block_number
+            added = any(tracked.first_checked_block is None for tracked in tracked_list)
+            if block == self._last_block and not added:
+                return 0
+            self._last_block = block
+
+            stuck = [
+                tracked for tracked in tracked_list
+                if tracked.first_checked_block is not None and block - tracked.first_checked_block >= self.speed_up_blocks
+            ]
+            # Read before the receipts: a nonce already used then, by a transaction
+            # that has no receipt now, was used by another transaction
+            senders = {tracked.tx['from'] for tracked in stuck if tracked.can_speed_up}
+            mined_nonces = {sender: w3.eth.get_transaction_count(sender) for sender in senders}
+
+            receipts = fetch_receipts(w3, [tx_hash for tracked in tracked_list for tx_hash in tracked.hashes])
+        settled = 0
+        for tracked in tracked_list:
+            receipt = next((receipts[tx_hash] for tx_hash in tracked.hashes if receipts.get(tx_hash)), None)
+            if receipt is not None:
+                self._settle(tracked, receipt)
+                settled += 1
+            elif tracked.first_checked_block is None:
+                tracked.first_checked_block = block
+            elif tracked in stuck and tracked.can_speed_up:
+                if mined_nonces[tracked.tx['from']] > tracked.tx['nonce']:
+                    # Checked again on its own: dropped is final for the client
+                    if not self._known(w3, tracked):
+                        self._drop(tracked)
+                else:
+                    self._speed_up(w3, tracked, block)
+        return settled
+
+    @staticmethod
+    def _known(w3, tracked):
+        """Whether the node knows any version of tracked, pending or mined."""
+        for tx_hash in tracked.hashes:
+            try:
+                w3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                continue
+            return True
+        return False
+
+    def _speed_up(self, w3, tracked, block):
+        if tracked.speed_ups >= self.max_speed_ups:
+            return
+        tx = bump_fees(tracked.tx, w3.eth.gas_price, self.fee_bump)
+        signed_tx = w3.eth.account.sign_transaction(tx, private_key=tracked.private_key)
+        # Counted from now whether or not the node takes it, so a failing speed-up is retried later
+        tracked.first_checked_block = block
+        try:
+            w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Exception as e:
+            logger.warning('Could not speed up %s: %s', tracked.hashes[-1], e)
+            return
+        tx_hash = normalize_hash(signed_tx.hash)
+        logger.info('Sped up %s as %s after %s blocks', tracked.hashes[-1], tx_hash, self.speed_up_blocks)
+        tracked.tx = tx
+        tracked.speed_ups += 1
+        with self._lock:
+            tracked.hashes.append(tx_hash)
+            self._pending[tx_hash] = tracked
+
+    def _settle(self, tracked, receipt):
+        mined_hash = normalize_hash(receipt.transactionHash)
+        mined_status = 'confirmed' if receipt.status == 1 else 'reverted'
+        self._close(tracked, lambda tx_hash: {
+            'transaction_hash': tx_hash,
+            'status': mined_status if tx_hash == mined_hash else 'replaced',
+            'block_number': receipt.blockNumber,
+            'replaced_by': mined_hash if tx_hash != mined_hash else None,
+        })
+        self._resolve(tracked.future.set_result, receipt)
+
+    def _drop(self, tracked):
+        logger.warning('Nonce %s of %s was used by another transaction; %s will not be mined', tracked.tx['nonce'], tracked.tx['from'], tracked.hashes[-1])
+        self._close(tracked, lambda tx_hash: {
+            'transaction_hash': tx_hash, 'status': 'dropped', 'block_number': None, 'replaced_by': None,
+        })
+        self._resolve(tracked.future.set_exception, TransactionDropped(
+            f"Nonce {tracked.tx['nonce']} of {tracked.tx['from']} was used by another transaction"
+        ))
+
+    def _close(self, tracked, describe):
+        with self._lock:
+            for tx_hash in tracked.hashes:
+                self._pending.pop(tx_hash, None)
+                self._settled[tx_hash] = describe(tx_hash)
+                self._settled.move_to_end(tx_hash)
+            while len(self._settled) > self.history:
+                self._settled.popitem(last=False)
+
+    @staticmethod
+    def _resolve(set_outcome, outcome):
+        try:
+            set_outcome(outcome)
+        except concurrent.futures.InvalidStateError:
+            # The waiter gave up and cancelled the future
+            pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Polling transaction receipts failed')
+            self._wake.wait(self.poll_interval)
@@ -17,12 +17,14 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework.authtoken import views
+from users.views import ThrottledObtainAuthToken
+from .metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('api/', include('users.urls')), 
     path('api/', include('properties.urls')),
-    path('api-token-auth/', views.obtain_auth_token, name='api-token-auth')
+    path('api-token-auth/', ThrottledObtainAuthToken.as_view(), name='api-token-auth'),
+    path('metrics', metrics_view, name='metrics'),
 ]
   
\ No newline at end of file
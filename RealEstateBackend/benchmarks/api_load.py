@@ -0,0 +1,219 @@
+"""
+Load test of the DRF endpoints against a production-scale fixture.
+
+Builds (or reuses) a fixture database with benchmarks.fixtures, serves a copy
+of it with gunicorn and the chain calls mocked (benchmarks.mocked_chain_wsgi),
+and drives each scenario with concurrent clients:
+
+* list    GET  /api/properties/
+* detail  GET  /api/properties/<random id>/
+* create  POST /api/properties/             (listProperty mocked)
+* accept  POST /api/offers/<id>/accept/     (acceptOffer mocked; a different property each time)
+
+Reports throughput and p50/p95/p99 latency per scenario. Every run is
+appended to .cache/benchmarks/api_load.jsonl with the commit it measured, and
+compared with the latest run of another commit on the same fixture (or the
+one given with --compare).
+
+    cd RealEstateBackend
+    python -m benchmarks.fixtures --users 100000 --properties 1000000   # once, takes minutes
+    python -m benchmarks.api_load --properties 1000000 --requests 2000 --concurrency 50
+
+Requires gunicorn. Note that the property list is not paginated, so on a large
+fixture each list request serializes every property; lower its share with
+--list-requests.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from .common import BACKEND_DIR, free_port, print_table, setup_django, summarize, wait_for_port
+from .fixtures import ACCEPT_POOL, FIXTURE_DIR, ensure_fixture, use_database, working_copy
+
+RESULTS_FILE = os.path.join(FIXTURE_DIR, 'api_load.jsonl')
+SCENARIOS = ['list', 'detail', 'create', 'accept']
+EXPECTED_STATUS = {'list': 200, 'detail': 200, 'create': 201, 'accept': 200}
+
+
+def load_actors():
+    """Tokens of the actor users and one active offer per property in the seller's accept pool."""
+    setup_django()
+    from rest_framework.authtoken.models import Token
+    from properties.models import Offer
+
+    tokens = dict(Token.objects.filter(user__username__in=['bench-seller', 'bench-buyer']).values_list('user__username', 'key'))
+    offers = {}
+    for offer_id, property_id in Offer.objects.filter(
+        property__seller__username='bench-seller', property__is_sold=False, is_active=True,
+    ).order_by('pk').values_list('pk', 'property_id'):
+        offers.setdefault(property_id, offer_id)
+    return tokens, list(offers.values())
+
+
+def scenario_requests(name, total, properties, tokens, offer_ids, rng):
+    seller = {'Authorization': f"Token {tokens['bench-seller']}"}
+    buyer = {'Authorization': f"Token {tokens['bench-buyer']}"}
+    for n in range(total):
+        if name == 'list':
+            yield 'GET', '/api/properties/', buyer, None
+        elif name == 'detail':
+            yield 'GET', f'/api/properties/{rng.randint(1, properties)}/', buyer, None
+        elif name == 'create':
+            yield 'POST', '/api/properties/', seller, {
+                'price': f'{rng.randrange(50, 5000) / 10}',
+                'location': f'Load test listing {n}',
+                'description': 'Created by benchmarks.api_load',
+                'property_type': 'RESIDENTIAL',
+                'area': 120,
+                'bedrooms': 3,
+                'bathrooms': 2,
+            }
+        elif name == 'accept':
+            yield 'POST', f'/api/offers/{offer_ids[n]}/accept/', seller, None
+
+
+async def drive(base_url, requests, concurrency, expected_status):
+    latencies = []
+    errors = 0
+    pending = iter(requests)
+
+    async def worker(session):
+        nonlocal errors
+        for method, path, headers, body in pending:
+            started = time.perf_counter()
+            try:
+                async with session.request(method, base_url + path, headers=headers, json=body) as response:
+                    await response.read()
+                    if response.status != expected_status:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=600)) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed, errors
+
+
+def current_commit():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    return git('rev-parse', '--short', 'HEAD') or 'unknown', bool(git('status', '--porcelain', '--untracked-files=no'))
+
+
+def previous_run(record, compare):
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    with open(RESULTS_FILE) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    same_setup = [run for run in runs if run['fixture'] == record['fixture'] and run['concurrency'] == record['concurrency']]
+    if compare:
+        matches = [run for run in same_setup if run['commit'].startswith(compare)]
+    else:
+        matches = [run for run in same_setup if run['commit'] != record['commit']]
+    return matches[-1] if matches else None
+
+
+def print_comparison(record, previous):
+    before = {row['name']: row for row in previous['rows']}
+    print(f"\nCompared with {previous['commit']}{' (dirty)' if previous['dirty'] else ''} run at {previous['timestamp']}:")
+    print(f"{'benchmark':<40} {'req/s':>9} {'change':>8} {'p95 ms':>9} {'change':>8}")
+    for row in record['rows']:
+        old = before.get(row['name'])
+        if old is None:
+            continue
+        throughput_change = (row['throughput'] / old['throughput'] - 1) * 100 if old['throughput'] else 0.0
+        p95_change = (row['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0.0
+        print(f"{row['name']:<40} {row['throughput']:>9.1f} {throughput_change:>+7.1f}% {row['p95_ms']:>9.1f} {p95_change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--properties', type=int, default=100000)
+    parser.add_argument('--offers-per-property', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario')
+    parser.add_argument('--list-requests', type=int, help='requests for the list scenario (default: --requests)')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gunicorn worker')
+    parser.add_argument('--chain-latency', type=float, default=0, help='milliseconds each mocked chain call takes')
+    parser.add_argument('--compare', help='commit to compare with (default: the latest run of another commit)')
+    parser.add_argument('--no-save', action='store_true', help='do not record this run in the results file')
+    args = parser.parse_args()
+
+    fixture = ensure_fixture(args.users, args.properties, args.offers_per_property, args.seed)
+    database = working_copy(fixture, 'api_load')
+    use_database(database)
+    tokens, offer_ids = load_actors()
+    requests_per_scenario = {name: args.requests for name in args.scenarios}
+    if 'list' in requests_per_scenario and args.list_requests is not None:
+        requests_per_scenario['list'] = args.list_requests
+    if 'accept' in requests_per_scenario and requests_per_scenario['accept'] > len(offer_ids):
+        print(f'Only {len(offer_ids)} offers can be accepted on this fixture (ACCEPT_POOL={ACCEPT_POOL})')
+        requests_per_scenario['accept'] = len(offer_ids)
+
+    port = free_port()
+    env = dict(os.environ, BENCHMARK_CHAIN_LATENCY=str(args.chain_latency / 1000))
+    command = [
+        sys.executable, '-m', 'gunicorn', 'benchmarks.mocked_chain_wsgi:application', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(args.workers), '--threads', str(args.threads), '--timeout', '600',
+    ]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    rows = []
+    rng = random.Random(args.seed)
+    try:
+        wait_for_port(port)
+        base_url = f'http://127.0.0.1:{port}'
+        warm_up = list(scenario_requests('detail', args.concurrency, args.properties, tokens, offer_ids, rng))
+        asyncio.run(drive(base_url, warm_up, args.concurrency, 200))
+        for name, total in requests_per_scenario.items():
+            requests = list(scenario_requests(name, total, args.properties, tokens, offer_ids, rng))
+            rows.append(summarize(name, *asyncio.run(drive(base_url, requests, args.concurrency, EXPECTED_STATUS[name]))))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f'Fixture: {args.users} users, {args.properties} properties, {args.offers_per_property} offers each; '
+        f'gunicorn {args.workers}x{args.threads}, concurrency {args.concurrency}, chain calls {args.chain_latency:.0f} ms'
+    )
+    print_table(rows)
+
+    commit, dirty = current_commit()
+    record = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'fixture': os.path.basename(fixture),
+        'concurrency': args.concurrency,
+        'workers': args.workers,
+        'threads': args.threads,
+        'chain_latency_ms': args.chain_latency,
+        'rows': rows,
+    }
+    previous = previous_run(record, args.compare)
+    if previous:
+        print_comparison(record, previous)
+    elif args.compare:
+        print(f'\nNo stored run of {args.compare} on this fixture to compare with.')
+    if not args.no_save:
+        with open(RESULTS_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Production-scale fixture databases for the benchmarks.
+
+A fixture is a SQLite file under .cache/benchmarks/ named after its sizes and
+random seed, built once with bulk inserts and reused by later runs, so two
+commits are always measured against identical data. Benchmarks that write
+work on a copy (see `working_copy`).
+
+    cd RealEstateBackend
+    python -m benchmarks.fixtures --users 100000 --properties 1000000 --offers-per-property 2
+
+The first users are the benchmark actors: user 1 is a seller ("bench-seller")
+who owns the first ACCEPT_POOL properties, each unsold with an active offer,
+and user 2 is a buyer ("bench-buyer"). Both have tokens and eth addresses.
+"""
+import argparse
+import datetime
+import os
+import random
+import shutil
+import time
+
+from .common import BACKEND_DIR
+
+FIXTURE_DIR = os.path.join(BACKEND_DIR, '.cache', 'benchmarks')
+PASSWORD = 'benchmark-password'
+ACCEPT_POOL = 5000
+BATCH_SIZE = 10000
+ETHER = 10 ** 18
+
+# Share of each user type after the two actors
+USER_TYPES = [('buyer', 0.7), ('seller', 0.2), ('appraiser', 0.05), ('inspector', 0.05)]
+PROPERTY_TYPES = ['RESIDENTIAL', 'COMMERCIAL', 'LAND', 'APARTMENT', 'OFFICE']
+SOLD_SHARE = 0.1
+
+
+def fixture_path(users, properties, offers_per_property, seed):
+    return os.path.join(FIXTURE_DIR, f'fixture-u{users}-p{properties}-o{offers_per_property}-s{seed}.sqlite3')
+
+
+def use_database(path):
+    """Point Django at the SQLite file at path; call before setup_django()."""
+    os.environ['DB_ENGINE'] = 'sqlite'
+    os.environ['DB_NAME'] = path
+
+
+def working_copy(path, name):
+    """A fresh copy of the fixture at path that a benchmark may modify."""
+    copy = os.path.join(FIXTURE_DIR, f'{name}.sqlite3')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(copy + suffix):
+            os.remove(copy + suffix)
+    shutil.copyfile(path, copy)
+    return copy
+
+
+def eth_address(user_id):
+    return '0x' + format(user_id, '040x')
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(model, columns, rows):
+    """
+    INSERT rows, tuples in `columns` order, with executemany: no model
+    instances and no per-batch SQL compilation, which is what makes
+    bulk_create too slow for a million rows. Omitted columns are NULL.
+    """
+    from django.db import connection, models
+
+    fields = [model._meta.get_field(name) for name in columns]
+    # Integers, strings and booleans are stored as given; other fields convert their values
+    raw = (models.IntegerField, models.CharField, models.TextField, models.BooleanField, models.ForeignKey)
+    prepare = [
+        None if isinstance(field, raw) else (lambda value, field=field: field.get_db_prep_save(value, connection))
+        for field in fields
+    ]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(quote(field.column) for field in fields), ', '.join(['%s'] * len(fields)),
+    )
+    count = 0
+    with connection.cursor() as cursor:
+        for batch in _batches(rows):
+            if any(prepare):
+                batch = [tuple(value if convert is None else convert(value) for convert, value in zip(prepare, row)) for row in batch]
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def build(users, properties, offers_per_property, seed):
+    """Create the tables and rows of a fixture in the configured (empty) database."""
+    import io
+
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+    from django.db import connection, transaction
+    from rest_framework.authtoken.models import Token
+    from properties.models import Offer, Property, Transaction
+    from users.models import CustomUser, UserProfile
+
+    if users < 3 + offers_per_property:
+        raise SystemExit(f'--users must be at least {3 + offers_per_property}')
+    rng = random.Random(seed)
+    call_command('migrate', verbosity=0)
+    with connection.cursor() as cursor:
+        # Nothing to protect while building a throwaway file
+        cursor.execute('PRAGMA synchronous=OFF')
+
+    user_types = ['seller', 'buyer']
+    for user_type, share in USER_TYPES:
+        user_types.extend([user_type] * round(share * (users - 2)))
+    user_types = (user_types + ['buyer'] * users)[:users]
+    names = {1: 'bench-seller', 2: 'bench-buyer'}
+    by_type = {}
+    for user_id, user_type in enumerate(user_types, start=1):
+        by_type.setdefault(user_type, []).append(user_id)
+    sellers, buyers = by_type['seller'], by_type['buyer']
+
+    # Hashing is the slow part of creating users; every fixture user shares one hash
+    password = make_password(PASSWORD)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    expires_at = now + datetime.timedelta(days=30)
+    timings = []
+
+    def timed(label, model, columns, rows):
+        started = time.perf_counter()
+        count = _insert(model, columns, rows)
+        timings.append(f'{label} {count} in {time.perf_counter() - started:.1f} s')
+
+    with transaction.atomic():
+        timed('users', CustomUser, (
+            'id', 'username', 'password', 'user_type', 'first_name', 'last_name', 'email',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        ), (
+            (user_id, names.get(user_id, f'user{user_id}'), password, user_type, '', '', '', False, False, True, now)
+            for user_id, user_type in enumerate(user_types, start=1)
+        ))
+        timed('profiles', UserProfile, ('user', 'eth_address'), ((user_id, eth_address(user_id)) for user_id in range(1, users + 1)))
+        Token.objects.bulk_create([Token(key=Token.generate_key(), user_id=user_id) for user_id in names])
+
+        sold = []
+
+        def property_rows():
+            for property_id in range(1, properties + 1):
+                in_pool = property_id <= ACCEPT_POOL
+                is_sold = not in_pool and rng.random() < SOLD_SHARE
+                seller_id = 1 if in_pool else rng.choice(sellers)
+                buyer_id = rng.choice(buyers[1:]) if is_sold else None
+                price = rng.randrange(50, 5000) * ETHER // 10
+                if is_sold:
+                    sold.append((property_id, seller_id, buyer_id, price))
+                yield (
+                    property_id, seller_id, price, f'{property_id} Benchmark Street', 'Benchmark fixture',
+                    not is_sold, is_sold, buyer_id, price if is_sold else None, False, False, now,
+                    rng.choice(PROPERTY_TYPES), rng.randrange(30, 500), rng.randrange(0, 6), rng.randrange(1, 4), 2,
+                )
+
+        timed('properties', Property, (
+            'id', 'seller', 'price', 'location', 'description', 'is_listed', 'is_sold', 'buyer', 'offer_amount',
+            'is_inspection_passed', 'financing_approved', 'listed_at', 'property_type', 'area', 'bedrooms',
+            'bathrooms', 'agent_commission',
+        ), property_rows())
+        timed('transactions', Transaction, ('property', 'seller', 'buyer', 'price', 'timestamp'), (
+            (property_id, seller_id, buyer_id, price, now) for property_id, seller_id, buyer_id, price in sold
+        ))
+
+        def offer_rows():
+            for property_id in range(1, properties + 1):
+                # Distinct buyers, never the actor buyer, so the actor's offers are only the ones it makes
+                for buyer_id in rng.sample(buyers[1:], offers_per_property):
+                    yield (property_id, buyer_id, rng.randrange(50, 5000) * ETHER // 10, now, True, expires_at)
+
+        timed('offers', Offer, ('property', 'buyer', 'amount', 'timestamp', 'is_active', 'expires_at'), offer_rows())
+
+    started = time.perf_counter()
+    call_command('rebuild_analytics', stdout=io.StringIO())
+    timings.append(f'analytics in {time.perf_counter() - started:.1f} s')
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return timings
+
+
+def ensure_fixture(users, properties, offers_per_property, seed):
+    """Path of the fixture, building it in a separate process first if it does not exist yet."""
+    import subprocess
+    import sys
+
+    path = fixture_path(users, properties, offers_per_property, seed)
+    if not os.path.exists(path):
+        subprocess.run([
+            sys.executable, '-m', 'benchmarks.fixtures', '--users', str(users), '--properties', str(properties),
+            '--offers-per-property', str(offers_per_property), '--seed', str(seed),
+        ], cwd=BACKEND_DIR, check=True)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--properties', type=int, default=100000)
+    parser.add_argument('--offers-per-property', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--force', action='store_true', help='rebuild the fixture if it exists')
+    args = parser.parse_args()
+
+    path = fixture_path(args.users, args.properties, args.offers_per_property, args.seed)
+    if os.path.exists(path) and not args.force:
+        print(f'{path} already exists (use --force to rebuild)')
+        return
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    building = path + '.building'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(building + suffix):
+            os.remove(building + suffix)
+    use_database(building)
+
+    from .common import setup_django
+    setup_django()
+    from django.db import connection
+
+    started = time.perf_counter()
+    for line in build(args.users, args.properties, args.offers_per_property, args.seed):
+        print(line)
+    connection.close()
+    os.replace(building, path)
+    print(f'Built {path} in {time.perf_counter() - started:.0f} s')
+
+
+if __name__ == '__main__':
+    main()
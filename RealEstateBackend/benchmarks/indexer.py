@@ -0,0 +1,174 @@
+"""
+Throughput of `manage.py listen_for_events` against an in-process chain.
+
+Deploys RealEstate to eth-tester (py-evm), then generates market activity:
+
+* --listings listProperty calls
+* --offers-per-listing offers on each listing, from different buyers
+* acceptOffer (the sale: the NFT moves to the buyer) on --accept-ratio of the listings
+* updatePropertyPrice on --price-update-ratio of the listings that are not sold
+
+and times the listener over the whole block range: once on an empty database
+(inserts) and once replaying the same range (updates of existing rows). For
+each pass it reports events/sec, database queries per event and RPC calls per
+event, with the RPC methods that were called.
+
+    cd RealEstateBackend
+    python -m benchmarks.indexer --listings 200 --offers-per-listing 3
+
+Requires eth-tester[py-evm] and the compiled contract artifact
+(`npx hardhat compile`). The listener writes to a throwaway test database,
+never to db.sqlite3.
+"""
+import argparse
+import collections
+import io
+import logging
+import os
+import tempfile
+import time
+from unittest import mock
+
+from .common import setup_django
+
+ETHER = 10 ** 18
+OFFER_EXPIRY = 7 * 24 * 3600
+INDEXED_EVENTS = ('PropertyListed', 'OfferAccepted', 'PropertySold', 'PriceUpdated')
+
+
+def counting_provider():
+    from web3 import EthereumTesterProvider
+
+    class CountingProvider(EthereumTesterProvider):
+        """Counts JSON-RPC calls by method, as the listener would send them to a node."""
+
+        def __init__(self):
+            super().__init__()
+            self.calls = collections.Counter()
+
+        def make_request(self, method, params):
+            self.calls[method] += 1
+            return super().make_request(method, params)
+
+    return CountingProvider()
+
+
+def generate(w3, contract, args):
+    """Send the market activity; returns the number of transactions sent."""
+    owner, seller, *buyers = w3.eth.accounts
+    if args.offers_per_listing > len(buyers):
+        raise SystemExit(f'--offers-per-listing is at most {len(buyers)} (one offer per buyer account)')
+    functions = contract.functions
+    sent = 0
+
+    def send(call, sender, value=0):
+        nonlocal sent
+        call.transact({'from': sender, 'value': value})
+        sent += 1
+
+    # Property ids count up from 0 on a fresh deployment
+    property_ids = range(args.listings)
+    for property_id in property_ids:
+        send(functions.listProperty(100 * ETHER, f'{property_id} Benchmark Street', 0, 120, 3, 2, owner, 100), seller)
+
+    for property_id in property_ids:
+        for buyer in buyers[:args.offers_per_listing]:
+            send(functions.submitOffer(property_id, OFFER_EXPIRY), buyer, value=ETHER)
+
+    sold = int(args.listings * args.accept_ratio) if args.offers_per_listing else 0
+    for property_id in property_ids[:sold]:
+        send(functions.acceptOffer(property_id, buyers[0]), seller)
+    unsold = property_ids[sold:]
+    for property_id in unsold[:int(len(unsold) * args.price_update_ratio)]:
+        send(functions.updatePropertyPrice(property_id, 95 * ETHER), seller)
+    return sent
+
+
+def seed_users(accounts):
+    from users.models import CustomUser, UserProfile
+
+    owner, seller, *buyers = accounts
+    for username, user_type, address in [('bench-seller', 'seller', seller)] + [
+        (f'bench-buyer-{n}', 'buyer', address) for n, address in enumerate(buyers)
+    ]:
+        user = CustomUser.objects.create_user(username=username, password=None, user_type=user_type)
+        UserProfile.objects.create(user=user, eth_address=address)
+
+
+def run_listener(provider, last_block_file):
+    from django.core.management import call_command
+    from django.db import connection
+
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with open(last_block_file, 'w') as f:
+        f.write('0')
+    provider.calls.clear()
+    out = io.StringIO()
+    with connection.execute_wrapper(count_queries):
+        started = time.perf_counter()
+        call_command('listen_for_events', stdout=out, stderr=out)
+        elapsed = time.perf_counter() - started
+    if 'Successfully processed' not in out.getvalue():
+        raise SystemExit('listen_for_events failed:\n' + out.getvalue()[-2000:])
+    return elapsed, queries, collections.Counter(provider.calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listings', type=int, default=200)
+    parser.add_argument('--offers-per-listing', type=int, default=3)
+    parser.add_argument('--accept-ratio', type=float, default=0.5, help='share of listings sold with acceptOffer')
+    parser.add_argument('--price-update-ratio', type=float, default=0.5, help='share of unsold listings with a price update')
+    args = parser.parse_args()
+
+    setup_django()
+    logging.getLogger('RealEstateBackend').setLevel(logging.ERROR)
+    from django.db import connection
+    from web3 import Web3
+    from RealEstateBackend.local_chain import allow_large_contracts, deploy
+    from properties.management.commands import listen_for_events
+
+    allow_large_contracts()
+    provider = counting_provider()
+    w3 = Web3(provider)
+    contract = deploy(w3)
+
+    started = time.perf_counter()
+    transactions = generate(w3, contract, args)
+    generate_time = time.perf_counter() - started
+    last_block = w3.eth.block_number
+    events = sum(len(getattr(contract.events, name).get_logs(from_block=0, to_block=last_block)) for name in INDEXED_EVENTS)
+    print(f'Generated {transactions} transactions in {last_block} blocks ({generate_time:.1f} s); {events} events for the listener')
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        seed_users(w3.eth.accounts)
+        with tempfile.TemporaryDirectory() as tmp:
+            last_block_file = os.path.join(tmp, 'last_processed_block.txt')
+            with mock.patch.object(listen_for_events, 'w3', w3), \
+                    mock.patch.object(listen_for_events, 'get_contract', lambda w3: contract), \
+                    mock.patch.object(listen_for_events, 'LAST_PROCESSED_BLOCK_FILE', last_block_file):
+                passes = [('empty database', run_listener(provider, last_block_file)), ('replay', run_listener(provider, last_block_file))]
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print(f"{'pass':<16} {'events':>7} {'seconds':>8} {'events/s':>9} {'queries/event':>14} {'rpc/event':>10}")
+    for name, (elapsed, queries, calls) in passes:
+        rpc_calls = sum(calls.values())
+        print(
+            f'{name:<16} {events:>7} {elapsed:>8.2f} {events / elapsed:>9.1f} '
+            f'{queries / max(events, 1):>14.2f} {rpc_calls / max(events, 1):>10.2f}'
+        )
+    print()
+    print('RPC calls per pass: ' + ', '.join(f'{method} {count}' for method, count in passes[0][1][2].most_common()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Cost of POST /api/login/ per core, for each available password hasher.
+
+For every hasher (PBKDF2 always; Argon2 when argon2-cffi is installed) this
+measures, in a single thread:
+
+* the time to hash and to verify one password
+* logins/sec for correct passwords, for wrong passwords under the failure
+  limit, and for wrong passwords once the username is throttled
+
+    cd RealEstateBackend
+    python -m benchmarks.login --requests 50
+
+Seeds a `benchmark-login` user into the configured database.
+"""
+import argparse
+import importlib.util
+import logging
+import statistics
+import time
+
+from .common import print_table, setup_django, summarize
+
+HASHERS = {
+    'pbkdf2': ('django.contrib.auth.hashers.PBKDF2PasswordHasher', None),
+    'argon2': ('users.hashers.Argon2PasswordHasher', 'argon2'),
+}
+PASSWORD = 'benchmark-password'
+
+
+def available_hashers(names):
+    for name in names:
+        path, module = HASHERS[name]
+        if module is None or importlib.util.find_spec(module):
+            yield name, path
+        else:
+            print(f'Skipping {name}: {module} is not installed')
+
+
+def hash_cost(runs):
+    from django.contrib.auth.hashers import check_password, make_password
+
+    hash_times, check_times = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        encoded = make_password(PASSWORD)
+        hash_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        check_password(PASSWORD, encoded)
+        check_times.append(time.perf_counter() - started)
+    return statistics.median(hash_times), statistics.median(check_times)
+
+
+def drive(client, password, total, expected_status):
+    from django.core.cache import cache
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(total):
+        request_started = time.perf_counter()
+        response = client.post('/api/login/', {'username': 'benchmark-login', 'password': password}, content_type='application/json')
+        latencies.append(time.perf_counter() - request_started)
+        if response.status_code != expected_status:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    cache.clear()
+    return latencies, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50, help='logins per scenario')
+    parser.add_argument('--hash-runs', type=int, default=10)
+    parser.add_argument('--hashers', nargs='+', choices=sorted(HASHERS), default=sorted(HASHERS, reverse=True))
+    args = parser.parse_args()
+
+    setup_django()
+    logging.getLogger('django.request').setLevel(logging.ERROR)  # 400/429 responses are expected
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from users.models import CustomUser
+
+    client = Client(HTTP_HOST='localhost')
+    costs, rows = [], []
+    for name, path in available_hashers(args.hashers):
+        with override_settings(PASSWORD_HASHERS=[path]):
+            costs.append((name, *hash_cost(args.hash_runs)))
+
+            user, _ = CustomUser.objects.get_or_create(username='benchmark-login', defaults={'user_type': 'buyer'})
+            user.set_password(PASSWORD)
+            user.save()
+            cache.clear()
+
+            rows.append(summarize(f'{name}: success', *drive(client, PASSWORD, args.requests, 200)))
+            with override_settings(LOGIN_FAILURE_LIMIT_PER_USER=args.requests + 1, LOGIN_FAILURE_LIMIT_PER_IP=args.requests + 1):
+                rows.append(summarize(f'{name}: wrong password', *drive(client, 'wrong', args.requests, 400)))
+            with override_settings(LOGIN_FAILURE_LIMIT_PER_USER=0):
+                rows.append(summarize(f'{name}: wrong password, throttled', *drive(client, 'wrong', args.requests, 429)))
+
+    print(f"{'hasher':<10} {'hash ms':>9} {'verify ms':>10}")
+    for name, hash_time, check_time in costs:
+        print(f'{name:<10} {hash_time * 1000:>9.1f} {check_time * 1000:>10.1f}')
+    print()
+    print('Single thread; req/s is logins per second per core')
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+WSGI application for the API load benchmark: the real project with every
+contract call in RealEstateBackend.blockchain replaced by a stand-in that
+sleeps BENCHMARK_CHAIN_LATENCY seconds (time to mine) and returns a fake
+transaction hash, so write endpoints can be measured without a node.
+
+    gunicorn benchmarks.mocked_chain_wsgi:application
+"""
+import itertools
+import os
+import threading
+import time
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'RealEstateBackend.settings')
+application = get_wsgi_application()
+
+from RealEstateBackend import blockchain  # noqa: E402  (needs the app registry)
+
+CHAIN_LATENCY = float(os.environ.get('BENCHMARK_CHAIN_LATENCY', 0))
+MOCKED = [
+    'list_property_on_blockchain',
+    'submit_offer_on_blockchain',
+    'accept_offer_on_blockchain',
+    'update_inspection_status_on_blockchain',
+    'complete_transaction_on_blockchain',
+]
+
+_hashes = itertools.count(1)
+_hashes_lock = threading.Lock()
+
+
+def fake_transaction(*args, **kwargs):
+    time.sleep(CHAIN_LATENCY)
+    with _hashes_lock:
+        number = next(_hashes)
+    return f'{os.getpid():08x}{number:056x}'
+
+
+for name in MOCKED:
+    setattr(blockchain, name, fake_transaction)
@@ -0,0 +1,64 @@
+"""
+Cold-start cost of the backend with and without fast boot.
+
+For each mode (FAST_BOOT=0: web3 and the contract are loaded while the app
+boots; FAST_BOOT=1: deferred to the first chain call) this measures, in fresh
+processes:
+
+* wall time of `manage.py check`
+* Django setup time and latency of the first request (GET /api/properties/)
+
+    cd RealEstateBackend
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from .common import BACKEND_DIR
+
+FIRST_REQUEST = '''
+import json, os, time
+started = time.perf_counter()
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "RealEstateBackend.settings")
+django.setup()
+setup_done = time.perf_counter()
+from django.test import Client
+Client().get("/api/properties/")
+print(json.dumps({"setup": setup_done - started, "first_request": time.perf_counter() - setup_done}))
+'''
+
+
+def measure(fast_boot, runs):
+    env = dict(os.environ, FAST_BOOT='1' if fast_boot else '0')
+    check_times, setup_times, request_times = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, 'manage.py', 'check'], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+        check_times.append(time.perf_counter() - started)
+
+        output = subprocess.run([sys.executable, '-c', FIRST_REQUEST], cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True)
+        timings = json.loads(output.stdout.strip().splitlines()[-1])
+        setup_times.append(timings['setup'])
+        request_times.append(timings['first_request'])
+    return statistics.median(check_times), statistics.median(setup_times), statistics.median(request_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<24} {'manage.py check':>16} {'django.setup()':>15} {'first request':>14}   (median of {args.runs} runs, ms)")
+    for label, fast_boot in (('eager (FAST_BOOT=0)', False), ('fast boot (FAST_BOOT=1)', True)):
+        check, setup, first_request = measure(fast_boot, args.runs)
+        print(f"{label:<24} {check * 1000:>16.0f} {setup * 1000:>15.0f} {first_request * 1000:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Compare chain-read throughput of the sync DRF endpoint under WSGI (gunicorn,
+threaded) with the async endpoint under ASGI (uvicorn).
+
+Both servers talk to a stand-in JSON-RPC node that answers every request after
+a fixed delay, so the numbers show how many slow chain calls each stack keeps
+in flight rather than how fast the node is.
+
+    cd RealEstateBackend
+    python -m benchmarks.wsgi_vs_asgi --requests 2000 --concurrency 200 --rpc-latency 50
+
+Requires gunicorn and uvicorn, and the contract artifact used by blockchain.py.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+from .common import BACKEND_DIR, free_port, print_table, setup_django, summarize, wait_for_port
+
+TRUE_WORD = '0x' + '0' * 63 + '1'
+
+
+def run_fake_node(port, latency):
+    async def handle(request):
+        payload = await request.json()
+        await asyncio.sleep(latency)
+        calls = payload if isinstance(payload, list) else [payload]
+        results = []
+        for call in calls:
+            if call['method'] == 'eth_chainId':
+                result = '0x539'
+            elif call['method'] == 'eth_call':
+                result = TRUE_WORD
+            else:
+                result = '0x0'
+            results.append({'jsonrpc': '2.0', 'id': call['id'], 'result': result})
+        return web.json_response(results if isinstance(payload, list) else results[0])
+
+    app = web.Application()
+    app.router.add_post('/', handle)
+    web.run_app(app, host='127.0.0.1', port=port, print=None)
+
+
+def seed():
+    setup_django()
+    from rest_framework.authtoken.models import Token
+    from properties.models import Property
+    from users.models import CustomUser
+
+    user, created = CustomUser.objects.get_or_create(username='benchmark', defaults={'user_type': 'seller'})
+    token, _ = Token.objects.get_or_create(user=user)
+    property_obj = Property.objects.filter(seller=user).first() or Property.objects.create(
+        seller=user, price=1, location='Benchmark', description='Benchmark', property_type='RESIDENTIAL'
+    )
+    return token.key, property_obj.id
+
+
+async def drive(url, token, total, concurrency):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker(session):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                async with session.get(url, headers={'Authorization': f'Token {token}'}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=300)) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed, errors
+
+
+def run_server(command, port, env, url, token, args):
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        asyncio.run(drive(url, token, min(args.concurrency, args.requests), args.concurrency))  # warm-up
+        return asyncio.run(drive(url, token, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--rpc-latency', type=float, default=50, help='milliseconds the fake node waits per call')
+    parser.add_argument('--wsgi-threads', type=int, default=32)
+    args = parser.parse_args()
+
+    token, property_id = seed()
+
+    node_port = free_port()
+    node = multiprocessing.Process(target=run_fake_node, args=(node_port, args.rpc_latency / 1000), daemon=True)
+    node.start()
+    wait_for_port(node_port)
+
+    env = dict(os.environ, GANACHE_URL=f'http://127.0.0.1:{node_port}')
+    rows = []
+    try:
+        port = free_port()
+        command = [sys.executable, '-m', 'gunicorn', 'RealEstateBackend.wsgi:application',
+                   '--bind', f'127.0.0.1:{port}', '--workers', '1', '--threads', str(args.wsgi_threads)]
+        url = f'http://127.0.0.1:{port}/api/properties/{property_id}/chain_status/'
+        rows.append(summarize(f'wsgi gunicorn ({args.wsgi_threads} threads)', *run_server(command, port, env, url, token, args)))
+
+        port = free_port()
+        command = [sys.executable, '-m', 'uvicorn', 'RealEstateBackend.asgi:application',
+                   '--host', '127.0.0.1', '--port', str(port), '--workers', '1', '--log-level', 'warning']
+        url = f'http://127.0.0.1:{port}/api/async/properties/{property_id}/chain_status/'
+        rows.append(summarize('asgi uvicorn (1 event loop)', *run_server(command, port, env, url, token, args)))
+    finally:
+        node.terminate()
+
+    print(f'{args.requests} requests, concurrency {args.concurrency}, {args.rpc_latency:.0f} ms per RPC call')
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import MarketRollup, Property, Transaction
+from .money import WEI_PER_GWEI, format_ether
+
+# Incremental maintenance of MarketRollup. Listings and sales add to the
+# buckets they fall in with F() increments, from the Property and Transaction
+# signals: a saved listing whose price, type, location or listed date changed
+# moves between buckets, a deleted one is taken back out. QuerySet.update()
+# sends no signals, so code that changes those fields saves the instance
+# instead. `manage.py rebuild_analytics` recomputes everything from scratch.
+
+DIMENSIONS = [choice for choice, _ in MarketRollup.DIMENSION_CHOICES]
+
+# The Property fields a listing's buckets and sums are computed from
+LISTING_FIELDS = ('property_type', 'location', 'price', 'listed_at')
+
+
+def location_bucket(location):
+    # The last comma-separated part of a location is its city or region
+    bucket = (location or '').rsplit(',', 1)[-1].strip().lower()
+    return bucket[:100] or 'unknown'
+
+
+def day_bucket(moment):
+    return moment.astimezone(datetime.timezone.utc).date().isoformat()
+
+
+def _split_wei(wei):
+    gwei, remainder = divmod(wei or 0, WEI_PER_GWEI)
+    return gwei, remainder
+
+
+def _increment(dimension, bucket, **deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    for _ in range(2):
+        if MarketRollup.objects.filter(dimension=dimension, bucket=bucket).update(**updates):
+            return
+        try:
+            # The savepoint keeps a lost creation race from breaking the caller's transaction
+            with transaction.atomic():
+                MarketRollup.objects.create(dimension=dimension, bucket=bucket, **deltas)
+            return
+        except IntegrityError:
+            continue
+
+
+def record_listing(property, sign=1):
+    for dimension, bucket in (
+        ('type', property.property_type),
+        ('day', day_bucket(property.listed_at)),
+        ('location', location_bucket(property.location)),
+    ):
+        gwei, remainder = _split_wei(property.price)
+        _increment(dimension, bucket, listed_count=sign, listed_price_gwei=sign * gwei, listed_price_wei=sign * remainder)
+
+
+def forget_listing(property):
+    """Take back record_listing() for a deleted listing."""
+    record_listing(property, sign=-1)
+
+
+def move_listing(before, property):
+    """Move a listing from the buckets of its stored copy ``before`` to its current ones."""
+    if all(getattr(before, field) == getattr(property, field) for field in LISTING_FIELDS):
+        return
+    forget_listing(before)
+    record_listing(property)
+
+
+def record_listings(properties):
+    for property in properties:
+        record_listing(property)
+
+
+def record_sale(sale):
+    property = sale.property
+    time_to_sale = max(int((sale.timestamp - property.listed_at).total_seconds()), 0)
+    gwei, remainder = _split_wei(sale.price)
+    for dimension, bucket in (
+        ('type', property.property_type),
+        ('day', day_bucket(sale.timestamp)),
+        ('location', location_bucket(property.location)),
+    ):
+        _increment(dimension, bucket, sold_count=1, sale_price_gwei=gwei, sale_price_wei=remainder, time_to_sale_sum=time_to_sale)
+
+
+def summarize(rollup):
+    return {
+        'bucket': rollup.bucket,
+        'listed_count': rollup.listed_count,
+        'average_list_price': format_ether(rollup.listed_price_sum // rollup.listed_count) if rollup.listed_count else None,
+        'sold_count': rollup.sold_count,
+        'sale_volume': format_ether(rollup.sale_price_sum),
+        'average_sale_price': format_ether(rollup.sale_price_sum // rollup.sold_count) if rollup.sold_count else None,
+        'average_days_to_sale': round(rollup.time_to_sale_sum / rollup.sold_count / 86400, 2) if rollup.sold_count else None,
+    }
+
+
+def rebuild_rollups(chunk_size=5000):
+    """
+    Recompute every bucket from Property and Transaction with pandas group-bys
+    and replace the table in one transaction. Returns the number of buckets.
+    Wei prices are summed vectorized as two int64 columns: whole gwei and the
+    sub-gwei remainder, the same split MarketRollup stores.
+    """
+    import pandas as pd
+
+    listings = pd.DataFrame.from_records(
+        Property.objects.values_list('property_type', 'location', 'price', 'listed_at').iterator(chunk_size=chunk_size),
+        columns=['type', 'location', 'price', 'listed_at'],
+    )
+    sales = pd.DataFrame.from_records(
+        Transaction.objects.values_list('property__property_type', 'property__location', 'price', 'timestamp', 'property__listed_at').iterator(chunk_size=chunk_size),
+        columns=['type', 'location', 'price', 'timestamp', 'listed_at'],
+    )
+
+    frames = []
+    if len(listings):
+        listings = listings.join(_split_wei_columns(listings['price'], 'listed_price'))
+        listings['location'] = _location_buckets(listings['location'])
+        listings['day'] = pd.to_datetime(listings['listed_at'], utc=True).dt.strftime('%Y-%m-%d')
+        for dimension in DIMENSIONS:
+            grouped = listings.groupby(dimension).agg(
+                listed_count=('price', 'count'), listed_price_gwei=('listed_price_gwei', 'sum'), listed_price_wei=('listed_price_wei', 'sum'),
+            )
+            frames.append(grouped.rename_axis('bucket').reset_index().assign(dimension=dimension))
+    if len(sales):
+        sales['location'] = _location_buckets(sales['location'])
+        sales['day'] = pd.to_datetime(sales['timestamp'], utc=True).dt.strftime('%Y-%m-%d')
+        elapsed = pd.to_datetime(sales['timestamp'], utc=True) - pd.to_datetime(sales['listed_at'], utc=True)
+        sales['time_to_sale'] = elapsed.dt.total_seconds().clip(lower=0).astype('int64')
+        sales = sales.join(_split_wei_columns(sales['price'], 'sale_price'))
+        for dimension in DIMENSIONS:
+            grouped = sales.groupby(dimension).agg(
+                sold_count=('price', 'count'), sale_price_gwei=('sale_price_gwei', 'sum'), sale_price_wei=('sale_price_wei', 'sum'),
+                time_to_sale_sum=('time_to_sale', 'sum'),
+            )
+            frames.append(grouped.rename_axis('bucket').reset_index().assign(dimension=dimension))
+
+    # Every frame gets every counter, zero-filled, so the sums stay int64
+    counters = ['listed_count', 'listed_price_gwei', 'listed_price_wei', 'sold_count', 'sale_price_gwei', 'sale_price_wei', 'time_to_sale_sum']
+    frames = [frame.reindex(columns=['dimension', 'bucket', *counters], fill_value=0) for frame in frames]
+    combined = pd.concat(frames).groupby(['dimension', 'bucket'], as_index=False).sum() if frames else pd.DataFrame(columns=['dimension', 'bucket', *counters])
+    rollups = [
+        MarketRollup(dimension=row['dimension'], bucket=row['bucket'], **{counter: int(row[counter]) for counter in counters})
+        for row in combined.to_dict('records')
+    ]
+    with transaction.atomic():
+        MarketRollup.objects.all().delete()
+        MarketRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def _split_wei_columns(prices, prefix):
+    import pandas as pd
+    # Wei values can exceed int64, so the split is done on the Python ints
+    gwei, remainder = zip(*(_split_wei(price) for price in prices))
+    return pd.DataFrame({f'{prefix}_gwei': gwei, f'{prefix}_wei': remainder}, index=prices.index, dtype='int64')
+
+
+def _location_buckets(locations):
+    buckets = locations.fillna('').str.rsplit(',', n=1).str[-1].str.strip().str.lower().str[:100]
+    return buckets.mask(buckets == '', 'unknown')
+
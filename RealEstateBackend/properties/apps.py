@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class PropertiesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "properties"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        if not settings.FAST_BOOT:
+            from RealEstateBackend.blockchain import warm_up
+            warm_up()
@@ -0,0 +1,317 @@
+import datetime
+import json
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+from rest_framework import status
+
+from . import feed, outbox
+from .models import Property, Offer, OutboxEntry
+from .serializers import PropertySerializer, OfferSerializer, InspectionUpdateSerializer
+from .views import OfferNotAcceptable, claim_offer, describe_blockchain_error, record_accepted_offer, record_completed_transaction, release_offer_claim
+from users.authentication import get_token_user
+from users.models import ZERO_ADDRESS, eth_address_of
+
+# Async (ASGI) versions of the blockchain-bound endpoints in views.py. DRF views
+# are synchronous, so these are plain Django coroutine views: ORM work runs in
+# sync_to_async, chain calls are awaited through RealEstateBackend.async_blockchain.
+
+
+async def _authenticate(request):
+    # EventSource cannot send headers, so the token may also come as ?token=
+    auth = request.headers.get('Authorization', '').split()
+    key = auth[1] if len(auth) == 2 and auth[0] == 'Token' else request.GET.get('token')
+    return await sync_to_async(get_token_user)(key) if key else None
+
+
+def _error(message, status_code):
+    return JsonResponse({'error': message}, status=status_code)
+
+
+def _unauthenticated():
+    return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+def _forbidden():
+    return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN)
+
+
+def _blockchain_error(e):
+    return _error(*describe_blockchain_error(e))
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+def _has_role(user, *roles):
+    return user.user_type in roles or user.is_staff
+
+
+def _get_or_none(queryset, pk):
+    return queryset.filter(pk=pk).first()
+
+
+def _serialize(serializer_class, instance):
+    return serializer_class(instance).data
+
+
+def _enqueue(key, serializer_class, save_with_outbox):
+    # Sync half of _create_with_outbox; mirrors views.OutboxCreateMixin.create
+    try:
+        with transaction.atomic():
+            entry = save_with_outbox(key)
+    except IntegrityError:
+        # A concurrent request with the same key got there first
+        entry = OutboxEntry.objects.filter(key=key).first() if key else None
+        if entry is None:
+            raise
+    return _describe_queued(entry, serializer_class)
+
+
+def _describe_queued(entry, serializer_class):
+    instance = entry.offer or entry.property
+    data = serializer_class(instance).data if instance else {}
+    return {**data, 'outbox': outbox.describe(entry)}
+
+
+async def _create_with_outbox(request, user, serializer_class, save_with_outbox):
+    """
+    Save the new row and its contract call in one transaction and answer 202,
+    as the sync views do with CHAIN_OUTBOX on. save_with_outbox(serializer, key)
+    returns the entry; a retried Idempotency-Key gets the first request's.
+    """
+    key = outbox.idempotency_key(request, user)
+    entry = await OutboxEntry.objects.select_related('property', 'offer').filter(key=key).afirst() if key else None
+    if entry is not None:
+        return JsonResponse(await sync_to_async(_describe_queued)(entry, serializer_class), status=status.HTTP_202_ACCEPTED)
+
+    data = _json_body(request)
+    serializer = serializer_class(data=data)
+    if data is None or not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors if data is not None else {'detail': 'Invalid JSON.'}, status=status.HTTP_400_BAD_REQUEST)
+    body = await sync_to_async(_enqueue)(key, serializer_class, lambda key: save_with_outbox(serializer, key))
+    return JsonResponse(body, status=status.HTTP_202_ACCEPTED)
+
+
+@require_GET
+async def event_stream(request):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthenticated()
+
+    try:
+        property_ids = [int(value) for value in request.GET.getlist('property')]
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({'detail': 'property and last_event_id must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    subscription = feed.Subscription(
+        property_ids=property_ids,
+        user_id=user.pk if request.GET.get('scope') == 'user' else None,
+    )
+    response = StreamingHttpResponse(feed.stream(subscription, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def property_create(request):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthenticated()
+    if not _has_role(user, 'seller'):
+        return _forbidden()
+    if settings.CHAIN_OUTBOX:
+        return await _create_with_outbox(request, user, PropertySerializer, lambda serializer, key: outbox.enqueue_listing(
+            serializer.save(seller=user), eth_address_of(user, ZERO_ADDRESS), key,
+        ))
+
+    data = _json_body(request)
+    serializer = PropertySerializer(data=data)
+    if data is None or not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors if data is not None else {'detail': 'Invalid JSON.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    agent_address = eth_address_of(user, ZERO_ADDRESS)
+    validated = serializer.validated_data
+
+    try:
+        from RealEstateBackend.async_blockchain import list_property_on_blockchain
+        tx_hash = await list_property_on_blockchain(
+            os.environ.get('SELLER_PRIVATE_KEY'),
+            validated['price'],
+            validated['location'],
+            validated['property_type'],
+            validated.get('area', 0),
+            validated.get('bedrooms', 0),
+            validated.get('bathrooms', 0),
+            agent_address,
+            int(validated.get('agent_commission', 0))
+        )
+    except Exception as e:
+        return _blockchain_error(e)
+
+    instance = await sync_to_async(serializer.save)(seller=user, transaction_hash=tx_hash)
+    return JsonResponse(await sync_to_async(_serialize)(PropertySerializer, instance), status=status.HTTP_201_CREATED)
+
+
+@require_GET
+async def property_chain_status(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthenticated()
+    if not await Property.objects.filter(pk=pk).aexists():
+        return _error('Not found.', status.HTTP_404_NOT_FOUND)
+
+    try:
+        from RealEstateBackend.async_blockchain import get_property_chain_status
+        return JsonResponse(await get_property_chain_status(pk))
+    except Exception as e:
+        return _blockchain_error(e)
+
+
+@csrf_exempt
+@require_http_methods(['PATCH'])
+async def property_update_inspection_status(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthenticated()
+    if not _has_role(user, 'appraiser', 'inspector'):
+        return _forbidden()
+
+    property = await sync_to_async(_get_or_none)(Property.objects.all(), pk)
+    if property is None:
+        return _error('Not found.', status.HTTP_404_NOT_FOUND)
+    data = _json_body(request)
+    serializer = InspectionUpdateSerializer(property, data=data, partial=True)
+    if data is None or not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors if data is not None else {'detail': 'Invalid JSON.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        from RealEstateBackend.async_blockchain import update_inspection_status_on_blockchain
+        tx_hash = await update_inspection_status_on_blockchain(
+            os.environ.get('APPRAISER_PRIVATE_KEY'),
+            property.id,
+            serializer.validated_data.get('is_inspection_passed')
+        )
+    except Exception as e:
+        return _blockchain_error(e)
+
+    await sync_to_async(serializer.save)(transaction_hash=tx_hash)
+    return JsonResponse(serializer.data)
+
+
+@csrf_exempt
+@require_POST
+async def property_complete_transaction(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthenticated()
+    if not _has_role(user, 'seller', 'buyer'):
+        return _forbidden()
+
+    property = await sync_to_async(_get_or_none)(Property.objects.select_related('seller', 'buyer'), pk)
+    if property is None:
+        return _error('Not found.', status.HTTP_404_NOT_FOUND)
+    if property.seller_id == user.pk:
+        signer_private_key = os.environ.get('SELLER_PRIVATE_KEY')
+    elif property.buyer_id == user.pk:
+        signer_private_key = os.environ.get('BUYER_PRIVATE_KEY')
+    else:
+        return _error('You are not authorized to complete this transaction.', status.HTTP_403_FORBIDDEN)
+
+    if not property.is_inspection_passed:
+        return _error('Inspection not passed.', status.HTTP_400_BAD_REQUEST)
+    if not property.financing_approved:
+        return _error('Financing not approved.', status.HTTP_400_BAD_REQUEST)
+
+    try:
+        from RealEstateBackend.async_blockchain import complete_transaction_on_blockchain
+        tx_hash = await complete_transaction_on_blockchain(signer_private_key, property.id)
+    except Exception as e:
+        return _blockchain_error(e)
+
+    await sync_to_async(record_completed_transaction)(property, tx_hash)
+    return JsonResponse({'status': 'transaction completed', 'transaction_hash': tx_hash})
+
+
+@csrf_exempt
+@require_POST
+async def offer_create(request):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthenticated()
+    if user.user_type != 'buyer':
+        return _forbidden()
+    if settings.CHAIN_OUTBOX:
+        return await _create_with_outbox(request, user, OfferSerializer, lambda serializer, key: outbox.enqueue_offer(
+            serializer.save(buyer=user), key,
+        ))
+
+    data = _json_body(request)
+    serializer = OfferSerializer(data=data)
+    if data is None or not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors if data is not None else {'detail': 'Invalid JSON.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    expires_at = serializer.validated_data['expires_at']
+    expires_in_seconds = int((expires_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+    try:
+        from RealEstateBackend.async_blockchain import submit_offer_on_blockchain
+        tx_hash = await submit_offer_on_blockchain(
+            os.environ.get('BUYER_PRIVATE_KEY'),
+            serializer.validated_data['property'].id,
+            serializer.validated_data['amount'],
+            expires_in_seconds
+        )
+    except Exception as e:
+        return _blockchain_error(e)
+
+    instance = await sync_to_async(serializer.save)(buyer=user, transaction_hash=tx_hash)
+    return JsonResponse(await sync_to_async(_serialize)(OfferSerializer, instance), status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+async def offer_accept(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthenticated()
+    if user.user_type != 'seller':
+        return _forbidden()
+
+    offer = await sync_to_async(_get_or_none)(Offer.objects.select_related('property', 'buyer__userprofile'), pk)
+    if offer is None:
+        return _error('Not found.', status.HTTP_404_NOT_FOUND)
+    if offer.property.seller_id != user.pk:
+        return _error('You are not the seller of this property.', status.HTTP_403_FORBIDDEN)
+
+    try:
+        await sync_to_async(claim_offer)(offer)
+    except OfferNotAcceptable as e:
+        return _error(str(e), status.HTTP_409_CONFLICT)
+
+    try:
+        from RealEstateBackend.async_blockchain import accept_offer_on_blockchain
+        tx_hash = await accept_offer_on_blockchain(
+            os.environ.get('SELLER_PRIVATE_KEY'),
+            offer.property_id,
+            eth_address_of(offer.buyer)
+        )
+    except Exception as e:
+        await sync_to_async(release_offer_claim)(offer)
+        return _blockchain_error(e)
+
+    await sync_to_async(record_accepted_offer)(offer, tx_hash)
+    return JsonResponse({'status': 'offer accepted', 'transaction_hash': tx_hash})
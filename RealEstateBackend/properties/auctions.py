@@ -0,0 +1,279 @@
+import datetime
+import heapq
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import feed
+from .models import Offer, Property
+from users.models import normalize_eth_address
+
+logger = logging.getLogger(__name__)
+
+
+class Auction:
+    """One open auction: its deadline, reserve and a max-heap of bids."""
+
+    def __init__(self, property_id, end_time, minimum_bid_wei=0):
+        self.property_id = property_id
+        self.end_time = end_time
+        self.minimum_bid_wei = minimum_bid_wei
+        self._bids = []  # (-amount_wei, sequence, lowercase bidder address)
+
+    def add_bid(self, amount_wei, bidder):
+        heapq.heappush(self._bids, (-amount_wei, len(self._bids), bidder))
+
+    @property
+    def bid_count(self):
+        return len(self._bids)
+
+    def highest(self):
+        """(amount_wei, bidder) of the highest bid, or None before the first bid."""
+        if not self._bids:
+            return None
+        amount, _, bidder = self._bids[0]
+        return -amount, bidder
+
+
+class AuctionBook:
+    """
+    In-memory index of open auctions, answering "current highest bid" in O(1)
+    instead of calling the contract's getHighestBid, which loops over every
+    offer on the property. Deadlines are kept in a min-heap for the end trigger.
+
+    The book is rebuilt from the database (load_from_db) or from the contract's
+    AuctionStarted / OfferSubmitted / AuctionEnded logs (rebuild).
+    """
+
+    def __init__(self):
+        self._auctions = {}
+        self._deadlines = []  # (end_time, property_id); stale entries are skipped
+        self._lock = threading.RLock()
+        self.loaded_at = None
+        # None reloads from the database; a block number, from the contract logs since that block
+        self.from_block = None
+
+    def start(self, property_id, end_time, minimum_bid_wei=0):
+        with self._lock:
+            self._auctions[property_id] = Auction(property_id, end_time, minimum_bid_wei)
+            heapq.heappush(self._deadlines, (end_time, property_id))
+
+    def bid(self, property_id, amount_wei, bidder):
+        with self._lock:
+            auction = self._auctions.get(property_id)
+            if auction is None:
+                return False
+            auction.add_bid(amount_wei, bidder)
+            return True
+
+    def end(self, property_id):
+        with self._lock:
+            self._auctions.pop(property_id, None)
+
+    def get(self, property_id):
+        with self._lock:
+            return self._auctions.get(property_id)
+
+    def highest_bid(self, property_id):
+        with self._lock:
+            auction = self._auctions.get(property_id)
+            return auction.highest() if auction else None
+
+    def next_deadline(self):
+        with self._lock:
+            self._discard_stale()
+            return self._deadlines[0][0] if self._deadlines else None
+
+    def pop_due(self, now=None):
+        """Property ids of auctions whose end time has passed; each is returned once."""
+        now = now or timezone.now()
+        due = []
+        with self._lock:
+            self._discard_stale()
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, property_id = heapq.heappop(self._deadlines)
+                due.append(property_id)
+                self._discard_stale()
+        return due
+
+    def defer(self, property_id, seconds):
+        """Put an auction back on the schedule, e.g. after endAuction reverted."""
+        with self._lock:
+            auction = self._auctions.get(property_id)
+            if auction is not None:
+                auction.end_time = timezone.now() + datetime.timedelta(seconds=seconds)
+                heapq.heappush(self._deadlines, (auction.end_time, property_id))
+
+    def _discard_stale(self):
+        while self._deadlines:
+            end_time, property_id = self._deadlines[0]
+            auction = self._auctions.get(property_id)
+            if auction is not None and auction.end_time == end_time:
+                return
+            heapq.heappop(self._deadlines)
+
+    def clear(self):
+        with self._lock:
+            self._auctions = {}
+            self._deadlines = []
+
+    def load_from_db(self):
+        """Rebuild from properties with an open auction and the active offers made since it started."""
+        auctions = Property.objects.filter(is_sold=False, auction_end_time__isnull=False).values_list('pk', 'auction_end_time', 'minimum_bid')
+        bids = Offer.objects.filter(
+            Q(timestamp__gte=F('property__auction_started_at')) | Q(property__auction_started_at__isnull=True),
+            is_active=True, property__is_sold=False, property__auction_end_time__isnull=False,
+        ).order_by('timestamp').values_list('property_id', 'amount', 'buyer__userprofile__eth_address')
+        with self._lock:
+            self.clear()
+            for property_id, end_time, minimum_bid in auctions:
+                self.start(property_id, end_time, minimum_bid or 0)
+            for property_id, amount, bidder in bids:
+                self.bid(property_id, amount, bidder)
+            self.loaded_at = time.monotonic()
+
+    def apply_event(self, event):
+        name, property_id = event['event'], event['propertyId']
+        if name == 'AuctionStarted':
+            with self._lock:
+                existing = self._auctions.get(property_id)
+                # The event carries no reserve; keep one already known from the database
+                minimum_bid_wei = existing.minimum_bid_wei if existing else 0
+                self.start(property_id, datetime.datetime.fromtimestamp(event['endTime'], tz=datetime.timezone.utc), minimum_bid_wei)
+        elif name == 'OfferSubmitted':
+            self.bid(property_id, event['offerAmount'], normalize_eth_address(event['buyer']))
+        elif name == 'AuctionEnded':
+            self.end(property_id)
+
+    def follow_chain(self, from_block=0):
+        """Load and from now on reload the book from contract logs instead of the database."""
+        self.from_block = from_block
+        self.reload()
+
+    def reload(self):
+        if self.from_block is None:
+            self.load_from_db()
+        else:
+            from RealEstateBackend.blockchain import get_auction_events
+            self.rebuild(get_auction_events(self.from_block))
+
+    def rebuild(self, events):
+        """Rebuild from contract logs, as returned by blockchain.get_auction_events()."""
+        with self._lock:
+            self.clear()
+            for event in events:
+                self.apply_event(event)
+            self.loaded_at = time.monotonic()
+
+
+_book = AuctionBook()
+
+
+def get_auction_book():
+    """
+    The process-wide book, reloaded every AUCTION_BOOK_TTL seconds (from the
+    database, or the contract logs after follow_chain) so bids taken by other
+    workers show up.
+    """
+    if _book.loaded_at is None or time.monotonic() - _book.loaded_at >= settings.AUCTION_BOOK_TTL:
+        _book.reload()
+    return _book
+
+
+def record_auction_result(property_id, tx_hash):
+    """Mirror a confirmed endAuction: sell to the highest active bid, or reopen the listing."""
+    with transaction.atomic():
+        winner = Offer.objects.filter(property_id=property_id, is_active=True).order_by('-amount', 'timestamp').first()
+        if winner is None:
+            Property.objects.filter(pk=property_id).update(auction_end_time=None, minimum_bid=None, transaction_hash=tx_hash)
+            offer_ids = []
+        else:
+            Property.objects.filter(pk=property_id, is_sold=False).update(
+                is_sold=True, is_listed=False, buyer=winner.buyer_id, offer_amount=winner.amount, transaction_hash=tx_hash,
+            )
+            offer_ids = list(Offer.objects.filter(property_id=property_id, is_active=True).values_list('pk', flat=True))
+            Offer.objects.filter(pk__in=offer_ids).update(is_active=False)
+            Offer.objects.filter(pk=winner.pk).update(transaction_hash=tx_hash)
+
+        # QuerySet.update() skips post_save, so the feed is told explicitly
+        feed.publish_property_update(property_id)
+        if offer_ids:
+            feed.publish_many(Offer.objects.filter(pk__in=offer_ids).select_related('property'), 'updated')
+    _book.end(property_id)
+    return winner
+
+
+def end_auctions_on_chain(property_ids):
+    from RealEstateBackend.blockchain import end_auctions_on_blockchain
+    # endAuction is callable by anyone once the auction is over; the seller account pays the gas
+    return end_auctions_on_blockchain(os.environ.get('SELLER_PRIVATE_KEY'), property_ids)
+
+
+def end_auctions(property_ids, end_on_chain=None):
+    """Send endAuction for each property and record the confirmed ones; returns the chain results."""
+    results = (end_on_chain or end_auctions_on_chain)(property_ids)
+    for property_id, result in zip(property_ids, results):
+        if result['status'] == 'confirmed':
+            record_auction_result(property_id, result['transaction_hash'])
+    return results
+
+
+class AuctionScheduler:
+    """
+    Calls endAuction as soon as an auction's end time passes. Sleeps until the
+    earliest deadline in the auction book; endAuction is retried a few times
+    when the chain's clock has not reached the end time yet.
+    """
+
+    def __init__(self, end_on_chain=None, attempts=None, retry_delay=1.0):
+        self.end_on_chain = end_on_chain
+        self.attempts = attempts or settings.AUCTION_END_ATTEMPTS
+        self.retry_delay = retry_delay
+        self._failures = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def tick(self, now=None):
+        """End the auctions that are due; returns their property ids."""
+        book = get_auction_book()
+        due = book.pop_due(now)
+        if not due:
+            return []
+        results = end_auctions(due, self.end_on_chain)
+        for property_id, result in zip(due, results):
+            if result['status'] == 'confirmed':
+                self._failures.pop(property_id, None)
+                continue
+            failures = self._failures.get(property_id, 0) + 1
+            if failures < self.attempts:
+                self._failures[property_id] = failures
+                book.defer(property_id, self.retry_delay)
+            else:
+                self._failures.pop(property_id, None)
+                logger.warning('endAuction for property %s gave up: %s', property_id, result['error'] or result['status'])
+        return due
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception('Auction end tick failed')
+
+            # Wake at the next deadline, or when the book is due for a reload
+            timeout = settings.AUCTION_BOOK_TTL
+            deadline = _book.next_deadline()
+            if deadline is not None:
+                timeout = min(timeout, (deadline - timezone.now()).total_seconds())
+            self._wakeup.wait(max(timeout, 0))
+            self._wakeup.clear()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
@@ -0,0 +1,195 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+
+from users.models import CustomUser
+from .models import Offer, Property, Transaction
+from .money import WeiField, format_ether
+
+# One payload per dashboard page, built from a fixed handful of annotated
+# queries (no per-row lookups). Buyer and seller dashboards are cached per
+# user; the appraiser, inspector and admin ones, and the listings every buyer
+# sees, show the same to everyone and are cached once. Each cache key carries
+# the generation number of its user or shared section, which feed.publish()
+# bumps after a committed change to a row that section shows, so a write only
+# invalidates the dashboards it touches. The generations live in the default
+# cache: with a shared one (REDIS_URL) every worker sees a change at once;
+# with the per-process fallback, a change made by another process (another
+# worker, listen_for_events) shows up after at most DASHBOARD_CACHE_TTL seconds.
+
+ROLES = ['buyer', 'seller', 'appraiser', 'inspector', 'admin']
+SHARED_ROLES = ('appraiser', 'inspector', 'admin')
+
+GENERATION_KEY = 'dashboard:generation:{}'
+
+# Shared sections changed by each kind of ChangeEvent. Offers count because
+# property lists show each property's open offers.
+SCOPES_BY_KIND = {
+    'property': ('listings', 'appraiser', 'inspector', 'admin'),
+    'offer': ('listings', 'appraiser', 'inspector', 'admin'),
+    'transaction': ('appraiser', 'admin'),
+}
+
+PROPERTY_FIELDS = ('id', 'location', 'property_type', 'price', 'is_listed', 'is_sold', 'is_inspection_passed', 'listed_at', 'auction_end_time')
+TRANSACTION_FIELDS = ('id', 'property_id', 'property__location', 'price', 'timestamp', 'transaction_hash', 'seller__username', 'buyer__username')
+
+ACTIVE_OFFERS = Q(offers__is_active=True)
+PENDING_INSPECTION = Q(is_listed=True, is_sold=False, is_inspection_passed=False)
+
+
+def _ether(rows, *fields):
+    for row in rows:
+        for field in fields:
+            row[field] = format_ether(row[field])
+    return rows
+
+
+def _properties(queryset, limit):
+    rows = queryset.annotate(
+        open_offer_count=Count('offers', filter=ACTIVE_OFFERS),
+        highest_offer=Max('offers__amount', filter=ACTIVE_OFFERS),
+        last_offer_at=Max('offers__timestamp', filter=ACTIVE_OFFERS),
+    ).order_by('-listed_at').values(*PROPERTY_FIELDS, 'open_offer_count', 'highest_offer', 'last_offer_at')[:limit]
+    return _ether(list(rows), 'price', 'highest_offer')
+
+
+def _transactions(queryset):
+    rows = queryset.order_by('-timestamp').values(*TRANSACTION_FIELDS)[:settings.DASHBOARD_RECENT_LIMIT]
+    return _ether(list(rows), 'price')
+
+
+def _property_counts(queryset):
+    return queryset.aggregate(
+        properties=Count('pk'),
+        listed=Count('pk', filter=Q(is_listed=True, is_sold=False)),
+        sold=Count('pk', filter=Q(is_sold=True)),
+        pending_inspections=Count('pk', filter=PENDING_INSPECTION),
+    )
+
+
+def seller_dashboard(user):
+    properties = Property.objects.filter(seller=user)
+    summary = _property_counts(properties)
+    summary['open_offers'] = Offer.objects.filter(property__seller=user, is_active=True).count()
+    return {
+        'summary': summary,
+        'properties': _properties(properties, settings.DASHBOARD_LIST_LIMIT),
+        'recent_transactions': _transactions(Transaction.objects.filter(seller=user)),
+    }
+
+
+def buyer_dashboard(user):
+    highest = Offer.objects.filter(property=OuterRef('property'), is_active=True).order_by('-amount').values('amount')[:1]
+    offers = list(
+        Offer.objects.filter(buyer=user, is_active=True)
+        .annotate(highest_amount=Subquery(highest, output_field=WeiField()))
+        .order_by('expires_at')
+        .values('id', 'property_id', 'property__location', 'amount', 'timestamp', 'expires_at', 'highest_amount')
+    )
+    for offer in offers:
+        offer['is_highest'] = offer['amount'] == offer['highest_amount']
+    purchases = Transaction.objects.filter(buyer=user)
+    # 'listings' is added by get_dashboard from the shared cache
+    return {
+        'summary': {'open_offers': len(offers), 'purchases': purchases.count()},
+        'open_offers': _ether(offers, 'amount', 'highest_amount'),
+        'recent_transactions': _transactions(purchases),
+    }
+
+
+def open_listings():
+    return _properties(Property.objects.filter(is_listed=True, is_sold=False), settings.DASHBOARD_LIST_LIMIT)
+
+
+def appraiser_dashboard(user):
+    listed = Property.objects.filter(is_listed=True, is_sold=False)
+    return {
+        'summary': _property_counts(Property.objects.all()),
+        'properties': _properties(listed, settings.DASHBOARD_LIST_LIMIT),
+        # Latest sales are the comparables for an appraisal
+        'recent_transactions': _transactions(Transaction.objects.all()),
+    }
+
+
+def inspector_dashboard(user):
+    return {
+        'summary': _property_counts(Property.objects.all()),
+        'pending_inspections': _properties(Property.objects.filter(PENDING_INSPECTION), settings.DASHBOARD_LIST_LIMIT),
+    }
+
+
+def admin_dashboard(user):
+    summary = _property_counts(Property.objects.all())
+    summary['open_offers'] = Offer.objects.filter(is_active=True).count()
+    summary['users_by_type'] = dict(CustomUser.objects.order_by().values_list('user_type').annotate(Count('pk')))
+    return {
+        'summary': summary,
+        'properties': _properties(Property.objects.all(), settings.DASHBOARD_LIST_LIMIT),
+        'recent_transactions': _transactions(Transaction.objects.all()),
+    }
+
+
+BUILDERS = {
+    'buyer': buyer_dashboard,
+    'seller': seller_dashboard,
+    'appraiser': appraiser_dashboard,
+    'inspector': inspector_dashboard,
+    'admin': admin_dashboard,
+}
+
+
+def _generation(scope):
+    key = GENERATION_KEY.format(scope)
+    generation = cache.get(key)
+    if generation is None:
+        # Seeded from the clock so a restarted or evicted counter never reuses an old number
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump(scope):
+    key = GENERATION_KEY.format(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate(events):
+    """
+    Start new generations for the users and shared sections the change
+    events touch: the users concerned by each row, the buyers with open
+    offers on a changed property (their offer lists show its location and
+    highest offer), and the shared sections of SCOPES_BY_KIND.
+    """
+    user_ids, scopes, property_ids = set(), set(), set()
+    for event in events:
+        user_ids.update(event.user_ids)
+        scopes.update(SCOPES_BY_KIND.get(event.kind, ()))
+        if event.kind in ('property', 'offer') and event.property_id:
+            property_ids.add(event.property_id)
+    if property_ids:
+        user_ids.update(Offer.objects.filter(property_id__in=property_ids, is_active=True).values_list('buyer_id', flat=True))
+    for scope in sorted(scopes) + [f'user:{user_id}' for user_id in sorted(user_ids)]:
+        _bump(scope)
+
+
+def _cached(scope, key, build):
+    key = f'dashboard:{_generation(scope)}:{key}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.DASHBOARD_CACHE_TTL)
+    return data
+
+
+def get_dashboard(role, user):
+    if role in SHARED_ROLES:
+        return _cached(role, role, lambda: BUILDERS[role](user))
+    data = _cached(f'user:{user.pk}', f'{role}:{user.pk}', lambda: BUILDERS[role](user))
+    if role == 'buyer':
+        data = {**data, 'listings': _cached('listings', 'listings', open_listings)}
+    return data
@@ -0,0 +1,124 @@
+import heapq
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import feed
+from .models import Offer
+
+logger = logging.getLogger(__name__)
+
+
+def expire_due_offers(now=None):
+    """
+    Deactivate every active offer whose expires_at has passed. The due rows are
+    locked with SELECT ... FOR UPDATE, deactivated with one UPDATE (both served
+    by the (is_active, expires_at) index) and read back once more to publish
+    their feed events. Returns the ids of the properties that lost offers, for
+    the on-chain expireOffers calls.
+    """
+    now = now or timezone.now()
+    due = Offer.objects.filter(is_active=True, expires_at__lte=now)
+    with transaction.atomic():
+        rows = list(due.select_for_update().values_list('pk', 'property_id'))
+        if not rows:
+            return []
+        due.update(is_active=False)
+        # QuerySet.update() skips post_save, so the feed is told explicitly
+        feed.publish_many(Offer.objects.filter(pk__in=[pk for pk, _ in rows]).select_related('property'), 'updated')
+    return sorted({property_id for _, property_id in rows})
+
+
+def expire_offers_on_chain(property_ids):
+    from RealEstateBackend.blockchain import expire_offers_on_blockchain
+    # expireOffers is callable by anyone; the seller account pays the gas
+    return expire_offers_on_blockchain(os.environ.get('SELLER_PRIVATE_KEY'), property_ids)
+
+
+class ExpiryScheduler:
+    """
+    Expires offers when they are due instead of polling on a short interval.
+
+    Upcoming deadlines are held in a min-heap keyed on expires_at and the
+    scheduler sleeps until the earliest one. The heap is reloaded from the
+    database every refresh_interval so newly created offers are picked up.
+    """
+
+    def __init__(self, expire_on_chain=expire_offers_on_chain, refresh_interval=None, lookahead=None, chain_attempts=None):
+        self.expire_on_chain = expire_on_chain
+        self.refresh_interval = settings.OFFER_EXPIRY_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.lookahead = lookahead or settings.OFFER_EXPIRY_LOOKAHEAD
+        self.chain_attempts = chain_attempts or settings.OFFER_EXPIRY_CHAIN_ATTEMPTS
+        self._heap = []
+        self._retries = {}  # property id -> expireOffers attempts left
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        deadlines = Offer.objects.filter(is_active=True).order_by('expires_at').values_list('expires_at', 'pk')[:self.lookahead]
+        heap = list(deadlines)
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+
+    def next_deadline(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def tick(self, now=None):
+        """Expire what is due; returns the property ids sent to expireOffers."""
+        now = now or timezone.now()
+        with self._lock:
+            due = False
+            while self._heap and self._heap[0][0] <= now:
+                heapq.heappop(self._heap)
+                due = True
+        if not due and not self._retries:
+            return []
+
+        property_ids = expire_due_offers(now) if due else []
+        for property_id in property_ids:
+            self._retries[property_id] = self.chain_attempts
+        pending = sorted(self._retries)
+        if not pending or self.expire_on_chain is None:
+            self._retries.clear()
+            return property_ids
+
+        # On chain an offer expires at block.timestamp + expiresIn, which can be
+        # slightly after expires_at; a "No expired offers found" revert is retried
+        results = self.expire_on_chain(pending)
+        for property_id, result in zip(pending, results):
+            if result['status'] == 'confirmed':
+                del self._retries[property_id]
+                continue
+            self._retries[property_id] -= 1
+            if self._retries[property_id] <= 0:
+                del self._retries[property_id]
+                logger.warning('expireOffers for property %s gave up: %s', property_id, result['error'] or result['status'])
+        return pending
+
+    def run(self):
+        self.refresh()
+        last_refresh = timezone.now()
+        while True:
+            try:
+                self.tick()
+            except Exception:
+                logger.exception('Offer expiry tick failed')
+
+            now = timezone.now()
+            if (now - last_refresh).total_seconds() >= self.refresh_interval:
+                self.refresh()
+                last_refresh = now
+
+            timeout = self.refresh_interval - (now - last_refresh).total_seconds()
+            deadline = self.next_deadline()
+            if deadline is not None:
+                timeout = min(timeout, (deadline - now).total_seconds())
+            if self._retries:
+                timeout = min(timeout, 1.0)
+            time.sleep(max(timeout, 0))
@@ -0,0 +1,154 @@
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Property, Offer, Transaction
+
+# Streaming exports: rows are read with QuerySet.iterator() and written out a
+# chunk at a time, so memory stays flat whatever the table size.
+
+EXPORT_MODELS = {
+    'properties': Property,
+    'offers': Offer,
+    'transactions': Transaction,
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class ExportError(Exception):
+    pass
+
+
+def export_columns(model):
+    # Foreign keys are exported as their raw id column (seller_id, property_id, ...)
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def iter_rows(model, chunk_size=DEFAULT_CHUNK_SIZE):
+    columns = export_columns(model)
+    queryset = model.objects.order_by('pk').values_list(*columns)
+    return columns, queryset.iterator(chunk_size=chunk_size)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _batches(rows, chunk_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+    for batch in _batches(rows, chunk_size):
+        yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in batch).encode('utf-8')
+
+
+def _arrow_type(pa, field):
+    internal_type = field.get_internal_type()
+    if internal_type in ('AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField', 'PositiveIntegerField', 'ForeignKey', 'OneToOneField'):
+        return pa.int64()
+    if internal_type == 'BooleanField':
+        return pa.bool_()
+    if internal_type == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if internal_type == 'WeiField':
+        # Up to 78 digits (2**256 - 1) do not fit decimal256's 76, so wei goes out as a base-10 string
+        return pa.string()
+    if internal_type == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    return pa.string()
+
+
+def parquet_chunks(model, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    schema = pa.schema([(column, _arrow_type(pa, fields[column])) for column in columns])
+    wei_columns = {index for index, column in enumerate(columns) if fields[column].get_internal_type() == 'WeiField'}
+
+    def column(batch, index):
+        values = [row[index] for row in batch]
+        if index in wei_columns:
+            values = [None if value is None else str(value) for value in values]
+        return pa.array(values, type=schema.field(index).type)
+    sink = io.BytesIO()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+        return data
+
+    # Each batch becomes one row group; the bytes written so far are streamed out
+    for batch in _batches(rows, chunk_size):
+        arrays = [column(batch, index) for index in range(len(columns))]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(resource, output='csv', compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return an iterator of bytes exporting every row of resource in the given format."""
+    if resource not in EXPORT_MODELS:
+        raise ExportError(f"Unknown resource '{resource}'. Choose from: {', '.join(EXPORT_MODELS)}.")
+    if output not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown output '{output}'. Choose from: {', '.join(EXPORT_FORMATS)}.")
+
+    model = EXPORT_MODELS[resource]
+    if output == 'parquet':
+        # Fail before the response starts if pyarrow is missing
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError('Parquet export requires pyarrow (pip install pyarrow).')
+
+    columns, rows = iter_rows(model, chunk_size)
+    if output == 'csv':
+        chunks = csv_chunks(columns, rows, chunk_size)
+    elif output == 'ndjson':
+        chunks = ndjson_chunks(columns, rows, chunk_size)
+    else:
+        chunks = parquet_chunks(model, columns, rows, chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(resource, output, compress):
+    return f"{resource}.{EXPORT_FORMATS[output][1]}{'.gz' if compress else ''}"
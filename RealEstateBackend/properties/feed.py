@@ -0,0 +1,261 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from . import dashboards
+from .models import ChangeEvent, Offer, Property, Transaction
+from .money import WeiField, format_ether
+
+
+def _concerned_users(instance):
+    # Users that see this change on their per-user feed
+    if isinstance(instance, Property):
+        user_ids = [instance.seller_id, instance.buyer_id, instance.agent_id]
+    elif isinstance(instance, Offer):
+        user_ids = [instance.buyer_id, instance.property.seller_id]
+    else:
+        user_ids = [instance.seller_id, instance.buyer_id]
+    return sorted({user_id for user_id in user_ids if user_id})
+
+
+def _payload(instance):
+    # Amounts as ether strings, like the REST API; wei integers overflow JavaScript numbers
+    payload = model_to_dict(instance)
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, WeiField) and field.name in payload:
+            payload[field.name] = format_ether(payload[field.name])
+    return payload
+
+
+def publish(instance, action, save=True):
+    """Record a change to a Property, Offer or Transaction for the push feed."""
+    if isinstance(instance, Property):
+        kind, property_id = 'property', instance.pk
+    elif isinstance(instance, Offer):
+        kind, property_id = 'offer', instance.property_id
+    elif isinstance(instance, Transaction):
+        kind, property_id = 'transaction', instance.property_id
+    else:
+        return None
+
+    event = ChangeEvent(
+        kind=kind,
+        action=action,
+        object_id=instance.pk,
+        property_id=property_id,
+        user_ids=_concerned_users(instance),
+        payload=_payload(instance),
+    )
+    if save:
+        event.save()
+        transaction.on_commit(lambda: dashboards.invalidate([event]))
+    return event
+
+
+def publish_many(instances, action):
+    """Bulk counterpart of publish() for rows written with bulk_create/bulk_update."""
+    events = []
+    for instance in instances:
+        event = publish(instance, action, save=False)
+        if event is not None:
+            events.append(event)
+    transaction.on_commit(lambda: dashboards.invalidate(events))
+    return ChangeEvent.objects.bulk_create(events)
+
+
+def publish_property_update(property_id, action='updated'):
+    """Publish a change made with ``QuerySet.update()``, which bypasses signals."""
+    property_obj = Property.objects.filter(pk=property_id).first()
+    if property_obj:
+        return publish(property_obj, action)
+    return None
+
+
+def format_sse(event):
+    data = json.dumps({
+        'kind': event.kind,
+        'action': event.action,
+        'id': event.object_id,
+        'property_id': event.property_id,
+        'data': event.payload,
+    }, cls=DjangoJSONEncoder)
+    return f'id: {event.pk}\nevent: {event.kind}\ndata: {data}\n\n'
+
+
+class Subscription:
+    """
+    One connected client. Events are buffered in a bounded queue; when a slow
+    client lets it fill up, the backlog is dropped and the client is told to
+    re-sync from the REST API instead of holding memory for it indefinitely.
+    """
+
+    def __init__(self, property_ids=None, user_id=None, max_queue_size=None):
+        self.property_ids = set(property_ids or [])
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=max_queue_size or settings.FEED_QUEUE_SIZE)
+        self.overflowed = False
+
+    def matches(self, event):
+        if not self.property_ids and self.user_id is None:
+            return True
+        if event.property_id in self.property_ids:
+            return True
+        return self.user_id is not None and self.user_id in event.user_ids
+
+    def put(self, event):
+        if self.overflowed or not self.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.resync()
+
+    def resync(self):
+        # Drop the backlog and leave a single marker telling the stream to close
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+        self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+def _fetch_events(after_id, limit):
+    return list(ChangeEvent.objects.filter(id__gt=after_id).order_by('id')[:limit])
+
+
+def _latest_event_id():
+    return ChangeEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _missed_events(last_event_id):
+    # Events are pruned oldest first, so if the client's last event is gone,
+    # part of what it missed is gone too: None tells it to re-sync instead
+    if last_event_id and not ChangeEvent.objects.filter(id=last_event_id).exists():
+        return None
+    return _fetch_events(last_event_id, settings.FEED_REPLAY_LIMIT)
+
+
+def prune_events(retention=None):
+    """
+    Delete change events older than the retention window (FEED_RETENTION_HOURS).
+
+    Events are only kept for replaying to reconnecting clients; a client whose
+    Last-Event-ID has been pruned is sent an overflow event and does a full
+    re-sync from the REST API instead.
+    """
+    if retention is None:
+        retention = timedelta(hours=settings.FEED_RETENTION_HOURS)
+    deleted, _ = ChangeEvent.objects.filter(created_at__lt=timezone.now() - retention).delete()
+    return deleted
+
+
+class Broker:
+    """
+    Fans change events out to every subscriber in this process. A single
+    polling task reads new ChangeEvent rows for all subscribers, so the
+    database load does not grow with the number of connected clients, and
+    events written by other processes (the event listener, other workers)
+    are picked up as well. The same task prunes events that fell out of the
+    retention window once every FEED_PRUNE_INTERVAL seconds.
+
+    Event ids are assigned at INSERT but become visible at COMMIT, so a long
+    transaction can commit event N after N+1 was dispatched. Ids skipped by
+    the cursor are therefore queried again on every poll for FEED_GAP_TIMEOUT
+    seconds (a rolled back insert leaves a gap that never fills); a late
+    event reaches clients after newer ones.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_event_id = None
+        self._task = None
+        self._pruned_at = None
+        self._gaps = {}  # skipped event id -> time.monotonic() it was first skipped
+
+    async def subscribe(self, subscription, last_event_id=None):
+        if self.last_event_id is None:
+            self.last_event_id = await sync_to_async(_latest_event_id)()
+        dispatched_up_to = self.last_event_id
+        self.subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._poll())
+        if last_event_id is not None:
+            # Replay what the client missed while it was disconnected; anything
+            # newer reaches it through the polling task
+            missed = await sync_to_async(_missed_events)(last_event_id)
+            if missed is None:
+                subscription.resync()
+                return subscription
+            for event in missed:
+                if event.pk <= dispatched_up_to:
+                    subscription.put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    def dispatch(self, events):
+        for event in events:
+            for subscription in list(self.subscribers):
+                subscription.put(event)
+            self.last_event_id = max(self.last_event_id, event.pk)
+
+    def fetch(self):
+        """Events that committed since the last poll: late ones from skipped ids first, then new ones."""
+        now = time.monotonic()
+        self._gaps = {pk: skipped_at for pk, skipped_at in self._gaps.items() if now - skipped_at < settings.FEED_GAP_TIMEOUT}
+        late = list(ChangeEvent.objects.filter(id__in=self._gaps).order_by('id')) if self._gaps else []
+        for event in late:
+            del self._gaps[event.pk]
+
+        events = _fetch_events(self.last_event_id, settings.FEED_BATCH_SIZE)
+        expected = self.last_event_id + 1
+        for event in events:
+            # Capped: a sequence that jumped far ahead is not a transaction in flight
+            for pk in range(expected, event.pk)[-settings.FEED_BATCH_SIZE:]:
+                self._gaps.setdefault(pk, now)
+            expected = event.pk + 1
+        return late + events
+
+    async def _poll(self):
+        while self.subscribers:
+            if self._pruned_at is None or time.monotonic() - self._pruned_at >= settings.FEED_PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                await sync_to_async(prune_events)()
+            events = await sync_to_async(self.fetch)()
+            self.dispatch(events)
+            if len(events) < settings.FEED_BATCH_SIZE:
+                await asyncio.sleep(settings.FEED_POLL_INTERVAL)
+
+
+broker = Broker()
+
+
+async def stream(subscription, last_event_id=None):
+    await broker.subscribe(subscription, last_event_id)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event = await subscription.get(settings.FEED_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                # The client fell too far behind, or reconnected with a Last-Event-ID
+                # that has been pruned; it refetches from the REST API
+                yield 'event: overflow\ndata: {}\n\n'
+                return
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
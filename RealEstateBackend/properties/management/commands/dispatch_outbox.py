@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.outbox import OutboxDispatcher
+from RealEstateBackend.contracts import ContractNotAvailable
+
+
+class Command(BaseCommand):
+    help = 'Sends the contract calls queued in the transaction outbox and follows them until they are mined.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single batch and exit')
+        parser.add_argument('--batch-size', type=int, help='Pending entries signed per tick (default: OUTBOX_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        dispatcher = OutboxDispatcher(batch_size=options['batch_size'])
+        if options['once']:
+            try:
+                sent, settled = dispatcher.tick()
+            except ContractNotAvailable as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"Sent {sent} outbox entries; {settled} mined.")
+            return
+
+        self.stdout.write("Outbox dispatcher running, Ctrl+C to stop.")
+        try:
+            dispatcher.run()
+        except KeyboardInterrupt:
+            pass
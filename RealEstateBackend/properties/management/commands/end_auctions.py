@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.auctions import AuctionScheduler, get_auction_book
+from RealEstateBackend.contracts import ContractNotAvailable
+
+
+class Command(BaseCommand):
+    help = 'Calls endAuction on chain as soon as an auction ends and records the winner in the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='End the auctions that are already due and exit')
+        parser.add_argument('--from-chain', action='store_true', help='Build and reload the auction book from contract logs instead of the database')
+        parser.add_argument('--from-block', type=int, default=0, help='First block scanned by --from-chain')
+
+    def handle(self, *args, **options):
+        if options['from_chain']:
+            try:
+                # Every later reload of the book reads the logs again instead of the database
+                get_auction_book().follow_chain(options['from_block'])
+            except ContractNotAvailable as e:
+                raise CommandError(str(e))
+
+        scheduler = AuctionScheduler()
+        if options['once']:
+            ended = scheduler.tick()
+            self.stdout.write(f"Sent endAuction for {len(ended)} auctions.")
+            return
+
+        self.stdout.write("Auction scheduler running, Ctrl+C to stop.")
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from properties.expiry import ExpiryScheduler, expire_due_offers, expire_offers_on_chain
+
+
+class Command(BaseCommand):
+    help = 'Expires offers past their expires_at in the database and calls expireOffers on chain for the affected properties.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single sweep and exit instead of scheduling')
+        parser.add_argument('--no-chain', action='store_true', help='Only update the database, skip expireOffers transactions')
+        parser.add_argument('--refresh-interval', type=float, help='Seconds between reloads of upcoming deadlines')
+
+    def handle(self, *args, **options):
+        expire_on_chain = None if options['no_chain'] else expire_offers_on_chain
+
+        if options['once']:
+            property_ids = expire_due_offers()
+            self.stdout.write(f"Expired offers on {len(property_ids)} properties.")
+            if property_ids and expire_on_chain:
+                results = expire_on_chain(property_ids)
+                confirmed = sum(1 for result in results if result['status'] == 'confirmed')
+                self.stdout.write(f"expireOffers confirmed for {confirmed} of {len(property_ids)} properties.")
+            return
+
+        scheduler = ExpiryScheduler(expire_on_chain=expire_on_chain, refresh_interval=options['refresh_interval'])
+        self.stdout.write("Offer expiry scheduler running, Ctrl+C to stop.")
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, EXPORT_MODELS, ExportError, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Streams properties, offers or transactions to a file or stdout as CSV, NDJSON or Parquet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(EXPORT_MODELS))
+        parser.add_argument('--output', choices=list(EXPORT_FORMATS), default='csv', help='Export format (default: csv)')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--file', help='Write to this path instead of stdout')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows fetched from the database per round trip')
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export_stream(options['resource'], options['output'], options['gzip'], options['chunk_size'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if options['file']:
+            with open(options['file'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            self.stderr.write(f"Exported {options['resource']} to {options['file']}")
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -1,27 +1,18 @@
 
-from django.core.management.base import BaseCommand
-from web3 import Web3
-import json
+from django.core.management.base import BaseCommand, CommandError
 import os
-from properties.models import Property, Offer
-from users.models import CustomUser
+from properties import outbox
+from properties.pricing import record_price_updates
+from properties.models import Property, Offer, Transaction
+from users.models import user_for_eth_address
+from RealEstateBackend import tracing
+from RealEstateBackend.contracts import ContractNotAvailable, get_contract, registry
+from RealEstateBackend.rpc import get_web3
 
-# Configure Web3 to connect to Ganache
-GANACHE_URL = os.environ.get('GANACHE_URL', 'http://127.0.0.1:8545')
-w3 = Web3(Web3.HTTPProvider(GANACHE_URL))
+w3 = get_web3()
 
-# Load contract ABI and address
-with open(os.path.join(os.path.dirname(__file__), '../../../artifacts/contracts/RealEstate.sol/RealEstate.json'), 'r') as f:
-    real_estate_artifact = json.load(f)
-
-REAL_ESTATE_ABI = real_estate_artifact['abi']
-
-with open(os.path.join(os.path.dirname(__file__), '../../../deployments/ganache-deployment.json'), 'r') as f:
-    ganache_deployment = json.load(f)
-
-REAL_ESTATE_ADDRESS = ganache_deployment['address']
-
-real_estate_contract = w3.eth.contract(address=REAL_ESTATE_ADDRESS, abi=REAL_ESTATE_ABI)
+# The events this command indexes, fetched together with one eth_getLogs per run
+HANDLED_EVENTS = ['PropertyListed', 'OfferAccepted', 'PropertySold', 'PriceUpdated']
 
 LAST_PROCESSED_BLOCK_FILE = os.path.join(os.path.dirname(__file__), 'last_processed_block.txt')
 
@@ -40,6 +31,10 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         self.stdout.write("Starting blockchain event listener...")
+        try:
+            real_estate_contract = get_contract(w3)
+        except ContractNotAvailable as e:
+            raise CommandError(str(e))
         last_block = get_last_processed_block()
         self.stdout.write(f"Last processed block: {last_block}")
 
@@ -51,20 +46,37 @@ class Command(BaseCommand):
 
             self.stdout.write(f"Processing blocks from {last_block + 1} to {current_block}")
 
+            indexed_hashes = []
+
+            events = self.fetch_events(real_estate_contract, last_block + 1, current_block)
+
             # Process PropertyListed events
-            property_listed_filter = real_estate_contract.events.PropertyListed.create_filter(fromBlock=last_block + 1, toBlock=current_block)
-            for event in property_listed_filter.get_all_entries():
+            for event in events['PropertyListed']:
                 self.process_property_listed_event(event)
+                indexed_hashes.append(event.transactionHash.hex())
 
             # Process OfferAccepted events
-            offer_accepted_filter = real_estate_contract.events.OfferAccepted.create_filter(fromBlock=last_block + 1, toBlock=current_block)
-            for event in offer_accepted_filter.get_all_entries():
+            for event in events['OfferAccepted']:
                 self.process_offer_accepted_event(event)
+                indexed_hashes.append(event.transactionHash.hex())
 
             # Process PropertySold events (if distinct from OfferAccepted leading to sale)
-            property_sold_filter = real_estate_contract.events.PropertySold.create_filter(fromBlock=last_block + 1, toBlock=current_block)
-            for event in property_sold_filter.get_all_entries():
+            for event in events['PropertySold']:
                 self.process_property_sold_event(event)
+                indexed_hashes.append(event.transactionHash.hex())
+
+            # Process PriceUpdated events into the price history
+            price_events = events['PriceUpdated']
+            if price_events:
+                block_timestamps = {number: w3.eth.get_block(number).timestamp for number in {event.blockNumber for event in price_events}}
+                recorded = record_price_updates(price_events, block_timestamps)
+                self.stdout.write(f"Recorded {recorded} price updates.")
+                indexed_hashes.extend(event.transactionHash.hex() for event in price_events)
+
+            # Closes the lifecycle traces of transactions this backend sent (see manage.py tx_traces)
+            tracing.mark_indexed(indexed_hashes)
+            # Closes the outbox entries these events came from (see manage.py dispatch_outbox)
+            outbox.close_indexed(indexed_hashes)
 
             set_last_processed_block(current_block)
             self.stdout.write(f"Successfully processed up to block {current_block}")
@@ -72,13 +84,29 @@ class Command(BaseCommand):
         except Exception as e:
             self.stderr.write(f"Error processing blockchain events: {e}")
 
+    def fetch_events(self, contract, from_block, to_block):
+        """The HANDLED_EVENTS logs in the block range, decoded and grouped by event name in chain order."""
+        topics = registry.metadata().event_topics
+        names = {topics[name]: name for name in HANDLED_EVENTS}
+        logs = w3.eth.get_logs({
+            'address': contract.address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': [list(names)],
+        })
+        events = {name: [] for name in HANDLED_EVENTS}
+        for log in logs:
+            name = names['0x' + bytes(log['topics'][0]).hex()]
+            events[name].append(getattr(contract.events, name)().process_log(log))
+        return events
+
     def process_property_listed_event(self, event):
         property_id = event.args.propertyId
         seller_address = event.args.seller
-        price = w3.from_wei(event.args.price, 'ether')
+        price = event.args.price # wei, stored as is
         location = event.args.details
 
-        seller_user = CustomUser.objects.filter(userprofile__eth_address=seller_address).first()
+        seller_user = user_for_eth_address(seller_address)
         if not seller_user:
             self.stdout.write(f"Seller {seller_address} not found in Django DB. Skipping property listing.")
             return
@@ -97,22 +125,23 @@ class Command(BaseCommand):
             self.stdout.write(f"Property {property_id} listed by {seller_address} on blockchain. Added to Django DB.")
         else:
             self.stdout.write(f"Property {property_id} already exists in Django DB. Updating.")
-            Property.objects.filter(id=property_id).update(
-                seller=seller_user,
-                price=price,
-                location=location,
-                description=location, # Using location as description for now
-                is_listed=True,
-                transaction_hash=event.transactionHash.hex()
-            )
+            # .save() rather than .update() so the feed and rollup signals fire
+            property_obj = Property.objects.get(id=property_id)
+            property_obj.seller = seller_user
+            property_obj.price = price
+            property_obj.location = location
+            property_obj.description = location # Using location as description for now
+            property_obj.is_listed = True
+            property_obj.transaction_hash = event.transactionHash.hex()
+            property_obj.save(update_fields=['seller', 'price', 'location', 'description', 'is_listed', 'transaction_hash'])
 
     def process_offer_accepted_event(self, event):
         property_id = event.args.propertyId
         buyer_address = event.args.buyer
-        offer_amount = w3.from_wei(event.args.offerAmount, 'ether')
+        offer_amount = event.args.offerAmount
 
         property_obj = Property.objects.filter(id=property_id).first()
-        buyer_user = CustomUser.objects.filter(userprofile__eth_address=buyer_address).first()
+        buyer_user = user_for_eth_address(buyer_address)
 
         if not property_obj:
             self.stdout.write(f"Property {property_id} not found in Django DB. Skipping offer acceptance.")
@@ -149,10 +178,10 @@ class Command(BaseCommand):
     def process_property_sold_event(self, event):
         property_id = event.args.propertyId
         buyer_address = event.args.buyer
-        sale_price = w3.from_wei(event.args.salePrice, 'ether')
+        sale_price = event.args.salePrice
 
         property_obj = Property.objects.filter(id=property_id).first()
-        buyer_user = CustomUser.objects.filter(userprofile__eth_address=buyer_address).first()
+        buyer_user = user_for_eth_address(buyer_address)
 
         if not property_obj:
             self.stdout.write(f"Property {property_id} not found in Django DB. Skipping property sold event.")
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from properties.feed import prune_events
+
+
+class Command(BaseCommand):
+    help = 'Deletes push feed change events older than the retention window (FEED_RETENTION_HOURS).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, help='Keep this many hours of events instead of FEED_RETENTION_HOURS')
+
+    def handle(self, *args, **options):
+        retention = timedelta(hours=options['hours']) if options['hours'] is not None else None
+        deleted = prune_events(retention)
+        self.stdout.write(f"Deleted {deleted} change events.")
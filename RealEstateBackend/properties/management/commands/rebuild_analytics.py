@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the market analytics rollups from every property and transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched from the database per round trip')
+
+    def handle(self, *args, **options):
+        try:
+            buckets = rebuild_rollups(options['chunk_size'])
+        except ImportError:
+            raise CommandError('rebuild_analytics requires pandas (pip install pandas).')
+        self.stdout.write(f"Rebuilt {buckets} analytics buckets.")
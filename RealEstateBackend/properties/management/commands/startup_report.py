@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(stderr):
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|', 2)
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Reports where startup time goes by running a manage.py command under `python -X importtime`.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', nargs='*', default=['check'], help='manage.py command to profile (default: check)')
+        parser.add_argument('--top', type=int, default=20, help='Number of modules to list')
+        parser.add_argument('--eager', action='store_true', help='Profile with FAST_BOOT=0 (web3 and contract loaded at startup)')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        if options['eager']:
+            env['FAST_BOOT'] = '0'
+        command = [sys.executable, '-X', 'importtime', os.path.join(settings.BASE_DIR, 'manage.py'), *options['target']]
+
+        started = time.perf_counter()
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f"`{' '.join(options['target'])}` failed:\n{result.stderr[-2000:]}")
+
+        rows = parse_importtime(result.stderr)
+        # Self times never overlap, so they add up to the total time spent importing
+        total_us = sum(self_us for _, self_us, _ in rows)
+        by_package = {}
+        for module, self_us, _ in rows:
+            package = module.split('.')[0]
+            by_package[package] = by_package.get(package, 0) + self_us
+
+        self.stdout.write(f"Command: manage.py {' '.join(options['target'])} (FAST_BOOT={'0' if options['eager'] else env.get('FAST_BOOT', '1')})")
+        self.stdout.write(f"Wall time: {elapsed * 1000:.0f} ms, of which imports: {total_us / 1000:.0f} ms ({len(rows)} modules)")
+
+        self.stdout.write("\nSlowest modules by cumulative import time:")
+        for module, _, cumulative_us in sorted(rows, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:>9.1f} ms  {module}")
+
+        self.stdout.write("\nImport time by top-level package:")
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:>9.1f} ms  {package}")
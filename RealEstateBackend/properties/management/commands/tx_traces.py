@@ -0,0 +1,63 @@
+import math
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from properties.models import TransactionTrace
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def format_ms(seconds):
+    return '-' if seconds is None else f'{seconds * 1000:.0f}'
+
+
+class Command(BaseCommand):
+    help = 'Reports per-stage latency (built -> sent -> mined -> indexed) and recent failures of the transactions the backend sent.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=float, default=60, help='Minutes of history to report (default: 60)')
+        parser.add_argument('--function', help='Only report this contract function, e.g. listProperty')
+        parser.add_argument('--failures', type=int, default=10, help='Number of recent failures to list')
+
+    def handle(self, *args, **options):
+        traces = TransactionTrace.objects.filter(started_at__gte=timezone.now() - timedelta(minutes=options['since']))
+        if options['function']:
+            traces = traces.filter(function=options['function'])
+        traces = list(traces.order_by('-started_at'))
+        if not traces:
+            self.stdout.write(f"No transactions in the last {options['since']:g} minutes.")
+            return
+
+        by_function = {}
+        for trace in traces:
+            by_function.setdefault(trace.function, []).append(trace)
+
+        stages = TransactionTrace.STAGES
+        self.stdout.write(f"{len(traces)} transactions in the last {options['since']:g} minutes; stage times in ms as p50/p95")
+        header = f"{'function':<24} {'sent':>5} {'ok':>5} {'reverted':>8} {'failed':>6}" + ''.join(f' {stage:>13}' for stage in stages)
+        self.stdout.write(header)
+        for function, rows in sorted(by_function.items()):
+            statuses = [row.status for row in rows]
+            durations = [row.durations() for row in rows]
+            line = f"{function:<24} {len(rows):>5} {statuses.count('confirmed'):>5} {statuses.count('reverted'):>8} {statuses.count('failed'):>6}"
+            for stage in stages:
+                values = sorted(d[stage] for d in durations if d[stage] is not None)
+                line += f" {format_ms(percentile(values, 0.5)) + '/' + format_ms(percentile(values, 0.95)):>13}"
+            self.stdout.write(line)
+
+        failures = [trace for trace in traces if trace.status != 'confirmed'][:options['failures']]
+        if failures:
+            self.stdout.write("\nRecent failures:")
+            for trace in failures:
+                where = f"at {trace.failed_stage}" if trace.status == 'failed' else f"in block {trace.block_number}"
+                self.stdout.write(
+                    f"  {trace.started_at:%Y-%m-%d %H:%M:%S} {trace.function} from {trace.sender or '?'}: "
+                    f"{trace.status} {where} {trace.transaction_hash or ''} {trace.error}".rstrip()
+                )
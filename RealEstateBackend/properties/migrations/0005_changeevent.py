@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:54
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0004_offer_transaction_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("property", "Property"),
+                            ("offer", "Offer"),
+                            ("transaction", "Transaction"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("action", models.CharField(max_length=20)),
+                ("object_id", models.BigIntegerField()),
+                (
+                    "property_id",
+                    models.BigIntegerField(blank=True, db_index=True, null=True),
+                ),
+                ("user_ids", models.JSONField(default=list)),
+                (
+                    "payload",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
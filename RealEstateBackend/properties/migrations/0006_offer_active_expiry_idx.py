@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0005_changeevent"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="offer",
+            index=models.Index(
+                fields=["is_active", "expires_at"], name="offer_active_expiry_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0006_offer_active_expiry_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MarketRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("type", "Property type"),
+                            ("day", "Day"),
+                            ("location", "Location"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("bucket", models.CharField(max_length=100)),
+                ("listed_count", models.PositiveIntegerField(default=0)),
+                (
+                    "listed_price_sum",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("sold_count", models.PositiveIntegerField(default=0)),
+                (
+                    "sale_price_sum",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("time_to_sale_sum", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "bucket"),
+                        name="market_rollup_bucket_unique",
+                    )
+                ],
+            },
+        ),
+    ]
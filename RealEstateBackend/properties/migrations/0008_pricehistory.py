@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0007_marketrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PriceHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("block_number", models.BigIntegerField()),
+                ("log_index", models.PositiveIntegerField()),
+                ("transaction_hash", models.CharField(max_length=66)),
+                ("old_price", models.DecimalField(decimal_places=18, max_digits=38)),
+                ("new_price", models.DecimalField(decimal_places=18, max_digits=38)),
+                ("block_timestamp", models.DateTimeField()),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="price_history",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["property", "block_number"],
+                        name="price_history_block_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("transaction_hash", "log_index"),
+                        name="price_history_log_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,122 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+import properties.money
+
+# (model, field, nullable) for every amount that moves from a Decimal of ether
+# to an integer number of wei.
+WEI_FIELDS = [
+    ("property", "price", False),
+    ("property", "offer_amount", True),
+    ("property", "minimum_bid", True),
+    ("offer", "amount", False),
+    ("transaction", "price", False),
+    ("pricehistory", "old_price", False),
+    ("pricehistory", "new_price", False),
+]
+
+# The ether columns being replaced; made nullable first so that, unapplied,
+# they are re-added empty and refilled from the wei columns
+ETHER_COLUMNS = {
+    "pricehistory": {"max_digits": 38, "decimal_places": 18},
+}
+
+ROLLUP_SUMS = ["listed_price", "sale_price"]
+
+
+def ether_to_wei(apps, schema_editor):
+    for model_name, field, _ in WEI_FIELDS:
+        model = apps.get_model("properties", model_name)
+        rows = []
+        for row in model.objects.exclude(**{f"{field}__isnull": True}).only("pk", field).iterator():
+            setattr(row, f"{field}_wei", properties.money.to_wei(getattr(row, field)))
+            rows.append(row)
+        model.objects.bulk_update(rows, [f"{field}_wei"], batch_size=500)
+
+    MarketRollup = apps.get_model("properties", "MarketRollup")
+    rollups = list(MarketRollup.objects.all())
+    for rollup in rollups:
+        for name in ROLLUP_SUMS:
+            wei = properties.money.to_wei(getattr(rollup, f"{name}_sum"))
+            setattr(rollup, f"{name}_gwei", wei // properties.money.WEI_PER_GWEI)
+            setattr(rollup, f"{name}_wei", wei % properties.money.WEI_PER_GWEI)
+    MarketRollup.objects.bulk_update(rollups, [f"{name}_{part}" for name in ROLLUP_SUMS for part in ("gwei", "wei")], batch_size=500)
+
+
+def wei_to_ether(apps, schema_editor):
+    for model_name, field, _ in WEI_FIELDS:
+        model = apps.get_model("properties", model_name)
+        rows = []
+        for row in model.objects.exclude(**{f"{field}_wei__isnull": True}).iterator():
+            setattr(row, field, properties.money.from_wei(getattr(row, f"{field}_wei")))
+            rows.append(row)
+        model.objects.bulk_update(rows, [field], batch_size=500)
+
+    MarketRollup = apps.get_model("properties", "MarketRollup")
+    rollups = list(MarketRollup.objects.all())
+    for rollup in rollups:
+        for name in ROLLUP_SUMS:
+            wei = getattr(rollup, f"{name}_gwei") * properties.money.WEI_PER_GWEI + getattr(rollup, f"{name}_wei")
+            setattr(rollup, f"{name}_sum", properties.money.from_wei(wei).quantize(Decimal("0.01")))
+    MarketRollup.objects.bulk_update(rollups, [f"{name}_sum" for name in ROLLUP_SUMS], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0008_pricehistory"),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model_name,
+                name=f"{field}_wei",
+                field=properties.money.WeiField(null=True),
+            )
+            for model_name, field, _ in WEI_FIELDS
+        ],
+        *[
+            migrations.AddField(
+                model_name="marketrollup",
+                name=f"{name}_{part}",
+                field=models.BigIntegerField(default=0),
+            )
+            for name in ROLLUP_SUMS
+            for part in ("gwei", "wei")
+        ],
+        *[
+            migrations.AlterField(
+                model_name=model_name,
+                name=field,
+                field=models.DecimalField(
+                    null=True, **ETHER_COLUMNS.get(model_name, {"max_digits": 10, "decimal_places": 2})
+                ),
+            )
+            for model_name, field, nullable in WEI_FIELDS
+            if not nullable
+        ],
+        migrations.RunPython(ether_to_wei, wei_to_ether),
+        *[
+            operation
+            for model_name, field, nullable in WEI_FIELDS
+            for operation in (
+                migrations.RemoveField(model_name=model_name, name=field),
+                migrations.RenameField(model_name=model_name, old_name=f"{field}_wei", new_name=field),
+                migrations.AlterField(
+                    model_name=model_name,
+                    name=field,
+                    field=(
+                        properties.money.WeiField(null=True, blank=True)
+                        if nullable
+                        else properties.money.WeiField()
+                    ),
+                ),
+            )
+        ],
+        *[
+            migrations.RemoveField(model_name="marketrollup", name=f"{name}_sum")
+            for name in ROLLUP_SUMS
+        ],
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0009_wei_amounts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionTrace",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("function", models.CharField(max_length=64)),
+                ("sender", models.CharField(blank=True, max_length=42)),
+                ("nonce", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "transaction_hash",
+                    models.CharField(
+                        blank=True, db_index=True, max_length=66, null=True
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("confirmed", "Confirmed"),
+                            ("reverted", "Reverted"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("error", models.TextField(blank=True)),
+                ("block_number", models.BigIntegerField(blank=True, null=True)),
+                ("gas_used", models.BigIntegerField(blank=True, null=True)),
+                ("started_at", models.DateTimeField(db_index=True)),
+                ("built_at", models.DateTimeField(blank=True, null=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("mined_at", models.DateTimeField(blank=True, null=True)),
+                ("indexed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:18
+
+import django.db.models.deletion
+import properties.money
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0010_transaction_trace"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=255, unique=True)),
+                ("function", models.CharField(max_length=64)),
+                ("args", models.JSONField(default=list)),
+                ("value", properties.money.WeiField(default=0)),
+                (
+                    "signer",
+                    models.CharField(
+                        choices=[
+                            ("seller", "Seller"),
+                            ("buyer", "Buyer"),
+                            ("appraiser", "Appraiser"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("signed", "Signed"),
+                            ("confirmed", "Confirmed"),
+                            ("indexed", "Indexed"),
+                            ("reverted", "Reverted"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("sender", models.CharField(blank=True, max_length=42)),
+                ("nonce", models.BigIntegerField(blank=True, null=True)),
+                ("raw_transaction", models.TextField(blank=True)),
+                (
+                    "transaction_hash",
+                    models.CharField(
+                        blank=True, db_index=True, max_length=66, null=True
+                    ),
+                ),
+                ("block_number", models.BigIntegerField(blank=True, null=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("closed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "offer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="outbox_entries",
+                        to="properties.offer",
+                    ),
+                ),
+                (
+                    "property",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="outbox_entries",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["status", "id"], name="outbox_status_idx")
+                ],
+            },
+        ),
+    ]
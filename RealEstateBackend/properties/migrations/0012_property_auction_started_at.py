@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0011_outbox_entry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="auction_started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    # WAL is stored in the database file, so it is switched on once here rather
+    # than by every connection (which rewrote the file on any manage.py command)
+    if schema_editor.connection.vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+
+class Migration(migrations.Migration):
+    # journal_mode cannot be changed inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("properties", "0012_property_auction_started_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0013_sqlite_wal"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="accepting_offer",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="properties.offer",
+            ),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="accepting_since",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from users.models import CustomUser
+from .money import WEI_PER_GWEI, WeiField
 
 class Property(models.Model):
     PROPERTY_TYPE_CHOICES = (
@@ -11,18 +13,22 @@ class Property(models.Model):
     )
 
     seller = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='properties')
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = WeiField()
     location = models.CharField(max_length=255)
     description = models.TextField()
     is_listed = models.BooleanField(default=False)
     is_sold = models.BooleanField(default=False)
     buyer = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchased_properties')
-    offer_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # The offer whose acceptOffer transaction is in flight (see views.claim_offer)
+    accepting_offer = models.ForeignKey('Offer', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    accepting_since = models.DateTimeField(null=True, blank=True)
+    offer_amount = WeiField(null=True, blank=True)
     is_inspection_passed = models.BooleanField(default=False)
     financing_approved = models.BooleanField(default=False)
     listed_at = models.DateTimeField(auto_now_add=True)
+    auction_started_at = models.DateTimeField(null=True, blank=True)
     auction_end_time = models.DateTimeField(null=True, blank=True)
-    minimum_bid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    minimum_bid = WeiField(null=True, blank=True)
     agent = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='agent_properties')
     agent_commission = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     property_type = models.CharField(max_length=20, choices=PROPERTY_TYPE_CHOICES)
@@ -37,12 +43,18 @@ class Property(models.Model):
 class Offer(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='offers')
     buyer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='offers_made')
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = WeiField()
     timestamp = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     expires_at = models.DateTimeField()
     transaction_hash = models.CharField(max_length=255, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Serves the expiry sweep and "next deadline" lookups of properties.expiry
+            models.Index(fields=['is_active', 'expires_at'], name='offer_active_expiry_idx'),
+        ]
+
     def __str__(self):
         return f'Offer for {self.property} by {self.buyer}'
 
@@ -50,9 +62,185 @@ class Transaction(models.Model):
     property = models.OneToOneField(Property, on_delete=models.CASCADE, related_name='transaction')
     seller = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sales')
     buyer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='purchases')
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = WeiField()
     timestamp = models.DateTimeField(auto_now_add=True)
     transaction_hash = models.CharField(max_length=255, blank=True, null=True)
 
     def __str__(self):
-        return f'Transaction for {self.property}'
\ No newline at end of file
+        return f'Transaction for {self.property}'
+
+class ChangeEvent(models.Model):
+    KIND_CHOICES = (
+        ('property', 'Property'),
+        ('offer', 'Offer'),
+        ('transaction', 'Transaction'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    action = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    property_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    user_ids = models.JSONField(default=list)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.kind} {self.action} #{self.object_id}'
+
+class MarketRollup(models.Model):
+    """
+    Running totals per bucket of one dimension (property type, calendar day or
+    location), kept up to date as properties are listed and sold so analytics
+    read a handful of rows instead of scanning Property and Transaction.
+    """
+    DIMENSION_CHOICES = (
+        ('type', 'Property type'),
+        ('day', 'Day'),
+        ('location', 'Location'),
+    )
+
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    bucket = models.CharField(max_length=100)
+    listed_count = models.PositiveIntegerField(default=0)
+    # Wei sums are split into whole gwei and the sub-gwei remainder so both halves
+    # stay exact 64-bit integers that any backend can increment in place
+    listed_price_gwei = models.BigIntegerField(default=0)
+    listed_price_wei = models.BigIntegerField(default=0)
+    sold_count = models.PositiveIntegerField(default=0)
+    sale_price_gwei = models.BigIntegerField(default=0)
+    sale_price_wei = models.BigIntegerField(default=0)
+    time_to_sale_sum = models.BigIntegerField(default=0)  # seconds from listing to sale, over sold_count sales
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'bucket'], name='market_rollup_bucket_unique'),
+        ]
+
+    @property
+    def listed_price_sum(self):
+        return self.listed_price_gwei * WEI_PER_GWEI + self.listed_price_wei
+
+    @property
+    def sale_price_sum(self):
+        return self.sale_price_gwei * WEI_PER_GWEI + self.sale_price_wei
+
+    def __str__(self):
+        return f'{self.dimension}={self.bucket}'
+
+class PriceHistory(models.Model):
+    """Append-only record of the contract's PriceUpdated events."""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='price_history')
+    block_number = models.BigIntegerField()
+    log_index = models.PositiveIntegerField()
+    transaction_hash = models.CharField(max_length=66)
+    old_price = WeiField()
+    new_price = WeiField()
+    block_timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['property', 'block_number'], name='price_history_block_idx'),
+        ]
+        constraints = [
+            # Replaying a block range does not duplicate rows
+            models.UniqueConstraint(fields=['transaction_hash', 'log_index'], name='price_history_log_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.property_id}: {self.old_price} -> {self.new_price} at block {self.block_number}'
+
+class TransactionTrace(models.Model):
+    """
+    Lifecycle of one transaction sent by the backend: built (nonce and gas
+    price fetched, gas estimated) -> sent (accepted by the node) -> mined
+    (receipt) -> indexed (its event processed by listen_for_events).
+    Written by RealEstateBackend.tracing, read by manage.py tx_traces.
+    """
+    STAGES = ('build', 'send', 'mine', 'index')
+    STATUS_CHOICES = (
+        ('confirmed', 'Confirmed'),
+        ('reverted', 'Reverted'),
+        ('failed', 'Failed'),
+    )
+
+    function = models.CharField(max_length=64)
+    sender = models.CharField(max_length=42, blank=True)
+    nonce = models.BigIntegerField(null=True, blank=True)
+    transaction_hash = models.CharField(max_length=66, blank=True, null=True, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    block_number = models.BigIntegerField(null=True, blank=True)
+    gas_used = models.BigIntegerField(null=True, blank=True)
+    started_at = models.DateTimeField(db_index=True)
+    built_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    mined_at = models.DateTimeField(null=True, blank=True)
+    indexed_at = models.DateTimeField(null=True, blank=True)
+
+    def durations(self):
+        """Seconds spent in each stage; None for stages the transaction did not complete."""
+        stamps = [self.started_at, self.built_at, self.sent_at, self.mined_at, self.indexed_at]
+        return {
+            stage: (end - start).total_seconds() if start and end else None
+            for stage, start, end in zip(self.STAGES, stamps, stamps[1:])
+        }
+
+    @property
+    def failed_stage(self):
+        if self.status != 'failed':
+            return None
+        return next((stage for stage, seconds in self.durations().items() if seconds is None), None)
+
+    def __str__(self):
+        return f'{self.function} {self.transaction_hash or "(not sent)"}: {self.status}'
+
+class OutboxEntry(models.Model):
+    """
+    A contract call the API committed to, written in the same database
+    transaction as the row it belongs to and sent by manage.py dispatch_outbox
+    (see properties.outbox). The signed transaction and its hash are saved
+    before it is broadcast, so a dispatcher that dies mid-send broadcasts the
+    same transaction again instead of sending a second one.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),  # not signed yet
+        ('signed', 'Signed'),  # signed with a nonce; broadcast, or about to be
+        ('confirmed', 'Confirmed'),  # mined
+        ('indexed', 'Indexed'),  # its event was processed by listen_for_events
+        ('reverted', 'Reverted'),
+        ('failed', 'Failed'),
+    )
+    OPEN_STATUSES = ('pending', 'signed', 'confirmed')
+    SIGNER_CHOICES = (
+        ('seller', 'Seller'),
+        ('buyer', 'Buyer'),
+        ('appraiser', 'Appraiser'),
+    )
+
+    key = models.CharField(max_length=255, unique=True)  # idempotency key
+    function = models.CharField(max_length=64)
+    args = models.JSONField(default=list)  # positional contract arguments
+    value = WeiField(default=0)
+    signer = models.CharField(max_length=10, choices=SIGNER_CHOICES)
+    property = models.ForeignKey(Property, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_entries')
+    offer = models.ForeignKey(Offer, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_entries')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    sender = models.CharField(max_length=42, blank=True)
+    nonce = models.BigIntegerField(null=True, blank=True)
+    raw_transaction = models.TextField(blank=True)
+    transaction_hash = models.CharField(max_length=66, blank=True, null=True, db_index=True)
+    block_number = models.BigIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)  # last broadcast
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The dispatcher's "oldest pending / signed entries" scans
+            models.Index(fields=['status', 'id'], name='outbox_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.function} ({self.key}): {self.status}'
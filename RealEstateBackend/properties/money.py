@@ -0,0 +1,99 @@
+from decimal import Context, Decimal, InvalidOperation
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+
+# Amounts are kept as integer wei from the API boundary to the contract call.
+# Ether is only a presentation unit: converted exactly with Decimal, never float.
+
+WEI_PER_ETHER = 10 ** 18
+WEI_PER_GWEI = 10 ** 9
+MAX_WEI = 2 ** 256 - 1
+WEI_DIGITS = len(str(MAX_WEI))  # 78
+
+_EXACT = Context(prec=WEI_DIGITS + 20)
+
+
+def to_wei(ether):
+    """Exact ether -> wei for an int, Decimal or numeric string."""
+    if isinstance(ether, bool):
+        raise TypeError('Ether amounts cannot be booleans.')
+    if isinstance(ether, int):
+        return ether * WEI_PER_ETHER
+    if isinstance(ether, float):
+        # Only for literals in tests and scripts; request data arrives as strings
+        ether = repr(ether)
+    wei = Decimal(ether).scaleb(18, context=_EXACT)
+    if not wei.is_finite() or wei != wei.to_integral_value():
+        raise ValueError(f'{ether} ether is not a whole number of wei.')
+    return int(wei)
+
+
+def from_wei(wei):
+    return Decimal(wei).scaleb(-18, context=_EXACT)
+
+
+def format_ether(wei):
+    """'1.5' for 1500000000000000000 wei; no exponent, no trailing zeros."""
+    if wei is None:
+        return None
+    return format(from_wei(wei).normalize(_EXACT), 'f')
+
+
+class WeiField(models.Field):
+    """
+    An unsigned 256-bit amount of wei.
+
+    Stored as NUMERIC(78, 0) on PostgreSQL, so comparisons, ordering and
+    aggregates run on exact integers in the database. Other backends (SQLite
+    in development) store zero-padded text, which keeps equality, ordering
+    and MIN/MAX exact but not SQL arithmetic.
+    """
+    description = 'Amount in wei'
+    empty_strings_allowed = False
+    default_error_messages = {
+        'invalid': '“%(value)s” is not a whole, non-negative amount of wei.',
+    }
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return f'numeric({WEI_DIGITS}, 0)'
+        return f'varchar({WEI_DIGITS})'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return int(value)
+
+    def to_python(self, value):
+        if value is None or (isinstance(value, int) and not isinstance(value, bool)):
+            wei = value
+        else:
+            try:
+                wei = int(Decimal(str(value)))
+                if wei != Decimal(str(value)):
+                    raise ValueError
+            except (InvalidOperation, ValueError):
+                raise exceptions.ValidationError(self.error_messages['invalid'], code='invalid', params={'value': value})
+        if wei is not None and not 0 <= wei <= MAX_WEI:
+            raise exceptions.ValidationError(self.error_messages['invalid'], code='invalid', params={'value': value})
+        return wei
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if hasattr(value, 'resolve_expression'):
+            return value
+        return self.to_python(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'resolve_expression'):
+            return value
+        if connection.vendor == 'postgresql':
+            return Decimal(value)
+        return str(value).zfill(WEI_DIGITS)
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': forms.IntegerField, 'min_value': 0, **kwargs})
@@ -0,0 +1,331 @@
+import datetime
+import logging
+import os
+import re
+import threading
+import uuid
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from . import feed
+from .models import Offer, OutboxEntry, Property
+
+logger = logging.getLogger(__name__)
+
+# Transactional outbox for contract calls. The API writes a row and the
+# OutboxEntry for its contract call in one database transaction (enqueue_*),
+# so neither exists without the other, and returns without touching the chain.
+# OutboxDispatcher (manage.py dispatch_outbox) sends the entries; an entry's
+# signed transaction is saved before it is broadcast and only that transaction
+# is ever broadcast for it, so a crash or retry cannot send the call twice.
+# listen_for_events closes entries when it processes their events.
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+KEY_LENGTH = 200  # of the client's key; the stored key adds the user id and a bulk index
+
+
+def idempotency_key(request, user=None):
+    """The request's Idempotency-Key header scoped to its user, or None without one."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    return f'{(user or request.user).pk}:{key[:KEY_LENGTH]}' if key else None
+
+
+def enqueue(function, args, signer, key=None, value=0, property=None, offer=None):
+    """Add a contract call to the outbox; call it in the transaction that writes the call's rows."""
+    return OutboxEntry.objects.create(
+        key=key or uuid.uuid4().hex, function=function, args=args, value=value, signer=signer,
+        property=property, offer=offer,
+    )
+
+
+def listing_entry(property, agent_address, key=None):
+    """An unsaved outbox entry for listing property on chain."""
+    from RealEstateBackend.blockchain import PROPERTY_TYPE_MAP
+    return OutboxEntry(key=key or uuid.uuid4().hex, function='listProperty', args=[
+        property.price,
+        property.location,
+        PROPERTY_TYPE_MAP.get(property.property_type, 0),
+        property.area or 0,
+        property.bedrooms or 0,
+        property.bathrooms or 0,
+        agent_address,
+        int(property.agent_commission or 0),
+    ], signer='seller', property=property)
+
+
+def enqueue_listing(property, agent_address, key=None):
+    entry = listing_entry(property, agent_address, key)
+    entry.save()
+    return entry
+
+
+def enqueue_listings(properties, agent_address, key=None, indexes=None):
+    """
+    Outbox entries for many listings in one INSERT. With a key, each entry gets
+    key/<index>, the position of its listing in the request (indexes, by default
+    0, 1, ...), so a retry can match the entries to the request's items.
+    """
+    if indexes is None:
+        indexes = range(len(properties))
+    return OutboxEntry.objects.bulk_create([
+        listing_entry(property, agent_address, f'{key}/{index}' if key else None)
+        for index, property in zip(indexes, properties)
+    ])
+
+
+def queued_listings(key):
+    """{request index: entry} of the listings enqueue_listings queued under key."""
+    if not key:
+        return {}
+    # Anchored, so the entries of a longer key such as key/x are not picked up
+    entries = OutboxEntry.objects.filter(key__regex=rf'^{re.escape(key)}/[0-9]+$')
+    return {int(entry.key.rsplit('/', 1)[1]): entry for entry in entries}
+
+
+def enqueue_offer(offer, key=None):
+    # submitOffer takes expiresIn, counted from when it is mined; the deadline is
+    # stored instead and turned into seconds when the entry is signed (call_args)
+    return enqueue('submitOffer', [offer.property_id, offer.expires_at.isoformat()], 'buyer', key=key, value=offer.amount, offer=offer)
+
+
+def call_args(entry, now=None):
+    """The arguments to sign entry's call with now, or None when it is too late to send it."""
+    if entry.function != 'submitOffer':
+        return entry.args
+    property_id, expires_at = entry.args
+    expires_in_seconds = int((datetime.datetime.fromisoformat(expires_at) - (now or timezone.now())).total_seconds())
+    return [property_id, expires_in_seconds] if expires_in_seconds > 0 else None
+
+
+def describe(entry):
+    return {
+        'id': entry.pk,
+        'status': entry.status,
+        'transaction_hash': entry.transaction_hash,
+        'error': entry.error or None,
+    }
+
+
+def close_indexed(tx_hashes):
+    """Close the entries whose events listen_for_events processed; returns how many."""
+    if not tx_hashes:
+        return 0
+    return OutboxEntry.objects.filter(
+        transaction_hash__in=set(tx_hashes), status__in=('signed', 'confirmed'),
+    ).update(status='indexed', closed_at=timezone.now())
+
+
+def undo(entry):
+    """Remove the rows written for a call that will never be mined."""
+    if entry.function == 'listProperty' and entry.property_id:
+        property = Property.objects.filter(pk=entry.property_id).first()
+        if property:
+            property.delete()
+    elif entry.offer_id:
+        Offer.objects.filter(pk=entry.offer_id).delete()
+
+
+class OutboxDispatcher:
+    """
+    Drains the outbox to the chain. Each tick first follows up the signed
+    entries (receipt, rebroadcast, or back to pending when their nonce was
+    used by another transaction), then signs and broadcasts the oldest
+    pending entries of each signing key with consecutive nonces, without
+    waiting for them to be mined.
+
+    Run a single dispatcher: two would give different transactions the same
+    nonce.
+    """
+
+    def __init__(self, batch_size=None, max_attempts=None, rebroadcast_after=None):
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self.rebroadcast_after = settings.OUTBOX_REBROADCAST_AFTER if rebroadcast_after is None else rebroadcast_after
+        self._stopped = threading.Event()
+
+    def tick(self):
+        """Returns (entries sent, entries settled)."""
+        from RealEstateBackend import blockchain
+        settled = self.follow_up(blockchain)
+        sent = self.send_pending(blockchain)
+        return sent, settled
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                sent, _ = self.tick()
+            except Exception:
+                logger.exception('Outbox tick failed')
+                sent = 0
+            # A full batch means more are waiting: go again without sleeping
+            if sent < self.batch_size:
+                self._stopped.wait(settings.OUTBOX_POLL_INTERVAL)
+
+    def stop(self):
+        self._stopped.set()
+
+    def follow_up(self, blockchain):
+        entries = list(OutboxEntry.objects.filter(status='signed').order_by('pk'))
+        if not entries:
+            return 0
+        mined_nonces, receipts = blockchain.mined_nonces_and_receipts(
+            {entry.sender for entry in entries}, [entry.transaction_hash for entry in entries],
+        )
+        settled = 0
+        now = timezone.now()
+        for entry in entries:
+            receipt = receipts[entry.transaction_hash]
+            if receipt is not None:
+                self.settle(entry, receipt)
+                settled += 1
+            elif mined_nonces[entry.sender] > entry.nonce:
+                # Re-signing sends the call a second time if this one was mined
+                # after all, so not while a node still knows the transaction
+                if blockchain.get_transaction(entry.transaction_hash) is not None:
+                    continue
+                logger.warning('Nonce %s of %s was used by another transaction; re-signing outbox entry %s', entry.nonce, entry.sender, entry.pk)
+                self.release(entry, f'nonce {entry.nonce} was used by another transaction')
+            elif entry.sent_at is None or (now - entry.sent_at).total_seconds() >= self.rebroadcast_after:
+                self.broadcast(blockchain, entry)
+        return settled
+
+    def send_pending(self, blockchain):
+        entries = list(OutboxEntry.objects.filter(status='pending').order_by('pk')[:self.batch_size])
+        by_signer = {}
+        for entry in entries:
+            by_signer.setdefault(entry.signer, []).append(entry)
+        sent = 0
+        for signer, group in by_signer.items():
+            private_key = os.environ.get(f'{signer.upper()}_PRIVATE_KEY')
+            if not private_key:
+                logger.error('%s_PRIVATE_KEY is not set; %s outbox entries are waiting', signer.upper(), len(group))
+                continue
+            sent += self.send_batch(blockchain, private_key, group)
+        return sent
+
+    def send_batch(self, blockchain, private_key, entries):
+        from web3.exceptions import ContractLogicError
+
+        sender = blockchain.account_address(private_key)
+        nonce = blockchain.next_nonce(sender)
+        # Signed entries the node has not accepted yet keep their nonces
+        last_signed = OutboxEntry.objects.filter(sender=sender, status='signed').aggregate(Max('nonce'))['nonce__max']
+        if last_signed is not None:
+            nonce = max(nonce, last_signed + 1)
+        gas_price = blockchain.current_gas_price()
+
+        sent = 0
+        for entry in entries:
+            args = call_args(entry)
+            if args is None:
+                self.fail(entry, 'The offer expired before it was sent')
+                continue
+            try:
+                raw_transaction, tx_hash = blockchain.sign_contract_call(private_key, entry.function, args, nonce, gas_price, entry.value)
+            except ContractLogicError as e:
+                self.fail(entry, f'Reverted: {e}')
+                continue
+            except Exception as e:
+                self.retry_later(entry, e)
+                # Most likely the node is unreachable; the rest waits for the next tick
+                break
+            entry.status = 'signed'
+            entry.sender = sender
+            entry.nonce = nonce
+            entry.raw_transaction = raw_transaction
+            entry.transaction_hash = tx_hash
+            entry.error = ''
+            # Saved before it is broadcast: from now on this entry is only ever sent as this transaction
+            entry.save(update_fields=['status', 'sender', 'nonce', 'raw_transaction', 'transaction_hash', 'error'])
+            self.link(entry)
+            nonce += 1
+            self.broadcast(blockchain, entry)
+            sent += 1
+        return sent
+
+    def broadcast(self, blockchain, entry):
+        try:
+            blockchain.broadcast_transaction(entry.raw_transaction)
+        except Exception as e:
+            # Some nodes answer a rebroadcast of a transaction they hold with an error
+            try:
+                known = blockchain.get_transaction(entry.transaction_hash) is not None
+            except Exception:
+                known = None
+            if not known:
+                entry.error = str(e)
+                # Only a node that answered and does not have the transaction counts as a failed attempt
+                if known is False:
+                    entry.attempts += 1
+                if entry.attempts >= self.max_attempts:
+                    self.abandon(blockchain, entry)
+                else:
+                    entry.save(update_fields=['attempts', 'error'])
+                return False
+        entry.sent_at = timezone.now()
+        entry.save(update_fields=['sent_at'])
+        return True
+
+    def settle(self, entry, receipt):
+        entry.block_number = receipt.blockNumber
+        if receipt.status == 1:
+            entry.status = 'confirmed'
+            entry.save(update_fields=['status', 'block_number'])
+            return
+        entry.status = 'reverted'
+        entry.closed_at = timezone.now()
+        entry.save(update_fields=['status', 'block_number', 'closed_at'])
+        undo(entry)
+
+    def release(self, entry, reason):
+        """Back to pending, to be signed again with a new nonce."""
+        entry.status = 'pending'
+        entry.sender = ''
+        entry.nonce = None
+        entry.raw_transaction = ''
+        entry.transaction_hash = None
+        entry.sent_at = None
+        entry.error = reason
+        entry.save(update_fields=['status', 'sender', 'nonce', 'raw_transaction', 'transaction_hash', 'sent_at', 'error'])
+
+    def retry_later(self, entry, error):
+        entry.attempts += 1
+        if entry.attempts >= self.max_attempts:
+            self.fail(entry, str(error))
+        else:
+            entry.error = str(error)
+            entry.save(update_fields=['attempts', 'error'])
+
+    def fail(self, entry, error):
+        entry.status = 'failed'
+        entry.error = error
+        entry.closed_at = timezone.now()
+        entry.save(update_fields=['status', 'attempts', 'error', 'closed_at'])
+        undo(entry)
+
+    def abandon(self, blockchain, entry):
+        """
+        Give up on a signed transaction the node keeps refusing. Its nonce goes
+        to an empty transaction instead, or the sender's later transactions
+        could never be mined.
+        """
+        private_key = os.environ.get(f'{entry.signer.upper()}_PRIVATE_KEY')
+        try:
+            raw_transaction, _ = blockchain.sign_nonce_filler(private_key, entry.nonce, blockchain.current_gas_price())
+            blockchain.broadcast_transaction(raw_transaction)
+        except Exception:
+            logger.exception('Could not fill nonce %s of %s; its later transactions are stuck', entry.nonce, entry.sender)
+        self.fail(entry, entry.error)
+
+    def link(self, entry):
+        """Give the entry's rows the hash of the transaction that will create them on chain."""
+        if entry.property_id and entry.function == 'listProperty':
+            Property.objects.filter(pk=entry.property_id).update(transaction_hash=entry.transaction_hash)
+            # QuerySet.update() skips post_save, so the feed is told explicitly
+            feed.publish_property_update(entry.property_id)
+        elif entry.offer_id:
+            offers = Offer.objects.filter(pk=entry.offer_id)
+            offers.update(transaction_hash=entry.transaction_hash)
+            feed.publish_many(offers.select_related('property'), 'updated')
@@ -0,0 +1,122 @@
+import datetime
+
+from django.db.models import BigIntegerField, ExpressionWrapper, F, Max, Min, Window
+from django.db.models.functions import FirstValue, LastValue, RowNumber
+
+from .models import PriceHistory, Property
+from .money import format_ether
+
+MAX_POINTS = 1000
+
+
+def record_price_updates(events, block_timestamps):
+    """
+    Store PriceUpdated logs (as returned by web3) and move Property.price to the
+    latest stored price; replaying an older block range leaves it unchanged.
+    block_timestamps maps block number to its unix timestamp.
+    """
+    known = set(Property.objects.filter(pk__in={event.args.propertyId for event in events}).values_list('pk', flat=True))
+    rows = [
+        PriceHistory(
+            property_id=event.args.propertyId,
+            block_number=event.blockNumber,
+            log_index=event.logIndex,
+            transaction_hash=event.transactionHash.hex(),
+            old_price=event.args.oldPrice,
+            new_price=event.args.newPrice,
+            block_timestamp=datetime.datetime.fromtimestamp(block_timestamps[event.blockNumber], tz=datetime.timezone.utc),
+        )
+        for event in events if event.args.propertyId in known
+    ]
+    PriceHistory.objects.bulk_create(rows, ignore_conflicts=True)
+
+    latest = {}
+    for row in sorted(rows, key=lambda row: (row.block_number, row.log_index)):
+        latest[row.property_id] = row
+    for property_id, row in latest.items():
+        # A replayed older block range must not move the price back when newer
+        # PriceUpdated logs are already stored
+        newest = (
+            PriceHistory.objects.filter(property_id=property_id)
+            .order_by('-block_number', '-log_index')
+            .values_list('block_number', 'log_index')
+            .first()
+        )
+        if newest is not None and newest > (row.block_number, row.log_index):
+            continue
+        # .save() rather than .update() so the feed and rollup signals fire
+        property = Property.objects.get(pk=property_id)
+        property.price = row.new_price
+        property.save(update_fields=['price'])
+    return len(rows)
+
+
+def _change_pct(old, new):
+    return (new - old) * 100 / old if old else None
+
+
+def price_series(property_id, from_block=None, to_block=None, points=None):
+    """
+    PriceUpdated history of a property between two blocks, oldest first.
+
+    With points, the block range is split into that many equal buckets and each
+    non-empty bucket is reduced in SQL with window functions to its first and
+    last block, open/close/low/high price; change_pct is close against open.
+    """
+    history = PriceHistory.objects.filter(property_id=property_id)
+    if from_block is not None:
+        history = history.filter(block_number__gte=from_block)
+    if to_block is not None:
+        history = history.filter(block_number__lte=to_block)
+    ordering = [F('block_number').asc(), F('log_index').asc()]
+
+    if not points:
+        return [
+            {
+                'block_number': row['block_number'],
+                'timestamp': row['block_timestamp'],
+                'old_price': format_ether(row['old_price']),
+                'price': format_ether(row['new_price']),
+                'change_pct': _change_pct(row['old_price'], row['new_price']),
+            }
+            for row in history.order_by(*ordering).values('block_number', 'block_timestamp', 'old_price', 'new_price')
+        ]
+
+    bounds = history.aggregate(low=Min('block_number'), high=Max('block_number'))
+    if bounds['low'] is None:
+        return []
+    low = from_block if from_block is not None else bounds['low']
+    high = to_block if to_block is not None else bounds['high']
+    span = max(high - low + 1, 1)
+    bucket = ExpressionWrapper((F('block_number') - low) * min(points, MAX_POINTS) / span, output_field=BigIntegerField())
+    whole_bucket = {'partition_by': [F('bucket')], 'order_by': ordering}
+
+    rows = (
+        history.annotate(bucket=bucket)
+        .annotate(
+            first_block=Window(FirstValue('block_number'), **whole_bucket),
+            first_timestamp=Window(FirstValue('block_timestamp'), **whole_bucket),
+            open=Window(FirstValue('old_price'), **whole_bucket),
+            low=Window(Min('new_price'), partition_by=[F('bucket')]),
+            high=Window(Max('new_price'), partition_by=[F('bucket')]),
+            # Numbered newest first, so row 1 of each bucket carries its closing price
+            position=Window(RowNumber(), partition_by=[F('bucket')], order_by=[F('block_number').desc(), F('log_index').desc()]),
+        )
+        .filter(position=1)
+        .order_by('bucket')
+        .values('first_block', 'block_number', 'first_timestamp', 'block_timestamp', 'open', 'new_price', 'low', 'high', 'bucket')
+    )
+    return [
+        {
+            'from_block': row['first_block'],
+            'to_block': row['block_number'],
+            'from_timestamp': row['first_timestamp'],
+            'to_timestamp': row['block_timestamp'],
+            'open': format_ether(row['open']),
+            'close': format_ether(row['new_price']),
+            'low': format_ether(row['low']),
+            'high': format_ether(row['high']),
+            'change_pct': _change_pct(row['open'], row['new_price']),
+        }
+        for row in rows
+    ]
@@ -1,9 +1,46 @@
 
+from decimal import InvalidOperation
 from rest_framework import serializers
 from .models import Property, Offer, Transaction
+from .money import MAX_WEI, WeiField, format_ether, to_wei
 from users.serializers import CustomUserSerializer
+from RealEstateBackend.metrics import TimedSerializerMixin
 
-class PropertySerializer(serializers.ModelSerializer):
+class EtherField(serializers.Field):
+    """
+    A WeiField as an exact ether string ("1.5"). Accepts strings or numbers with
+    up to 18 decimal places and validates to integer wei.
+    """
+    default_error_messages = {
+        'invalid': 'A valid ether amount is required.',
+        'precision': 'Ether amounts have at most 18 decimal places.',
+        'range': 'Ether amounts must be positive.',
+    }
+
+    def __init__(self, allow_zero=False, **kwargs):
+        self.allow_zero = allow_zero
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (str, int, float)):
+            self.fail('invalid')
+        try:
+            wei = to_wei(data.strip() if isinstance(data, str) else data)
+        except (InvalidOperation, TypeError):
+            self.fail('invalid')
+        except ValueError:
+            self.fail('precision')
+        if wei < 0 or wei > MAX_WEI or (wei == 0 and not self.allow_zero):
+            self.fail('range')
+        return wei
+
+    def to_representation(self, value):
+        return format_ether(value)
+
+class WeiModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    serializer_field_mapping = {**serializers.ModelSerializer.serializer_field_mapping, WeiField: EtherField}
+
+class PropertySerializer(WeiModelSerializer):
     seller = CustomUserSerializer(read_only=True)
     buyer = CustomUserSerializer(read_only=True)
     agent = CustomUserSerializer(read_only=True)
@@ -11,9 +48,9 @@ class PropertySerializer(serializers.ModelSerializer):
     class Meta:
         model = Property
         fields = '__all__'
-        read_only_fields = ('seller', 'buyer', 'transaction_hash')
+        read_only_fields = ('seller', 'buyer', 'transaction_hash', 'auction_started_at', 'accepting_offer', 'accepting_since')
 
-class OfferSerializer(serializers.ModelSerializer):
+class OfferSerializer(WeiModelSerializer):
     buyer = CustomUserSerializer(read_only=True)
 
     class Meta:
@@ -21,7 +58,7 @@ class OfferSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('buyer', 'transaction_hash')
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(WeiModelSerializer):
     seller = CustomUserSerializer(read_only=True)
     buyer = CustomUserSerializer(read_only=True)
     property = PropertySerializer(read_only=True)
@@ -37,3 +74,10 @@ class InspectionUpdateSerializer(serializers.ModelSerializer):
 
 class OfferActionSerializer(serializers.Serializer):
     pass
+
+class AuctionStartSerializer(serializers.Serializer):
+    minimum_bid = EtherField()
+    duration = serializers.IntegerField(min_value=1, help_text='Auction length in seconds')
+
+class AuctionBidSerializer(serializers.Serializer):
+    amount = EtherField()
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import analytics
+from .feed import publish
+from .models import Offer, Property, Transaction
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=Offer)
+@receiver(post_save, sender=Transaction)
+def publish_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    publish(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Property)
+@receiver(post_delete, sender=Offer)
+@receiver(post_delete, sender=Transaction)
+def publish_deleted(sender, instance, **kwargs):
+    publish(instance, 'deleted')
+
+
+@receiver(pre_save, sender=Property)
+def remember_listing(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The stored row, for update_analytics to take out of its old buckets
+    instance._listing_before = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(analytics.LISTING_FIELDS):
+        return
+    instance._listing_before = Property.objects.filter(pk=instance.pk).only(*analytics.LISTING_FIELDS).first()
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=Transaction)
+def update_analytics(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if sender is Transaction:
+        if created:
+            analytics.record_sale(instance)
+    elif created:
+        analytics.record_listing(instance)
+    elif getattr(instance, '_listing_before', None) is not None:
+        analytics.move_listing(instance._listing_before, instance)
+        instance._listing_before = None
+
+
+@receiver(post_delete, sender=Property)
+def forget_deleted_listing(sender, instance, **kwargs):
+    analytics.forget_listing(instance)
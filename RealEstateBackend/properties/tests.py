@@ -1,18 +1,48 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
-from .models import Property, Offer
+from django.db import connection
+from django.test import TransactionTestCase
+from unittest import skipUnless
+from rest_framework.test import APITestCase, APIClient
+from .models import Property, Offer, ChangeEvent, MarketRollup, Transaction, PriceHistory, OutboxEntry
+from . import analytics, dashboards, feed, outbox
+from .expiry import ExpiryScheduler, expire_due_offers
+from .auctions import AuctionBook, AuctionScheduler, get_auction_book
+from .money import MAX_WEI, format_ether, to_wei
+from .serializers import EtherField
+from rest_framework.exceptions import ValidationError
+from .pricing import record_price_updates
+from .management.commands.startup_report import parse_importtime
 from users.models import CustomUser, UserProfile
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock, MagicMock
+from types import SimpleNamespace
+from rest_framework.authtoken.models import Token
+import asyncio
+import importlib.util
+import itertools
+import time
+import gzip
+import json
+import os
+import io
+import tempfile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+from datetime import timedelta
 
 class PropertyTests(APITestCase):
     def setUp(self):
         # Create users with different roles
         self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
-        UserProfile.objects.create(user=self.seller, eth_address="0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+        UserProfile.objects.create(user=self.seller, eth_address="0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266")
 
         self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
-        UserProfile.objects.create(user=self.buyer, eth_address="0x59c6995e998f97a5a004496c17f0ab241a74142305fd218621064954ee166979")
+        UserProfile.objects.create(user=self.buyer, eth_address="0x70997970c51812dc3a010c7d01b50e0d17dc79c8")
 
         self.appraiser = CustomUser.objects.create_user(username='appraiser', password='password', user_type='appraiser')
         UserProfile.objects.create(user=self.appraiser, eth_address="0x70997970c51812dc3a010c7d01fd1c0aa0fcd34f")
@@ -42,6 +72,63 @@ class PropertyTests(APITestCase):
         self.assertEqual(Property.objects.get().location, 'Test Location')
         mock_list_property.assert_called_once()
 
+    @patch('RealEstateBackend.blockchain.list_properties_on_blockchain')
+    def test_bulk_create_properties(self, mock_list_properties):
+        """
+        Ensure a seller can list many properties at once and gets a status per item.
+        """
+        mock_list_properties.return_value = [
+            {'status': 'confirmed', 'transaction_hash': '0xbulk1', 'error': None},
+            {'status': 'reverted', 'transaction_hash': '0xbulk2', 'error': None},
+        ]
+        url = reverse('property-bulk-create')
+        data = [
+            {'price': 100000.00, 'location': 'First', 'description': 'First', 'property_type': 'RESIDENTIAL'},
+            {'price': 200000.00, 'location': 'Second', 'description': 'Second', 'property_type': 'LAND'},
+            {'price': 300000.00, 'location': 'Invalid', 'description': 'Invalid', 'property_type': 'CASTLE'},
+        ]
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result['status'] for result in response.data['results']], ['listed', 'failed', 'invalid'])
+        self.assertEqual(Property.objects.get().transaction_hash, '0xbulk1')
+        self.assertEqual(len(mock_list_properties.call_args.args[1]), 2)
+
+    @patch('RealEstateBackend.blockchain.list_properties_on_blockchain')
+    def test_bulk_listings_are_saved_only_once_confirmed(self, mock_list_properties):
+        """
+        Ensure no bulk listing row exists while the chain call runs, and none is left after it fails.
+        """
+        existing = Property.objects.count()
+
+        def chain_call(private_key, listings, agent_address):
+            self.assertEqual(Property.objects.count(), existing)
+            raise TimeoutError('not mined')
+        mock_list_properties.side_effect = chain_call
+
+        data = [{'price': 100000.00, 'location': f'Pending {n}', 'description': 'Pending', 'property_type': 'LAND'} for n in range(2)]
+        response = self.client.post(reverse('property-bulk-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(Property.objects.count(), existing)
+
+    @patch('RealEstateBackend.blockchain.list_properties_on_blockchain')
+    def test_bulk_create_properties_from_csv(self, mock_list_properties):
+        """
+        Ensure listings can be uploaded as a CSV file.
+        """
+        mock_list_properties.return_value = [
+            {'status': 'confirmed', 'transaction_hash': f'0xcsv{i}', 'error': None} for i in range(2)
+        ]
+        upload = SimpleUploadedFile('listings.csv', (
+            b"price,location,description,property_type,bedrooms\n"
+            b"100000.00,First,First,RESIDENTIAL,3\n"
+            b"200000.00,Second,Second,OFFICE,\n"
+        ), content_type='text/csv')
+        response = self.client.post(reverse('property-bulk-create'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['listed'], 2)
+        self.assertEqual(Property.objects.get(location='First').bedrooms, 3)
+        self.assertIsNone(Property.objects.get(location='Second').bedrooms)
+
     def test_buyer_cannot_create_property(self):
         """
         Ensure a buyer cannot create a new property.
@@ -100,10 +187,10 @@ class PropertyTests(APITestCase):
 class OfferTests(APITestCase):
     def setUp(self):
         self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
-        UserProfile.objects.create(user=self.seller, eth_address="0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+        UserProfile.objects.create(user=self.seller, eth_address="0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266")
 
         self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
-        UserProfile.objects.create(user=self.buyer, eth_address="0x59c6995e998f97a5a004496c17f0ab241a74142305fd218621064954ee166979")
+        UserProfile.objects.create(user=self.buyer, eth_address="0x70997970c51812dc3a010c7d01b50e0d17dc79c8")
 
         self.property = Property.objects.create(seller=self.seller, price=100000.00, location='Test', description='Test', property_type='RESIDENTIAL')
 
@@ -154,6 +241,74 @@ class OfferTests(APITestCase):
         self.assertEqual(self.property.buyer, self.buyer)
         mock_accept_offer.assert_called_once()
 
+    @patch('RealEstateBackend.blockchain.accept_offer_on_blockchain')
+    def test_accept_deactivates_competing_offers(self, mock_accept_offer):
+        """
+        Ensure accepting an offer closes every other active offer on the property.
+        """
+        mock_accept_offer.return_value = "0xtransactionhashaccept"
+        other_buyer = CustomUser.objects.create_user(username='other', password='password', user_type='buyer')
+        offer = Offer.objects.create(property=self.property, buyer=self.buyer, amount=90000.00, expires_at='2025-12-31T23:59:59Z')
+        competing = [
+            Offer.objects.create(property=self.property, buyer=other_buyer, amount=80000.00 + i, expires_at='2025-12-31T23:59:59Z')
+            for i in range(3)
+        ]
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(reverse('offer-accept', kwargs={'pk': offer.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Offer.objects.filter(property=self.property, is_active=True).exists())
+        self.assertEqual(Offer.objects.get(id=offer.id).transaction_hash, "0xtransactionhashaccept")
+        self.assertEqual(ChangeEvent.objects.filter(kind='offer', action='updated').count(), len(competing) + 1)
+
+    def test_accept_waits_for_the_claim_of_another_offer(self):
+        """
+        Ensure an accept is refused before any chain call while another offer's acceptOffer is in flight.
+        """
+        offer = Offer.objects.create(property=self.property, buyer=self.buyer, amount=90000.00, expires_at='2025-12-31T23:59:59Z')
+        other = Offer.objects.create(property=self.property, buyer=self.buyer, amount=95000.00, expires_at='2025-12-31T23:59:59Z')
+        Property.objects.filter(id=self.property.id).update(accepting_offer=other, accepting_since=timezone.now())
+
+        self.client.force_authenticate(user=self.seller)
+        with patch('RealEstateBackend.blockchain.accept_offer_on_blockchain') as mock_accept_offer:
+            response = self.client.post(reverse('offer-accept', kwargs={'pk': offer.id}))
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            mock_accept_offer.assert_not_called()
+
+            # A claim older than OFFER_ACCEPT_CLAIM_TIMEOUT was left by a request that died
+            Property.objects.filter(id=self.property.id).update(accepting_since=timezone.now() - timedelta(seconds=settings.OFFER_ACCEPT_CLAIM_TIMEOUT + 1))
+            mock_accept_offer.return_value = "0xtransactionhashaccept"
+            response = self.client.post(reverse('offer-accept', kwargs={'pk': offer.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.property.refresh_from_db()
+        self.assertEqual((self.property.is_sold, self.property.accepting_offer), (True, None))
+
+    @patch('RealEstateBackend.blockchain.accept_offer_on_blockchain', side_effect=ConnectionError('node unreachable'))
+    def test_failed_accept_releases_the_property(self, mock_accept_offer):
+        """
+        Ensure a failed acceptOffer releases the property for the next accept.
+        """
+        offer = Offer.objects.create(property=self.property, buyer=self.buyer, amount=90000.00, expires_at='2025-12-31T23:59:59Z')
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(reverse('offer-accept', kwargs={'pk': offer.id}))
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.property.refresh_from_db()
+        self.assertFalse(self.property.is_sold)
+        self.assertIsNone(self.property.accepting_offer)
+        self.assertTrue(Offer.objects.get(id=offer.id).is_active)
+
+    def test_cannot_accept_offer_on_sold_property(self):
+        """
+        Ensure accepting an offer on a sold property is rejected before any chain call.
+        """
+        offer = Offer.objects.create(property=self.property, buyer=self.buyer, amount=90000.00, expires_at='2025-12-31T23:59:59Z')
+        Property.objects.filter(id=self.property.id).update(is_sold=True)
+        self.client.force_authenticate(user=self.seller)
+        with patch('RealEstateBackend.blockchain.accept_offer_on_blockchain') as mock_accept_offer:
+            response = self.client.post(reverse('offer-accept', kwargs={'pk': offer.id}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        mock_accept_offer.assert_not_called()
+
     @patch('RealEstateBackend.blockchain.submit_offer_on_blockchain')
     def test_seller_can_reject_offer(self, mock_submit_offer):
         """
@@ -180,4 +335,1155 @@ class OfferTests(APITestCase):
         response = self.client.post(reject_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         offer = Offer.objects.get(id=offer_id)
-        self.assertFalse(offer.is_active)
\ No newline at end of file
+        self.assertFalse(offer.is_active)
+
+class FeedTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        self.property = Property.objects.create(seller=self.seller, price=100000.00, location='Test', description='Test', property_type='RESIDENTIAL')
+
+    def test_saving_offer_publishes_change_event(self):
+        """
+        Ensure model writes are recorded for the push feed with the concerned users.
+        """
+        offer = Offer.objects.create(property=self.property, buyer=self.buyer, amount=90000.00, expires_at='2025-12-31T23:59:59Z')
+        event = ChangeEvent.objects.filter(kind='offer').get()
+        self.assertEqual(event.action, 'created')
+        self.assertEqual(event.object_id, offer.id)
+        self.assertEqual(event.property_id, self.property.id)
+        self.assertEqual(event.user_ids, sorted([self.seller.id, self.buyer.id]))
+
+    def test_subscription_filters_by_property_and_user(self):
+        """
+        Ensure subscribers only receive events for their properties or their own user.
+        """
+        other = Property.objects.create(seller=self.buyer, price=1, location='Other', description='Other', property_type='LAND')
+        events = list(ChangeEvent.objects.order_by('id'))
+
+        async def collect(subscription):
+            for event in events:
+                subscription.put(event)
+            return [subscription.queue.get_nowait().property_id for _ in range(subscription.queue.qsize())]
+
+        self.assertEqual(asyncio.run(collect(feed.Subscription(property_ids=[other.id]))), [other.id])
+        self.assertEqual(asyncio.run(collect(feed.Subscription(user_id=self.seller.id))), [self.property.id])
+
+    def test_slow_subscriber_overflows(self):
+        """
+        Ensure a full client queue is dropped and replaced by an overflow marker.
+        """
+        for i in range(3):
+            Property.objects.create(seller=self.seller, price=i, location='Bulk', description='Bulk', property_type='LAND')
+
+        events = list(ChangeEvent.objects.all())
+
+        async def fill():
+            subscription = feed.Subscription(max_queue_size=2)
+            for event in events:
+                subscription.put(event)
+            return subscription, subscription.queue.get_nowait()
+
+        subscription, item = asyncio.run(fill())
+        self.assertTrue(subscription.overflowed)
+        self.assertIsNone(item)
+
+    def test_events_committed_out_of_id_order_are_delivered(self):
+        """
+        Ensure an event whose id was skipped because its transaction committed late is still dispatched.
+        """
+        def event(pk):
+            return ChangeEvent.objects.create(pk=pk, kind='property', action='updated', object_id=self.property.id, property_id=self.property.id, user_ids=[], payload={})
+
+        broker = feed.Broker()
+        broker.last_event_id = ChangeEvent.objects.latest('id').pk
+        first = broker.last_event_id + 1
+        # first + 1 commits while the transaction holding first is still open
+        event(first + 1)
+        self.assertEqual([e.pk for e in broker.fetch()], [first + 1])
+        broker.dispatch([ChangeEvent.objects.get(pk=first + 1)])
+
+        event(first)
+        self.assertEqual([e.pk for e in broker.fetch()], [first])
+        self.assertEqual(broker.fetch(), [])
+
+        # A skipped id that never commits is given up after FEED_GAP_TIMEOUT
+        event(first + 3)
+        broker.dispatch(broker.fetch())
+        with patch('properties.feed.time.monotonic', return_value=time.monotonic() + settings.FEED_GAP_TIMEOUT):
+            broker.fetch()
+        self.assertEqual(broker._gaps, {})
+
+    def test_old_events_are_pruned_and_stale_reconnects_resync(self):
+        """
+        Ensure events past the retention window are deleted and reconnects from a pruned event are told to re-sync.
+        """
+        stale = ChangeEvent.objects.get()
+        ChangeEvent.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=settings.FEED_RETENTION_HOURS + 1))
+        Property.objects.create(seller=self.seller, price=1, location='New', description='New', property_type='LAND')
+
+        self.assertEqual(feed.prune_events(), 1)
+        self.assertFalse(ChangeEvent.objects.filter(pk=stale.pk).exists())
+
+        self.assertIsNone(feed._missed_events(stale.pk))
+        self.assertEqual(len(feed._missed_events(0)), 1)
+
+    def test_stream_requires_token(self):
+        """
+        Ensure anonymous clients cannot open the event stream.
+        """
+        response = self.client.get(reverse('event-stream'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        UserProfile.objects.create(user=self.buyer, eth_address="0x70997970c51812dc3a010c7d01b50e0d17dc79c8")
+        self.property = Property.objects.create(seller=self.seller, price=100000.00, location='Test', description='Test', property_type='RESIDENTIAL')
+
+    def authenticate(self, user):
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_async_endpoints_require_token(self):
+        """
+        Ensure the async endpoints reject requests without a token.
+        """
+        response = self.client.post(reverse('async-offer-list'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch('RealEstateBackend.async_blockchain.submit_offer_on_blockchain', new_callable=AsyncMock)
+    def test_buyer_can_make_offer_async(self, mock_submit_offer):
+        """
+        Ensure a buyer can make an offer through the async endpoint.
+        """
+        mock_submit_offer.return_value = "0xtransactionhashasync"
+        self.authenticate(self.buyer)
+        data = {
+            'property': self.property.id,
+            'amount': 90000.00,
+            'expires_at': '2025-12-31T23:59:59Z'
+        }
+        response = self.client.post(reverse('async-offer-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Offer.objects.get().transaction_hash, "0xtransactionhashasync")
+        mock_submit_offer.assert_awaited_once()
+
+    @patch('RealEstateBackend.async_blockchain.accept_offer_on_blockchain', new_callable=AsyncMock)
+    def test_seller_can_accept_offer_async(self, mock_accept_offer):
+        """
+        Ensure a seller can accept an offer through the async endpoint.
+        """
+        mock_accept_offer.return_value = "0xtransactionhashaccept"
+        offer = Offer.objects.create(property=self.property, buyer=self.buyer, amount=90000.00, expires_at='2025-12-31T23:59:59Z')
+        self.authenticate(self.seller)
+        response = self.client.post(reverse('async-offer-accept', kwargs={'pk': offer.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.property.refresh_from_db()
+        self.assertTrue(self.property.is_sold)
+        self.assertEqual(self.property.buyer, self.buyer)
+
+class StartupReportTests(APITestCase):
+    def test_parse_importtime(self):
+        """
+        Ensure `python -X importtime` output is parsed into per-module timings.
+        """
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     web3.exceptions\n"
+            "import time:      3000 |       3120 | web3\n"
+            "some other warning\n"
+        )
+        self.assertEqual(parse_importtime(stderr), [('web3.exceptions', 120, 120), ('web3', 3000, 3120)])
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', password='password', user_type='admin', is_staff=True)
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        for i in range(5):
+            Property.objects.create(seller=self.seller, price=1000 + i, location=f'Location {i}', description='Test', property_type='RESIDENTIAL')
+        self.client.force_authenticate(user=self.admin)
+
+    def test_export_properties_csv(self):
+        """
+        Ensure properties stream out as CSV with one row per property.
+        """
+        response = self.client.get(reverse('export', kwargs={'resource': 'properties'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertIn('seller_id', lines[0].split(','))
+
+    def test_export_offers_ndjson_gzip(self):
+        """
+        Ensure NDJSON exports can be gzip-compressed on the fly.
+        """
+        buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        Offer.objects.create(property=Property.objects.first(), buyer=buyer, amount=900, expires_at='2025-12-31T23:59:59Z')
+        response = self.client.get(reverse('export', kwargs={'resource': 'offers'}), {'output': 'ndjson', 'compress': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual(rows[0]['buyer_id'], buyer.id)
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_export_parquet_keeps_full_wei_amounts(self):
+        """
+        Ensure 78-digit wei amounts survive the parquet export unchanged.
+        """
+        import pyarrow.parquet as pq
+
+        Property.objects.filter(pk=Property.objects.first().pk).update(price=MAX_WEI)
+        response = self.client.get(reverse('export', kwargs={'resource': 'properties'}), {'output': 'parquet'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        prices = table.column('price').to_pylist()
+        self.assertEqual(len(str(MAX_WEI)), 78)
+        self.assertEqual(int(prices[0]), MAX_WEI)
+        self.assertEqual(len(prices), 5)
+
+    def test_export_requires_admin(self):
+        """
+        Ensure non-admin users cannot export whole tables.
+        """
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get(reverse('export', kwargs={'resource': 'properties'}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_data_command(self):
+        """
+        Ensure the export_data command writes the export to a file in small chunks.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'properties.csv')
+            call_command('export_data', 'properties', '--file', path, '--chunk-size', '2', stderr=io.StringIO())
+            with open(path) as f:
+                self.assertEqual(len(f.read().splitlines()), 6)
+
+class OfferConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.property = Property.objects.create(seller=self.seller, price=100000.00, location='Test', description='Test', property_type='RESIDENTIAL')
+        self.offers = []
+        for i in range(2):
+            buyer = CustomUser.objects.create_user(username=f'buyer{i}', password='password', user_type='buyer')
+            UserProfile.objects.create(user=buyer, eth_address=f"0x{i:040x}")
+            self.offers.append(Offer.objects.create(property=self.property, buyer=buyer, amount=90000 + i, expires_at='2025-12-31T23:59:59Z'))
+
+    def accept(self, offer):
+        client = APIClient()
+        client.force_authenticate(user=self.seller)
+        return client.post(reverse('offer-accept', kwargs={'pk': offer.id}))
+
+    @patch('RealEstateBackend.blockchain.accept_offer_on_blockchain')
+    def test_accept_during_the_chain_call_is_refused(self, mock_accept_offer):
+        """
+        Ensure the chain call runs outside any transaction, and an accept arriving meanwhile gets a 409 without a chain call.
+        """
+        competing = []
+
+        def chain_call(*args):
+            self.assertFalse(connection.in_atomic_block)
+            if mock_accept_offer.call_count == 1:
+                # The competing accept arrives while this call is waiting to be mined
+                competing.append(self.accept(self.offers[1]))
+            return "0xtransactionhash"
+        mock_accept_offer.side_effect = chain_call
+
+        response = self.accept(self.offers[0])
+
+        self.assertEqual(competing[0].status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_accept_offer.call_count, 1)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.buyer, self.offers[0].buyer)
+        self.assertEqual(list(Offer.objects.filter(transaction_hash__isnull=False)), [self.offers[0]])
+
+    def test_only_one_of_two_claims_succeeds(self):
+        """
+        Ensure two accepts racing on the same property cannot both claim it, and a released claim can be taken again.
+        """
+        from .views import OfferNotAcceptable, claim_offer, release_offer_claim
+
+        claim_offer(self.offers[0])
+        with self.assertRaises(OfferNotAcceptable):
+            claim_offer(self.offers[1])
+        self.assertEqual(Property.objects.get(pk=self.property.pk).accepting_offer, self.offers[0])
+
+        release_offer_claim(self.offers[1])
+        self.assertEqual(Property.objects.get(pk=self.property.pk).accepting_offer, self.offers[0])
+        release_offer_claim(self.offers[0])
+        claim_offer(self.offers[1])
+        self.assertEqual(Property.objects.get(pk=self.property.pk).accepting_offer, self.offers[1])
+
+class OfferExpiryTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        self.properties = [
+            Property.objects.create(seller=self.seller, price=100000.00, location=f'Test {i}', description='Test', property_type='RESIDENTIAL')
+            for i in range(3)
+        ]
+        now = timezone.now()
+        self.expired = [
+            Offer.objects.create(property=self.properties[0], buyer=self.buyer, amount=1, expires_at=now - timedelta(minutes=5)),
+            Offer.objects.create(property=self.properties[0], buyer=self.buyer, amount=2, expires_at=now - timedelta(minutes=1)),
+            Offer.objects.create(property=self.properties[1], buyer=self.buyer, amount=3, expires_at=now - timedelta(seconds=1)),
+        ]
+        self.live = Offer.objects.create(property=self.properties[2], buyer=self.buyer, amount=4, expires_at=now + timedelta(hours=1))
+
+    def test_expire_due_offers(self):
+        """
+        Ensure the sweep deactivates only offers past expires_at and reports their properties.
+        """
+        ChangeEvent.objects.all().delete()
+        property_ids = expire_due_offers()
+        self.assertEqual(property_ids, [self.properties[0].id, self.properties[1].id])
+        self.assertFalse(Offer.objects.filter(id__in=[offer.id for offer in self.expired], is_active=True).exists())
+        self.assertTrue(Offer.objects.get(id=self.live.id).is_active)
+        self.assertEqual(ChangeEvent.objects.filter(kind='offer', action='updated').count(), len(self.expired))
+        self.assertEqual(expire_due_offers(), [])
+
+    def test_scheduler_tracks_earliest_deadline(self):
+        """
+        Ensure the scheduler's heap yields the earliest active deadline.
+        """
+        scheduler = ExpiryScheduler(expire_on_chain=None)
+        scheduler.refresh()
+        self.assertEqual(scheduler.next_deadline(), self.expired[0].expires_at)
+
+    def test_scheduler_batches_and_retries_chain_expiry(self):
+        """
+        Ensure one tick sends expireOffers for every affected property and retries reverted ones.
+        """
+        calls = []
+
+        def expire_on_chain(property_ids):
+            calls.append(property_ids)
+            # The second property's offers are not yet expired on chain
+            return [
+                {'status': 'reverted' if property_id == self.properties[1].id and len(calls) == 1 else 'confirmed', 'transaction_hash': '0xhash', 'error': None}
+                for property_id in property_ids
+            ]
+
+        scheduler = ExpiryScheduler(expire_on_chain=expire_on_chain, chain_attempts=2)
+        scheduler.refresh()
+        scheduler.tick()
+        self.assertEqual(calls, [[self.properties[0].id, self.properties[1].id]])
+        self.assertEqual(scheduler.next_deadline(), self.live.expires_at)
+
+        scheduler.tick()
+        self.assertEqual(calls[1], [self.properties[1].id])
+        self.assertEqual(scheduler.tick(), [])
+        self.assertEqual(len(calls), 2)
+
+    def test_expire_offers_command(self):
+        """
+        Ensure `manage.py expire_offers --once --no-chain` sweeps the database.
+        """
+        out = io.StringIO()
+        call_command('expire_offers', '--once', '--no-chain', stdout=out)
+        self.assertIn('Expired offers on 2 properties.', out.getvalue())
+        self.assertEqual(Offer.objects.filter(is_active=True).count(), 1)
+
+class AuctionTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        self.other_buyer = CustomUser.objects.create_user(username='other', password='password', user_type='buyer')
+        UserProfile.objects.create(user=self.buyer, eth_address="0x" + "1" * 40)
+        UserProfile.objects.create(user=self.other_buyer, eth_address="0x" + "2" * 40)
+        self.property = Property.objects.create(seller=self.seller, price=100000.00, location='Test', description='Test', property_type='RESIDENTIAL')
+        get_auction_book().load_from_db()
+
+    def start_auction(self, end_time, minimum_bid=to_wei(10)):
+        Property.objects.filter(id=self.property.id).update(auction_end_time=end_time, minimum_bid=minimum_bid)
+        get_auction_book().load_from_db()
+
+    @patch('RealEstateBackend.blockchain.start_auction_on_blockchain')
+    def test_seller_can_start_auction(self, mock_start_auction):
+        """
+        Ensure a seller can start an auction and its deadline and reserve are stored.
+        """
+        mock_start_auction.return_value = "0xtransactionhashauction"
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.post(reverse('property-start-auction', kwargs={'pk': self.property.id}), {'minimum_bid': '10.00', 'duration': 3600}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['is_active'])
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.minimum_bid, to_wei(10))
+        self.assertIsNotNone(self.property.auction_end_time)
+        self.assertIsNotNone(get_auction_book().get(self.property.id))
+        mock_start_auction.assert_called_once_with(os.environ.get('SELLER_PRIVATE_KEY'), self.property.id, to_wei(10), 3600)
+
+        response = self.client.post(reverse('property-start-auction', kwargs={'pk': self.property.id}), {'minimum_bid': '10.00', 'duration': 3600}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    @patch('RealEstateBackend.blockchain.bid_on_auction_on_blockchain')
+    def test_bids_are_checked_against_the_bid_index(self, mock_bid):
+        """
+        Ensure bids below the reserve or the current highest bid are refused without a chain call.
+        """
+        mock_bid.return_value = "0xtransactionhashbid"
+        self.start_auction(timezone.now() + timedelta(hours=1))
+        url = reverse('property-bid', kwargs={'pk': self.property.id})
+
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.post(url, {'amount': '5.00'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(url, {'amount': '20.00'}, format='json').status_code, status.HTTP_201_CREATED)
+
+        self.client.force_authenticate(user=self.other_buyer)
+        self.assertEqual(self.client.post(url, {'amount': '15.00'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(url, {'amount': '25.00'}, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(mock_bid.call_count, 2)
+
+        response = self.client.get(reverse('property-auction', kwargs={'pk': self.property.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['highest_bid'], '25')
+        self.assertEqual(response.data['highest_bidder'], "0x" + "2" * 40)
+        self.assertEqual(response.data['bid_count'], 2)
+        self.assertEqual(Offer.objects.get(buyer=self.other_buyer).expires_at, Property.objects.get(id=self.property.id).auction_end_time)
+
+    def test_cannot_bid_after_auction_ends(self):
+        """
+        Ensure bids on an auction past its end time are refused.
+        """
+        self.start_auction(timezone.now() - timedelta(seconds=1))
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post(reverse('property-bid', kwargs={'pk': self.property.id}), {'amount': '20.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_scheduler_ends_due_auctions(self):
+        """
+        Ensure the scheduler sells an ended auction to the highest bid, retrying a reverted endAuction.
+        """
+        self.start_auction(timezone.now() - timedelta(seconds=1))
+        Offer.objects.create(property=self.property, buyer=self.buyer, amount=to_wei(20), expires_at=self.property.listed_at)
+        Offer.objects.create(property=self.property, buyer=self.other_buyer, amount=to_wei(25), expires_at=self.property.listed_at)
+        get_auction_book().load_from_db()
+
+        calls = []
+
+        def end_on_chain(property_ids):
+            calls.append(property_ids)
+            return [{'status': 'reverted' if len(calls) == 1 else 'confirmed', 'transaction_hash': '0xtransactionhashend', 'error': None} for _ in property_ids]
+
+        scheduler = AuctionScheduler(end_on_chain=end_on_chain, retry_delay=0)
+        self.assertEqual(scheduler.tick(), [self.property.id])
+        self.assertFalse(Property.objects.get(id=self.property.id).is_sold)
+
+        self.assertEqual(scheduler.tick(), [self.property.id])
+        self.property.refresh_from_db()
+        self.assertTrue(self.property.is_sold)
+        self.assertEqual(self.property.buyer, self.other_buyer)
+        self.assertEqual(self.property.offer_amount, to_wei(25))
+        self.assertFalse(Offer.objects.filter(property=self.property, is_active=True).exists())
+        self.assertEqual(scheduler.tick(), [])
+
+    def test_auction_without_bids_is_reopened(self):
+        """
+        Ensure ending an auction nobody bid on clears its deadline and reserve.
+        """
+        self.start_auction(timezone.now() - timedelta(seconds=1))
+        confirmed = lambda property_ids: [{'status': 'confirmed', 'transaction_hash': '0xtransactionhashend', 'error': None} for _ in property_ids]
+        AuctionScheduler(end_on_chain=confirmed).tick()
+        self.property.refresh_from_db()
+        self.assertFalse(self.property.is_sold)
+        self.assertIsNone(self.property.auction_end_time)
+        self.assertIsNone(self.property.minimum_bid)
+
+    def test_book_rebuilds_from_contract_events(self):
+        """
+        Ensure the auction book can be rebuilt from AuctionStarted, OfferSubmitted and AuctionEnded logs.
+        """
+        book = AuctionBook()
+        book.rebuild([
+            {'event': 'AuctionStarted', 'propertyId': 1, 'startTime': 1000, 'endTime': 2000},
+            {'event': 'AuctionStarted', 'propertyId': 2, 'startTime': 1000, 'endTime': 1500},
+            {'event': 'OfferSubmitted', 'propertyId': 1, 'buyer': '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266', 'offerAmount': to_wei(1)},
+            {'event': 'OfferSubmitted', 'propertyId': 1, 'buyer': '0x70997970C51812dc3A010C7d01b50e0d17dc79C8', 'offerAmount': to_wei(3)},
+            {'event': 'OfferSubmitted', 'propertyId': 3, 'buyer': '0x' + 'c' * 40, 'offerAmount': to_wei(9)},
+            {'event': 'AuctionEnded', 'propertyId': 2, 'winner': '0x0', 'winningBid': 0},
+        ])
+        # Checksummed log addresses are kept in the same lowercase form as the database
+        self.assertEqual(book.highest_bid(1), (to_wei(3), '0x70997970c51812dc3a010c7d01b50e0d17dc79c8'))
+        self.assertIsNone(book.get(2))
+        self.assertIsNone(book.highest_bid(3))
+        self.assertEqual(book.next_deadline().timestamp(), 2000)
+
+        # Reads take the lock that load_from_db() and rebuild() replace the auctions under
+        with patch.object(book, '_lock') as mock_lock:
+            book.get(1)
+            book.highest_bid(1)
+        self.assertEqual(mock_lock.__enter__.call_count, 2)
+
+    def test_offers_made_before_the_auction_are_not_bids(self):
+        """
+        Ensure the book loaded from the database counts only offers made after the auction started.
+        """
+        Offer.objects.create(property=self.property, buyer=self.buyer, amount=to_wei(50), expires_at=timezone.now() + timedelta(days=1))
+        Property.objects.filter(id=self.property.id).update(auction_started_at=timezone.now())
+        self.start_auction(timezone.now() + timedelta(hours=1))
+        self.assertIsNone(get_auction_book().highest_bid(self.property.id))
+
+        Offer.objects.create(property=self.property, buyer=self.other_buyer, amount=to_wei(20), expires_at=timezone.now() + timedelta(hours=1))
+        get_auction_book().load_from_db()
+        self.assertEqual(get_auction_book().highest_bid(self.property.id), (to_wei(20), '0x' + '2' * 40))
+
+    @patch('RealEstateBackend.blockchain.get_auction_events')
+    def test_book_following_the_chain_reloads_from_logs(self, mock_get_auction_events):
+        """
+        Ensure a book switched to contract logs reloads from them, not the database, when its TTL expires.
+        """
+        mock_get_auction_events.return_value = [{'event': 'AuctionStarted', 'propertyId': 7, 'startTime': 1000, 'endTime': 2000}]
+        self.start_auction(timezone.now() + timedelta(hours=1))
+        book = AuctionBook()
+        book.follow_chain(from_block=5)
+        with self.settings(AUCTION_BOOK_TTL=0), patch('properties.auctions._book', book):
+            self.assertIs(get_auction_book(), book)
+        self.assertEqual(mock_get_auction_events.call_args_list[-1].args, (5,))
+        self.assertEqual(mock_get_auction_events.call_count, 2)
+        self.assertIsNotNone(book.get(7))
+        self.assertIsNone(book.get(self.property.id))
+
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        self.properties = [
+            Property.objects.create(seller=self.seller, price=price, location=location, description='Test', property_type=property_type)
+            for price, location, property_type in [
+                (to_wei(100), '1 Main St, Springfield', 'RESIDENTIAL'),
+                (to_wei('300.000000000000000001'), '2 Oak Ave, springfield ', 'RESIDENTIAL'),
+                (to_wei(500), '3 Market Sq, Shelbyville', 'COMMERCIAL'),
+            ]
+        ]
+        Property.objects.filter(id=self.properties[0].id).update(listed_at=timezone.now() - timedelta(days=4))
+        self.properties[0].refresh_from_db()
+        Transaction.objects.create(property=self.properties[0], seller=self.seller, buyer=self.buyer, price=to_wei(120))
+
+    def rollups(self):
+        return {
+            (rollup.dimension, rollup.bucket): (rollup.listed_count, rollup.listed_price_sum, rollup.sold_count, rollup.sale_price_sum, rollup.time_to_sale_sum // 3600)
+            for rollup in MarketRollup.objects.all()
+        }
+
+    def test_rollups_follow_listings_and_sales(self):
+        """
+        Ensure listing and selling properties keeps the rollups up to date.
+        """
+        residential = MarketRollup.objects.get(dimension='type', bucket='RESIDENTIAL')
+        self.assertEqual((residential.listed_count, residential.listed_price_sum), (2, to_wei('400.000000000000000001')))
+        self.assertEqual((residential.sold_count, residential.sale_price_sum), (1, to_wei(120)))
+        self.assertEqual(MarketRollup.objects.get(dimension='location', bucket='springfield').listed_count, 2)
+        today = analytics.day_bucket(timezone.now())
+        self.assertEqual(MarketRollup.objects.get(dimension='day', bucket=today).sold_count, 1)
+
+    def test_price_edits_and_deletions_update_rollups(self):
+        """
+        Ensure a repriced or moved listing changes buckets and a deleted one is taken out.
+        """
+        commercial = self.properties[2]
+        commercial.price = to_wei(700)
+        commercial.save(update_fields=['price'])
+        self.assertEqual(MarketRollup.objects.get(dimension='type', bucket='COMMERCIAL').listed_price_sum, to_wei(700))
+
+        commercial.location = '3 Market Sq, Springfield'
+        commercial.save()
+        self.assertEqual(MarketRollup.objects.get(dimension='location', bucket='shelbyville').listed_count, 0)
+        springfield = MarketRollup.objects.get(dimension='location', bucket='springfield')
+        self.assertEqual((springfield.listed_count, springfield.listed_price_sum), (3, to_wei('1100.000000000000000001')))
+
+        Property.objects.filter(pk=commercial.pk).delete()
+        rollup = MarketRollup.objects.get(dimension='type', bucket='COMMERCIAL')
+        self.assertEqual((rollup.listed_count, rollup.listed_price_sum), (0, 0))
+
+        # A save that does not touch the listing fields only writes the row and its feed event
+        with self.assertNumQueries(2):
+            self.properties[1].is_listed = True
+            self.properties[1].save(update_fields=['is_listed'])
+
+    def test_analytics_endpoint(self):
+        """
+        Ensure the analytics endpoint reports averages per bucket.
+        """
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get(reverse('analytics'), {'dimension': 'type'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {row['bucket']: row for row in response.data['results']}
+        self.assertEqual(results['RESIDENTIAL']['average_list_price'], '200')
+        self.assertEqual(results['RESIDENTIAL']['average_sale_price'], '120')
+        self.assertEqual(results['RESIDENTIAL']['sale_volume'], '120')
+        self.assertAlmostEqual(results['RESIDENTIAL']['average_days_to_sale'], 4, places=1)
+        self.assertIsNone(results['COMMERCIAL']['average_sale_price'])
+
+        response = self.client.get(reverse('analytics'), {'dimension': 'price'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(importlib.util.find_spec('pandas'), 'pandas is not installed')
+    def test_rebuild_matches_incremental_rollups(self):
+        """
+        Ensure `manage.py rebuild_analytics` recomputes the same buckets the write paths maintain.
+        """
+        incremental = self.rollups()
+        MarketRollup.objects.all().delete()
+        out = io.StringIO()
+        call_command('rebuild_analytics', stdout=out)
+        rebuilt = self.rollups()
+        # setUp backdates one listing after it was counted, so only its day bucket differs
+        for key in incremental:
+            if key[0] != 'day':
+                self.assertEqual(rebuilt[key], incremental[key])
+        backdated = analytics.day_bucket(self.properties[0].listed_at)
+        self.assertEqual(rebuilt[('day', backdated)][0], 1)
+        self.assertIn(f'Rebuilt {len(rebuilt)} analytics buckets.', out.getvalue())
+
+class DashboardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        self.other_buyer = CustomUser.objects.create_user(username='other', password='password', user_type='buyer')
+        self.listed = Property.objects.create(seller=self.seller, price=to_wei(100), location='1 Main St', description='Test', property_type='RESIDENTIAL', is_listed=True)
+        self.sold = Property.objects.create(seller=self.seller, price=to_wei(200), location='2 Oak Ave', description='Test', property_type='LAND', is_sold=True, is_inspection_passed=True)
+        expires_at = timezone.now() + timedelta(days=1)
+        Offer.objects.create(property=self.listed, buyer=self.buyer, amount=to_wei('95.5'), expires_at=expires_at)
+        Offer.objects.create(property=self.listed, buyer=self.other_buyer, amount=to_wei(97), expires_at=expires_at)
+        Offer.objects.create(property=self.listed, buyer=self.buyer, amount=to_wei(99), expires_at=expires_at, is_active=False)
+        Transaction.objects.create(property=self.sold, seller=self.seller, buyer=self.buyer, price=to_wei(200))
+
+    def test_seller_dashboard_in_fixed_queries(self):
+        """
+        Ensure the seller dashboard aggregates offers per property in a fixed number of queries and is cached.
+        """
+        self.client.force_authenticate(user=self.seller)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard', args=['seller']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary'], {'properties': 2, 'listed': 1, 'sold': 1, 'pending_inspections': 1, 'open_offers': 2})
+        listed = next(row for row in response.data['properties'] if row['id'] == self.listed.id)
+        self.assertEqual((listed['open_offer_count'], listed['highest_offer'], listed['price']), (2, '97', '100'))
+        self.assertEqual([row['buyer__username'] for row in response.data['recent_transactions']], ['buyer'])
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('dashboard', args=['seller']))
+
+        # A committed change starts a new cache generation
+        with self.captureOnCommitCallbacks(execute=True):
+            Offer.objects.create(property=self.listed, buyer=self.other_buyer, amount=to_wei(98), expires_at=timezone.now() + timedelta(days=1))
+        response = self.client.get(reverse('dashboard', args=['seller']))
+        self.assertEqual(response.data['summary']['open_offers'], 3)
+
+    def test_buyer_dashboard_marks_outbid_offers(self):
+        """
+        Ensure each of the buyer's open offers is compared with the property's highest active offer.
+        """
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get(reverse('dashboard', args=['buyer']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [offer] = response.data['open_offers']
+        self.assertEqual((offer['amount'], offer['highest_amount'], offer['is_highest']), ('95.5', '97', False))
+        self.assertEqual(response.data['summary'], {'open_offers': 1, 'purchases': 1})
+        self.assertEqual([row['id'] for row in response.data['listings']], [self.listed.id])
+
+    def test_changes_only_invalidate_the_dashboards_they_touch(self):
+        """
+        Ensure a write rebuilds the dashboards of the users it concerns, not every user's.
+        """
+        other_seller = CustomUser.objects.create_user(username='other-seller', password='password', user_type='seller')
+        self.client.force_authenticate(user=self.seller)
+        self.client.get(reverse('dashboard', args=['seller']))
+        self.client.force_authenticate(user=self.buyer)
+        self.client.get(reverse('dashboard', args=['buyer']))
+
+        # Another seller's unlisted property is on nobody else's dashboard
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.objects.create(seller=other_seller, price=to_wei(5), location='Elsewhere', description='Test', property_type='LAND')
+        self.client.force_authenticate(user=self.seller)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('dashboard', args=['seller']))
+
+        # Outbidding the buyer rebuilds the buyer's offers, though the new offer is not theirs
+        with self.captureOnCommitCallbacks(execute=True):
+            Offer.objects.create(property=self.listed, buyer=self.other_buyer, amount=to_wei(120), expires_at=timezone.now() + timedelta(days=1))
+        self.client.force_authenticate(user=self.buyer)
+        [offer] = self.client.get(reverse('dashboard', args=['buyer'])).data['open_offers']
+        self.assertEqual(offer['highest_amount'], '120')
+
+    def test_dashboards_are_role_restricted(self):
+        """
+        Ensure users only open their own role's dashboard, except superusers.
+        """
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.get(reverse('dashboard', args=['seller'])).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(reverse('dashboard', args=['nobody'])).status_code, status.HTTP_404_NOT_FOUND)
+
+        admin = CustomUser.objects.create_superuser(username='root', password='password', user_type='admin')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('dashboard', args=['admin']))
+        self.assertEqual(response.data['summary']['users_by_type'], {'admin': 1, 'buyer': 2, 'seller': 1})
+        response = self.client.get(reverse('dashboard', args=['inspector']))
+        self.assertEqual([row['id'] for row in response.data['pending_inspections']], [self.listed.id])
+
+class PriceHistoryTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        self.property = Property.objects.create(seller=self.seller, price=to_wei(100), location='Test', description='Test', property_type='RESIDENTIAL')
+        # Price doubles from 100 to 200 ether in steps of 10, one update every 10 blocks
+        self.events = [
+            self.price_updated(block_number=10 * step, old_price=100 + 10 * step, new_price=110 + 10 * step)
+            for step in range(10)
+        ]
+        record_price_updates(self.events, {event.blockNumber: 1700000000 + event.blockNumber for event in self.events})
+        self.client.force_authenticate(user=self.seller)
+
+    def price_updated(self, block_number, old_price, new_price, property_id=None):
+        return SimpleNamespace(
+            blockNumber=block_number,
+            logIndex=0,
+            transactionHash=bytes.fromhex(f'{block_number:064x}'),
+            args=SimpleNamespace(propertyId=property_id or self.property.id, oldPrice=to_wei(old_price), newPrice=to_wei(new_price)),
+        )
+
+    def test_indexer_records_history(self):
+        """
+        Ensure PriceUpdated logs are stored once and move the property to its latest price.
+        """
+        self.assertEqual(PriceHistory.objects.filter(property=self.property).count(), 10)
+        self.assertEqual(Property.objects.get(id=self.property.id).price, to_wei(200))
+
+        # Replays and logs for unknown properties are ignored
+        record_price_updates(self.events + [self.price_updated(500, 1, 2, property_id=9999)], {event.blockNumber: 0 for event in self.events} | {500: 0})
+        self.assertEqual(PriceHistory.objects.count(), 10)
+
+    def test_replaying_old_blocks_keeps_latest_price(self):
+        """
+        Ensure replaying an older block range does not move the price back.
+        """
+        record_price_updates(self.events[2:4], {event.blockNumber: 1700000000 for event in self.events})
+        self.assertEqual(Property.objects.get(id=self.property.id).price, to_wei(200))
+
+        # A log newer than anything stored still applies
+        newer = self.price_updated(100, 200, 250)
+        record_price_updates(self.events[:1] + [newer], {0: 1700000000, 100: 1700000100})
+        self.assertEqual(Property.objects.get(id=self.property.id).price, to_wei(250))
+
+    def test_price_history_endpoint(self):
+        """
+        Ensure the price history endpoint returns the series with per-update changes.
+        """
+        response = self.client.get(reverse('property-price-history', kwargs={'pk': self.property.id}), {'from_block': 20, 'to_block': 40})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['block_number'] for row in response.data['results']], [20, 30, 40])
+        self.assertEqual(response.data['results'][0]['price'], '130')
+        self.assertAlmostEqual(response.data['results'][0]['change_pct'], 100 * 10 / 120)
+
+    def test_price_history_downsampled(self):
+        """
+        Ensure ?points= reduces the history to open/close/low/high buckets.
+        """
+        response = self.client.get(reverse('property-price-history', kwargs={'pk': self.property.id}), {'points': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first, second = response.data['results']
+        self.assertEqual((first['from_block'], first['to_block']), (0, 40))
+        self.assertEqual((first['open'], first['close'], first['low'], first['high']), ('100', '150', '110', '150'))
+        self.assertEqual((second['from_block'], second['to_block'], second['open'], second['close']), (50, 90, '150', '200'))
+        self.assertAlmostEqual(second['change_pct'], 100 * 50 / 150)
+
+        response = self.client.get(reverse('property-price-history', kwargs={'pk': self.property.id}), {'points': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class WeiAmountTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+
+    def test_ether_conversions_are_exact(self):
+        """
+        Ensure ether strings convert to wei and back without rounding.
+        """
+        self.assertEqual(to_wei('1.5'), 1500000000000000000)
+        self.assertEqual(to_wei('123456789.123456789123456789'), 123456789123456789123456789)
+        self.assertEqual(format_ether(123456789123456789123456789), '123456789.123456789123456789')
+        self.assertEqual(format_ether(to_wei(100)), '100')
+        self.assertEqual(format_ether(1), '0.000000000000000001')
+        with self.assertRaises(ValueError):
+            to_wei('0.0000000000000000001')
+
+    def test_ether_field_validation(self):
+        """
+        Ensure the serializer field accepts exact ether amounts and rejects the rest.
+        """
+        field = EtherField()
+        self.assertEqual(field.to_internal_value('0.1'), 10 ** 17)
+        self.assertEqual(field.to_internal_value(2), 2 * 10 ** 18)
+        for invalid in ['abc', '-1', '0', '1e-19', True, None]:
+            with self.assertRaises(ValidationError):
+                field.to_internal_value(invalid)
+
+    def test_wei_field_round_trips_and_orders_exactly(self):
+        """
+        Ensure amounts beyond 64 bits are stored, compared and ordered exactly.
+        """
+        amounts = [10 ** 27 + 7, to_wei('1000000.000000000000000001'), to_wei(9), 1]
+        for amount in amounts:
+            Property.objects.create(seller=self.seller, price=amount, location='Test', description='Test', property_type='LAND')
+        self.assertEqual(list(Property.objects.order_by('-price').values_list('price', flat=True)), amounts)
+        self.assertEqual(Property.objects.filter(price__gt=to_wei(1000000)).count(), 2)
+        self.assertEqual(Property.objects.get(price=to_wei('1000000.000000000000000001')).price, 10 ** 24 + 1)
+
+        buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        offer = Offer.objects.create(property=Property.objects.first(), buyer=buyer, amount=MAX_WEI, expires_at=timezone.now())
+        self.assertEqual(Offer.objects.get(id=offer.id).amount, MAX_WEI)
+        self.assertEqual(ChangeEvent.objects.filter(kind='offer').last().payload['amount'], format_ether(MAX_WEI))
+
+    @patch('RealEstateBackend.blockchain.list_property_on_blockchain')
+    def test_listing_passes_wei_to_the_chain(self, mock_list_property):
+        """
+        Ensure a listing's price reaches the contract call as exact integer wei.
+        """
+        mock_list_property.return_value = "0xtransactionhash"
+        self.client.force_authenticate(user=self.seller)
+        data = {'price': '12.345678901234567891', 'location': 'Test', 'description': 'Test', 'property_type': 'LAND'}
+        response = self.client.post(reverse('property-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['price'], '12.345678901234567891')
+        self.assertEqual(mock_list_property.call_args.args[1], 12345678901234567891)
+        self.assertEqual(Property.objects.get(id=response.data['id']).price, 12345678901234567891)
+
+
+class FakeOutboxChain:
+    """Stands in for the outbox building blocks of RealEstateBackend.blockchain."""
+    SENDER = '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266'
+
+    def __init__(self, nonce=0):
+        self.next_nonce = nonce
+        self.mined_nonce = nonce
+        self.receipts = {}
+        self.signed = []
+        self.signed_args = []
+        self.broadcasts = []
+        self.on_broadcast = None
+
+    def patch(self):
+        return patch.multiple(
+            'RealEstateBackend.blockchain',
+            account_address=lambda private_key: self.SENDER,
+            next_nonce=lambda address: self.next_nonce,
+            mined_nonces_and_receipts=lambda addresses, tx_hashes: (
+                {address: self.mined_nonce for address in addresses},
+                {tx_hash: self.receipts.get(tx_hash) for tx_hash in tx_hashes},
+            ),
+            current_gas_price=lambda: 1,
+            sign_contract_call=self.sign,
+            broadcast_transaction=self.broadcast,
+            get_transaction=lambda tx_hash: None,
+        )
+
+    def sign(self, private_key, function, args, nonce, gas_price, value=0):
+        self.signed.append((function, nonce))
+        self.signed_args.append(args)
+        return f'raw-{function}-{nonce}', f'{nonce:064x}'
+
+    def broadcast(self, raw_transaction):
+        if self.on_broadcast:
+            self.on_broadcast(raw_transaction)
+        self.broadcasts.append(raw_transaction)
+        return raw_transaction
+
+
+@override_settings(CHAIN_OUTBOX=True)
+@patch.dict(os.environ, {'SELLER_PRIVATE_KEY': '0x' + '11' * 32, 'BUYER_PRIVATE_KEY': '0x' + '22' * 32})
+class OutboxTests(APITestCase):
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='password', user_type='seller')
+        UserProfile.objects.create(user=self.seller, eth_address="0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266")
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        UserProfile.objects.create(user=self.buyer, eth_address="0x70997970c51812dc3a010c7d01b50e0d17dc79c8")
+        self.client.force_authenticate(user=self.seller)
+        self.listing = {'price': '1.5', 'location': 'Outbox Street', 'description': 'Test', 'property_type': 'LAND'}
+        self.chain = FakeOutboxChain(nonce=7)
+
+    def list_property(self, **headers):
+        return self.client.post(reverse('property-list'), self.listing, format='json', **headers)
+
+    @patch('RealEstateBackend.blockchain.list_property_on_blockchain')
+    def test_create_queues_the_listing(self, mock_list_property):
+        """
+        Ensure a listing is saved with its outbox entry and answered without a chain call.
+        """
+        response = self.list_property()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_list_property.assert_not_called()
+        entry = OutboxEntry.objects.get()
+        self.assertEqual((entry.function, entry.signer, entry.status), ('listProperty', 'seller', 'pending'))
+        self.assertEqual(entry.args[0], to_wei('1.5'))
+        self.assertEqual(entry.property_id, response.data['id'])
+        self.assertEqual(response.data['outbox']['status'], 'pending')
+
+    def test_retry_with_idempotency_key_returns_the_first_listing(self):
+        """
+        Ensure a retried request with the same Idempotency-Key creates no second listing or call.
+        """
+        first = self.list_property(HTTP_IDEMPOTENCY_KEY='listing-1')
+        second = self.list_property(HTTP_IDEMPOTENCY_KEY='listing-1')
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(Property.objects.count(), 1)
+        self.assertEqual(OutboxEntry.objects.count(), 1)
+
+    def test_listing_is_not_saved_without_its_entry(self):
+        """
+        Ensure a failed outbox write rolls the listing back too.
+        """
+        with patch('properties.outbox.listing_entry', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                self.list_property()
+        self.assertFalse(Property.objects.exists())
+
+    def test_offer_is_queued_with_its_value(self):
+        """
+        Ensure an offer's submitOffer call is queued for the buyer's key with the amount attached.
+        """
+        property = Property.objects.create(seller=self.seller, price=to_wei(2), location='Test', description='Test', property_type='LAND')
+        self.client.force_authenticate(user=self.buyer)
+        expires_at = (timezone.now() + timedelta(days=1)).isoformat()
+        response = self.client.post(reverse('offer-list'), {'property': property.id, 'amount': '1.25', 'expires_at': expires_at}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        entry = OutboxEntry.objects.get()
+        self.assertEqual((entry.function, entry.signer, entry.value), ('submitOffer', 'buyer', to_wei('1.25')))
+        self.assertEqual(entry.offer_id, response.data['id'])
+        self.assertEqual(entry.args[0], property.id)
+
+    def test_offer_expiry_is_counted_from_signing(self):
+        """
+        Ensure submitOffer's expiresIn is computed when the entry is signed, and an offer expired by then is not sent.
+        """
+        property = Property.objects.create(seller=self.seller, price=to_wei(2), location='Test', description='Test', property_type='LAND')
+        expires_at = timezone.now() + timedelta(hours=1)
+        live = outbox.enqueue_offer(Offer.objects.create(property=property, buyer=self.buyer, amount=to_wei(1), expires_at=expires_at))
+        expired = outbox.enqueue_offer(Offer.objects.create(property=property, buyer=self.buyer, amount=to_wei(1), expires_at=timezone.now() + timedelta(minutes=5)))
+
+        # Both waited in the outbox for ten minutes
+        later = timezone.now() + timedelta(minutes=10)
+        with self.chain.patch(), patch('properties.outbox.timezone.now', return_value=later):
+            outbox.OutboxDispatcher().tick()
+        self.assertEqual(len(self.chain.signed_args), 1)
+        property_id, expires_in_seconds = self.chain.signed_args[0]
+        self.assertEqual(property_id, property.id)
+        self.assertAlmostEqual(expires_in_seconds, (expires_at - later).total_seconds(), delta=1)
+        expired_offer_id = expired.offer_id
+        expired.refresh_from_db()
+        self.assertEqual((expired.status, expired.error), ('failed', 'The offer expired before it was sent'))
+        self.assertFalse(Offer.objects.filter(pk=expired_offer_id).exists())
+        self.assertEqual(OutboxEntry.objects.get(pk=live.pk).status, 'signed')
+
+    def test_bulk_listings_are_queued(self):
+        """
+        Ensure bulk listings are queued together and a retried request is not queued again.
+        """
+        rows = [dict(self.listing, location=f'Outbox Street {n}') for n in range(3)]
+        response = self.client.post(reverse('property-bulk-create'), rows, format='json', HTTP_IDEMPOTENCY_KEY='bulk-1')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['queued'], 3)
+        retry = self.client.post(reverse('property-bulk-create'), rows, format='json', HTTP_IDEMPOTENCY_KEY='bulk-1')
+        self.assertEqual([result['id'] for result in retry.data['results']], [result['id'] for result in response.data['results']])
+        self.assertEqual(OutboxEntry.objects.count(), 3)
+        self.assertEqual(MarketRollup.objects.get(dimension='type', bucket='LAND').listed_count, 3)
+
+    def test_bulk_retry_keeps_request_indexes(self):
+        """
+        Ensure a retried bulk request reports queued and invalid items at their own indexes, ignoring longer keys.
+        """
+        rows = [dict(self.listing, location='Outbox Street 0'), {'location': 'No price'}, dict(self.listing, location='Outbox Street 2')]
+        self.client.post(reverse('property-bulk-create'), [self.listing], format='json', HTTP_IDEMPOTENCY_KEY='bulk-1/x')
+        first = self.client.post(reverse('property-bulk-create'), rows, format='json', HTTP_IDEMPOTENCY_KEY='bulk-1')
+        retry = self.client.post(reverse('property-bulk-create'), rows, format='json', HTTP_IDEMPOTENCY_KEY='bulk-1')
+        for response in (first, retry):
+            self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+            self.assertEqual([(result['index'], result['status']) for result in response.data['results']], [(0, 'queued'), (1, 'invalid'), (2, 'queued')])
+        self.assertEqual(retry.data['results'][2]['id'], first.data['results'][2]['id'])
+        self.assertEqual(sorted(OutboxEntry.objects.values_list('key', flat=True)), [f'{self.seller.pk}:bulk-1/0', f'{self.seller.pk}:bulk-1/2', f'{self.seller.pk}:bulk-1/x/0'])
+
+    def test_concurrent_bulk_requests_queue_once(self):
+        """
+        Ensure a bulk request that loses the race to a concurrent one with the same key returns its entries instead of failing.
+        """
+        rows = [dict(self.listing, location=f'Outbox Street {n}') for n in range(2)]
+        first = self.client.post(reverse('property-bulk-create'), rows, format='json', HTTP_IDEMPOTENCY_KEY='bulk-1')
+        queued_listings = outbox.queued_listings
+        # The second request looked before the first one committed
+        with patch('properties.outbox.queued_listings') as mock_lookup:
+            mock_lookup.side_effect = lambda key: {} if mock_lookup.call_count == 1 else queued_listings(key)
+            second = self.client.post(reverse('property-bulk-create'), rows, format='json', HTTP_IDEMPOTENCY_KEY='bulk-1')
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual([result['id'] for result in second.data['results']], [result['id'] for result in first.data['results']])
+        self.assertEqual(Property.objects.count(), 2)
+
+    @patch('RealEstateBackend.async_blockchain.list_property_on_blockchain', new_callable=AsyncMock)
+    def test_async_listing_is_queued_once(self, mock_list_property):
+        """
+        Ensure the async create endpoint queues the listing without a chain call and honours Idempotency-Key.
+        """
+        token = Token.objects.create(user=self.seller)
+        self.client.force_authenticate(user=None)
+        headers = {'HTTP_AUTHORIZATION': f'Token {token.key}', 'HTTP_IDEMPOTENCY_KEY': 'async-1'}
+        first = self.client.post(reverse('async-property-list'), self.listing, format='json', **headers)
+        second = self.client.post(reverse('async-property-list'), self.listing, format='json', **headers)
+        self.assertEqual((first.status_code, second.status_code), (status.HTTP_202_ACCEPTED, status.HTTP_202_ACCEPTED))
+        self.assertEqual(first.json()['id'], second.json()['id'])
+        self.assertEqual(first.json()['outbox']['status'], 'pending')
+        mock_list_property.assert_not_awaited()
+        entry = OutboxEntry.objects.get()
+        self.assertEqual((entry.key, entry.property_id), (f'{self.seller.pk}:async-1', first.json()['id']))
+
+    @patch('RealEstateBackend.async_blockchain.submit_offer_on_blockchain', new_callable=AsyncMock)
+    def test_async_offer_is_queued(self, mock_submit_offer):
+        """
+        Ensure the async offer endpoint saves the offer with its queued submitOffer call.
+        """
+        property = Property.objects.create(seller=self.seller, price=to_wei(2), location='Test', description='Test', property_type='LAND')
+        token = Token.objects.create(user=self.buyer)
+        self.client.force_authenticate(user=None)
+        expires_at = (timezone.now() + timedelta(days=1)).isoformat()
+        response = self.client.post(
+            reverse('async-offer-list'), {'property': property.id, 'amount': '1.25', 'expires_at': expires_at},
+            format='json', HTTP_AUTHORIZATION=f'Token {token.key}',
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_submit_offer.assert_not_awaited()
+        entry = OutboxEntry.objects.get()
+        self.assertEqual((entry.function, entry.value, entry.offer_id), ('submitOffer', to_wei('1.25'), response.json()['id']))
+
+    def test_dispatcher_saves_each_transaction_before_broadcasting_it(self):
+        """
+        Ensure entries are signed with consecutive nonces and stored before they reach the node.
+        """
+        self.list_property()
+        self.list_property()
+
+        def check_stored(raw_transaction):
+            self.assertTrue(OutboxEntry.objects.filter(raw_transaction=raw_transaction, status='signed').exists())
+        self.chain.on_broadcast = check_stored
+
+        with self.chain.patch():
+            sent, settled = outbox.OutboxDispatcher().tick()
+        self.assertEqual((sent, settled), (2, 0))
+        self.assertEqual(self.chain.signed, [('listProperty', 7), ('listProperty', 8)])
+        entries = list(OutboxEntry.objects.order_by('pk'))
+        self.assertTrue(all(entry.sent_at for entry in entries))
+        self.assertEqual(Property.objects.get(pk=entries[0].property_id).transaction_hash, entries[0].transaction_hash)
+
+        self.chain.receipts[entries[0].transaction_hash] = SimpleNamespace(status=1, blockNumber=12)
+        with self.chain.patch():
+            self.assertEqual(outbox.OutboxDispatcher().tick(), (0, 1))
+        self.assertEqual(OutboxEntry.objects.get(pk=entries[0].pk).status, 'confirmed')
+
+        self.assertEqual(outbox.close_indexed([entries[0].transaction_hash]), 1)
+        self.assertEqual(OutboxEntry.objects.get(pk=entries[0].pk).status, 'indexed')
+
+    def test_interrupted_send_broadcasts_the_same_transaction(self):
+        """
+        Ensure an entry signed by a dispatcher that died before broadcasting is sent as is, not signed again.
+        """
+        self.list_property()
+        OutboxEntry.objects.update(status='signed', sender=self.chain.SENDER, nonce=7, raw_transaction='raw-saved', transaction_hash='aa' * 32)
+        with self.chain.patch():
+            outbox.OutboxDispatcher().tick()
+        self.assertEqual(self.chain.signed, [])
+        self.assertEqual(self.chain.broadcasts, ['raw-saved'])
+        self.assertIsNotNone(OutboxEntry.objects.get().sent_at)
+
+    def test_entry_whose_nonce_was_taken_is_signed_again(self):
+        """
+        Ensure an unmined entry is re-signed with a new nonce once another transaction used its nonce.
+        """
+        self.list_property()
+        OutboxEntry.objects.update(status='signed', sender=self.chain.SENDER, nonce=6, raw_transaction='raw-old', transaction_hash='aa' * 32, sent_at=timezone.now())
+        with self.chain.patch():
+            outbox.OutboxDispatcher().tick()
+        entry = OutboxEntry.objects.get()
+        self.assertEqual((entry.status, entry.nonce), ('signed', 7))
+        self.assertEqual(self.chain.broadcasts, ['raw-listProperty-7'])
+
+    def test_entry_is_not_signed_again_when_nodes_disagree(self):
+        """
+        Ensure a mined entry is never re-signed when one node has mined it and another lags behind.
+        """
+        from web3 import Web3
+        from RealEstateBackend import blockchain
+        from RealEstateBackend.rpc import FailoverHTTPProvider
+
+        self.list_property()
+        tx_hash = '0x' + 'aa' * 32
+        provider = FailoverHTTPProvider(['http://node-a:8545', 'http://node-b:8545'])
+        receipt = {'transactionHash': tx_hash, 'status': '0x1', 'blockNumber': '0xc', 'gasUsed': '0x5208', 'logs': []}
+        # node-a mined the entry's transaction with nonce 7; node-b has not seen that block yet
+        for endpoint, (nonce, mined) in zip(provider.endpoints, [(8, receipt), (7, None)]):
+            endpoint.provider = MagicMock(endpoint_uri=endpoint.uri)
+            endpoint.provider.make_request.side_effect = lambda method, params, nonce=nonce: {'jsonrpc': '2.0', 'id': 0, 'result': hex(nonce)}
+            endpoint.provider.make_batch_request.side_effect = lambda requests, mined=mined: [{'jsonrpc': '2.0', 'id': n, 'result': mined} for n in range(len(requests))]
+
+        # Whichever node the round-robin starts on, the nonce and the receipt come from the same one
+        read_chain = blockchain.mined_nonces_and_receipts
+        statuses = []
+        for start in range(2):
+            OutboxEntry.objects.update(status='signed', sender=self.chain.SENDER, nonce=7, raw_transaction='raw-old', transaction_hash=tx_hash, sent_at=timezone.now())
+            provider._counter = itertools.count(start)
+            with self.chain.patch(), patch.multiple('RealEstateBackend.blockchain', w3=Web3(provider), mined_nonces_and_receipts=read_chain):
+                outbox.OutboxDispatcher().follow_up(blockchain)
+            entry = OutboxEntry.objects.get()
+            statuses.append(entry.status)
+            self.assertEqual((entry.nonce, entry.transaction_hash), (7, tx_hash))
+        self.assertEqual(sorted(statuses), ['confirmed', 'signed'])
+        self.assertEqual(self.chain.signed, [])
+
+    def test_reverted_listing_is_removed(self):
+        """
+        Ensure a listing whose transaction reverted is deleted and taken out of the rollups.
+        """
+        self.list_property()
+        with self.chain.patch():
+            outbox.OutboxDispatcher().tick()
+            entry = OutboxEntry.objects.get()
+            self.chain.receipts[entry.transaction_hash] = SimpleNamespace(status=0, blockNumber=12)
+            outbox.OutboxDispatcher().tick()
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'reverted')
+        self.assertFalse(Property.objects.exists())
+        self.assertEqual(MarketRollup.objects.get(dimension='type', bucket='LAND').listed_count, 0)
+
+
+class TransactionStatusTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='buyer', password='password', user_type='buyer')
+        self.client.force_authenticate(user=self.user)
+
+    def get_status(self, tx_hash):
+        return self.client.get(reverse('tx-status', args=[tx_hash]))
+
+    @patch('RealEstateBackend.blockchain.transaction_status')
+    def test_status_from_the_chain(self, mock_transaction_status):
+        """
+        Ensure the status of a known transaction is returned, with the hash accepted with or without 0x.
+        """
+        mock_transaction_status.return_value = {
+            'transaction_hash': '0x' + 'ab' * 32, 'status': 'replaced', 'block_number': 12,
+            'replaced_by': '0x' + 'cd' * 32, 'confirmations': 2,
+        }
+        response = self.get_status('0x' + 'AB' * 32)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['replaced_by'], '0x' + 'cd' * 32)
+        mock_transaction_status.assert_called_once_with('ab' * 32)
+        self.assertEqual(self.get_status('ab' * 32).status_code, status.HTTP_200_OK)
+
+    @patch('RealEstateBackend.blockchain.transaction_status', return_value=None)
+    def test_status_of_unsent_and_unknown_transactions(self, mock_transaction_status):
+        """
+        Ensure an outbox transaction the node does not know yet reports its outbox status, and other hashes 404.
+        """
+        OutboxEntry.objects.create(key='k', function='listProperty', args=[], signer='seller', status='signed', transaction_hash='ab' * 32)
+        response = self.get_status('ab' * 32)
+        self.assertEqual((response.status_code, response.data['status']), (status.HTTP_200_OK, 'signed'))
+        self.assertEqual(self.get_status('cd' * 32).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get_status('not-a-hash').status_code, status.HTTP_400_BAD_REQUEST)
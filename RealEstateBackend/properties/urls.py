@@ -1,7 +1,8 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PropertyViewSet, OfferViewSet, TransactionViewSet
+from .views import PropertyViewSet, OfferViewSet, TransactionViewSet, ExportView, AnalyticsView, DashboardView, TransactionStatusView
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'properties', PropertyViewSet, basename='property')
@@ -9,5 +10,16 @@ router.register(r'offers', OfferViewSet, basename='offer')
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 
 urlpatterns = [
+    path('stream/', async_views.event_stream, name='event-stream'),
+    path('export/<str:resource>/', ExportView.as_view(), name='export'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('dashboard/<str:role>/', DashboardView.as_view(), name='dashboard'),
+    path('tx/<str:tx_hash>/status/', TransactionStatusView.as_view(), name='tx-status'),
+    path('async/properties/', async_views.property_create, name='async-property-list'),
+    path('async/properties/<int:pk>/chain_status/', async_views.property_chain_status, name='async-property-chain-status'),
+    path('async/properties/<int:pk>/update_inspection_status/', async_views.property_update_inspection_status, name='async-property-update-inspection-status'),
+    path('async/properties/<int:pk>/complete_transaction/', async_views.property_complete_transaction, name='async-property-complete-transaction'),
+    path('async/offers/', async_views.offer_create, name='async-offer-list'),
+    path('async/offers/<int:pk>/accept/', async_views.offer_accept, name='async-offer-accept'),
     path('', include(router.urls)),
 ]
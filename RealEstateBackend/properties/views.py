@@ -1,33 +1,180 @@
+import csv
+import datetime
+import io
 import os
-from rest_framework import viewsets, status, serializers
+import re
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import viewsets, status, serializers, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from .models import Property, Offer, Transaction
-from .serializers import PropertySerializer, OfferSerializer, TransactionSerializer, InspectionUpdateSerializer, OfferActionSerializer
+from rest_framework.views import APIView
+from .models import Property, Offer, Transaction, MarketRollup, OutboxEntry
+from . import analytics, dashboards, feed, outbox
+from .auctions import end_auctions, get_auction_book
+from .money import format_ether
+from .pricing import MAX_POINTS, price_series
+from .exports import EXPORT_FORMATS, ExportError, export_filename, export_stream
+from .serializers import PropertySerializer, OfferSerializer, TransactionSerializer, InspectionUpdateSerializer, OfferActionSerializer, AuctionStartSerializer, AuctionBidSerializer
 from users.permissions import IsSeller, IsBuyer, IsAppraiser, IsInspector
-from web3.exceptions import TransactionNotFound, ContractLogicError, TimeExhausted
-
-class PropertyViewSet(viewsets.ModelViewSet):
+from users.authentication import CachedTokenAuthentication
+from users.models import ZERO_ADDRESS, eth_address_of
+
+def describe_blockchain_error(e):
+    # web3 is imported lazily (it is slow to import); if it raised, it is already loaded
+    from web3.exceptions import TransactionNotFound, ContractLogicError, TimeExhausted
+    if isinstance(e, ContractLogicError):
+        return f"Blockchain contract error: {e.args[0]}", status.HTTP_400_BAD_REQUEST
+    if isinstance(e, TransactionNotFound):
+        return "Blockchain transaction not found. It might have failed or is still pending.", status.HTTP_400_BAD_REQUEST
+    if isinstance(e, TimeExhausted):
+        return "Blockchain transaction timed out. Please try again.", status.HTTP_400_BAD_REQUEST
+    return f"An unexpected blockchain error occurred: {e}", status.HTTP_500_INTERNAL_SERVER_ERROR
+
+def agent_address_for(user):
+    return eth_address_of(user, ZERO_ADDRESS)
+
+def bulk_listing_rows(request):
+    upload = request.FILES.get('file')
+    if upload is not None:
+        try:
+            reader = csv.DictReader(io.StringIO(upload.read().decode('utf-8-sig')))
+        except UnicodeDecodeError:
+            raise ValueError('CSV upload must be UTF-8 encoded.')
+        # Empty cells mean "not provided", so optional fields fall back to their defaults
+        return [{key: value for key, value in row.items() if key and value not in ('', None)} for row in reader]
+
+    data = request.data
+    if isinstance(data, dict) and 'properties' in data:
+        data = data['properties']
+    if not isinstance(data, list):
+        raise ValueError('Expected a list of properties or a CSV file upload.')
+    return data
+
+class OfferNotAcceptable(Exception):
+    pass
+
+def check_offer_acceptable(offer_id, property_id):
+    if Property.objects.filter(pk=property_id, is_sold=True).exists():
+        raise OfferNotAcceptable('This property has already been sold.')
+    if not Offer.objects.filter(pk=offer_id, is_active=True).exists():
+        raise OfferNotAcceptable('This offer is no longer active.')
+
+def claim_offer(offer):
+    """
+    Reserve the property for offer before acceptOffer is sent. The claim is one
+    conditional UPDATE, so of two racing accepts only one matches the row; the
+    other gets OfferNotAcceptable before anything reaches the chain.
+    """
+    check_offer_acceptable(offer.pk, offer.property_id)
+    now = timezone.now()
+    abandoned = now - datetime.timedelta(seconds=settings.OFFER_ACCEPT_CLAIM_TIMEOUT)
+    claimed = Property.objects.filter(
+        Q(accepting_offer__isnull=True) | Q(accepting_since__lt=abandoned), pk=offer.property_id, is_sold=False,
+    ).update(accepting_offer=offer, accepting_since=now)
+    if not claimed:
+        raise OfferNotAcceptable('Another offer on this property is being accepted.')
+
+def release_offer_claim(offer):
+    """Give the property back after offer's acceptOffer failed."""
+    Property.objects.filter(pk=offer.property_id, accepting_offer=offer).update(accepting_offer=None, accepting_since=None)
+
+def record_accepted_offer(offer, tx_hash):
+    """Record a sale whose acceptOffer was mined; the chain has the final word, so this cannot lose a race."""
+    with transaction.atomic():
+        Property.objects.filter(pk=offer.property_id).update(is_sold=True, buyer=offer.buyer_id, accepting_offer=None, accepting_since=None)
+        Offer.objects.filter(pk=offer.pk).update(is_active=False, transaction_hash=tx_hash)
+
+        competing = list(Offer.objects.filter(property_id=offer.property_id, is_active=True).values_list('pk', flat=True))
+        Offer.objects.filter(pk__in=competing).update(is_active=False)
+
+        # QuerySet.update() skips post_save, so the feed is told explicitly
+        feed.publish_property_update(offer.property_id)
+        feed.publish_many(Offer.objects.filter(pk__in=[offer.pk, *competing]).select_related('property'), 'updated')
+
+def auction_state(property):
+    book_entry = get_auction_book().get(property.id)
+    highest = book_entry.highest() if book_entry else None
+    return {
+        'property_id': property.id,
+        'auction_end_time': property.auction_end_time,
+        'minimum_bid': format_ether(property.minimum_bid),
+        'is_active': bool(property.auction_end_time and not property.is_sold and property.auction_end_time > timezone.now()),
+        'highest_bid': format_ether(highest[0]) if highest else None,
+        'highest_bidder': highest[1] if highest else None,
+        'bid_count': book_entry.bid_count if book_entry else 0,
+        'is_sold': property.is_sold,
+    }
+
+def record_completed_transaction(property, tx_hash):
+    property.is_sold = True
+    property.is_listed = False
+    property.transaction_hash = tx_hash
+    property.save()
+
+    Transaction.objects.create(
+        property=property,
+        seller=property.seller,
+        buyer=property.buyer,
+        price=property.offer_amount,
+        transaction_hash=tx_hash
+    )
+
+class OutboxCreateMixin:
+    """
+    With CHAIN_OUTBOX on, create() saves the new row and its contract call
+    (see properties.outbox) in one database transaction and answers 202
+    without waiting for the chain. A retry with the same Idempotency-Key
+    header gets the first request's row and call instead of new ones.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not settings.CHAIN_OUTBOX:
+            return super().create(request, *args, **kwargs)
+        key = outbox.idempotency_key(request)
+        entry = OutboxEntry.objects.filter(key=key).first() if key else None
+        if entry is None:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                with transaction.atomic():
+                    entry = self.perform_create_with_outbox(serializer, key)
+            except IntegrityError:
+                # A concurrent request with the same key got there first
+                entry = OutboxEntry.objects.filter(key=key).first() if key else None
+                if entry is None:
+                    raise
+        instance = entry.offer or entry.property
+        data = self.get_serializer(instance).data if instance else {}
+        return Response({**data, 'outbox': outbox.describe(entry)}, status=status.HTTP_202_ACCEPTED)
+
+class PropertyViewSet(OutboxCreateMixin, viewsets.ModelViewSet):
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'bulk_create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAuthenticated, IsSeller | permissions.IsAdminUser]
         elif self.action == 'update_inspection_status':
             self.permission_classes = [IsAuthenticated, IsAppraiser | IsInspector | permissions.IsAdminUser]
         elif self.action == 'complete_transaction':
             self.permission_classes = [IsAuthenticated, IsSeller | IsBuyer | permissions.IsAdminUser]
+        elif self.action in ['start_auction', 'end_auction']:
+            self.permission_classes = [IsAuthenticated, IsSeller | permissions.IsAdminUser]
+        elif self.action == 'bid':
+            self.permission_classes = [IsAuthenticated, IsBuyer]
         return super().get_permissions()
 
     def perform_create(self, serializer):
         seller_private_key = os.environ.get('SELLER_PRIVATE_KEY')
 
-        agent_address = self.request.user.userprofile.eth_address if hasattr(self.request.user, 'userprofile') and self.request.user.userprofile.eth_address else "0x0000000000000000000000000000000000000000"
+        agent_address = agent_address_for(self.request.user)
 
         price = serializer.validated_data['price']
         location = serializer.validated_data['location']
@@ -40,7 +187,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         from RealEstateBackend.blockchain import list_property_on_blockchain
         tx_hash = list_property_on_blockchain(
             seller_private_key,
-            float(price),
+            price,
             location,
             property_type,
             area,
@@ -51,6 +198,103 @@ class PropertyViewSet(viewsets.ModelViewSet):
         )
         serializer.save(seller=self.request.user, transaction_hash=tx_hash)
 
+    def perform_create_with_outbox(self, serializer, key):
+        property = serializer.save(seller=self.request.user)
+        return outbox.enqueue_listing(property, agent_address_for(self.request.user), key)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        List many properties in one request: a JSON array (or {"properties": [...]})
+        or a CSV upload in the "file" field, one listing per row.
+        """
+        try:
+            rows = bulk_listing_rows(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not rows:
+            return Response({'error': 'No listings provided.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.BULK_LISTING_MAX:
+            return Response({'error': f'At most {settings.BULK_LISTING_MAX} listings per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [{'index': index} for index in range(len(rows))]
+        valid = []
+        for result, row in zip(results, rows):
+            serializer = PropertySerializer(data=row)
+            if serializer.is_valid():
+                valid.append((result, serializer.validated_data))
+            else:
+                result.update(status='invalid', errors=serializer.errors)
+
+        if valid and settings.CHAIN_OUTBOX:
+            return self.bulk_create_with_outbox(request, results, valid)
+        if valid:
+            # Sent first and only confirmed listings inserted, as in perform_create: no
+            # row is visible before it is on chain, and none has to be deleted after
+            try:
+                from RealEstateBackend.blockchain import list_properties_on_blockchain
+                chain_results = list_properties_on_blockchain(
+                    os.environ.get('SELLER_PRIVATE_KEY'),
+                    [validated_data for _, validated_data in valid],
+                    agent_address_for(request.user)
+                )
+            except Exception as e:
+                message, status_code = describe_blockchain_error(e)
+                return Response({'error': message}, status=status_code)
+
+            confirmed = []
+            for (result, validated_data), chain_result in zip(valid, chain_results):
+                if chain_result['status'] == 'confirmed':
+                    confirmed.append((result, Property(seller=request.user, transaction_hash=chain_result['transaction_hash'], **validated_data)))
+                else:
+                    result.update(status='failed', transaction_hash=chain_result['transaction_hash'], error=chain_result['error'] or chain_result['status'])
+
+            with transaction.atomic():
+                listed = Property.objects.bulk_create([property for _, property in confirmed])
+                feed.publish_many(listed, 'created')
+                # bulk_create skips post_save, so the rollups are updated here
+                analytics.record_listings(listed)
+            for (result, _), property in zip(confirmed, listed):
+                result.update(status='listed', id=property.pk, transaction_hash=property.transaction_hash)
+
+        counts = {key: sum(1 for result in results if result['status'] == key) for key in ('listed', 'failed', 'invalid')}
+        if counts['listed'] == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif counts['listed']:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({**counts, 'results': results}, status=response_status)
+
+    def bulk_create_with_outbox(self, request, results, valid):
+        key = outbox.idempotency_key(request)
+        # On a retry of a bulk request that was queued already, the first request's entries
+        entries = outbox.queued_listings(key)
+        if not entries:
+            try:
+                with transaction.atomic():
+                    properties = Property.objects.bulk_create(
+                        [Property(seller=request.user, **validated_data) for _, validated_data in valid]
+                    )
+                    indexes = [result['index'] for result, _ in valid]
+                    entries = dict(zip(indexes, outbox.enqueue_listings(properties, agent_address_for(request.user), key, indexes)))
+                    feed.publish_many(properties, 'created')
+                    # bulk_create skips post_save, so the rollups are updated here
+                    analytics.record_listings(properties)
+            except IntegrityError:
+                # A concurrent request with the same key got there first
+                entries = outbox.queued_listings(key)
+                if not entries:
+                    raise
+        for result in results:
+            entry = entries.get(result['index'])
+            if entry is not None:
+                result.update(status='queued', id=entry.property_id, outbox=outbox.describe(entry))
+
+        counts = {key: sum(1 for result in results if result['status'] == key) for key in ('queued', 'invalid')}
+        response_status = status.HTTP_202_ACCEPTED if counts['queued'] == len(results) else status.HTTP_207_MULTI_STATUS
+        return Response({**counts, 'results': results}, status=response_status)
+
     @action(detail=True, methods=['patch'])
     def update_inspection_status(self, request, pk=None):
         property = self.get_object()
@@ -69,16 +313,136 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 )
                 serializer.save(transaction_hash=tx_hash)
                 return Response(serializer.data)
-            except ContractLogicError as e:
-                raise serializers.ValidationError(f"Blockchain contract error: {e.args[0]}")
-            except TransactionNotFound:
-                raise serializers.ValidationError("Blockchain transaction not found. It might have failed or is still pending.")
-            except TimeExhausted:
-                raise serializers.ValidationError("Blockchain transaction timed out. Please try again.")
             except Exception as e:
-                raise serializers.ValidationError(f"An unexpected blockchain error occurred: {e}")
+                raise serializers.ValidationError(describe_blockchain_error(e)[0])
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def chain_status(self, request, pk=None):
+        property = self.get_object()
+        try:
+            from RealEstateBackend.blockchain import get_property_chain_status
+            return Response(get_property_chain_status(property.id))
+        except Exception as e:
+            message, status_code = describe_blockchain_error(e)
+            return Response({'error': message}, status=status_code)
+
+    @action(detail=True, methods=['post'])
+    def start_auction(self, request, pk=None):
+        property = self.get_object()
+        if property.seller != request.user and not request.user.is_staff:
+            return Response({'error': 'You are not the seller of this property.'}, status=status.HTTP_403_FORBIDDEN)
+        if property.is_sold:
+            return Response({'error': 'This property has already been sold.'}, status=status.HTTP_409_CONFLICT)
+        if property.auction_end_time is not None:
+            return Response({'error': 'An auction has already been started for this property.'}, status=status.HTTP_409_CONFLICT)
+        serializer = AuctionStartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        minimum_bid = serializer.validated_data['minimum_bid']
+        duration = serializer.validated_data['duration']
+
+        try:
+            from RealEstateBackend.blockchain import start_auction_on_blockchain
+            tx_hash = start_auction_on_blockchain(
+                os.environ.get('SELLER_PRIVATE_KEY'),
+                property.id,
+                minimum_bid,
+                duration
+            )
+        except Exception as e:
+            message, status_code = describe_blockchain_error(e)
+            return Response({'error': message}, status=status_code)
+
+        property.auction_started_at = timezone.now()
+        property.auction_end_time = property.auction_started_at + datetime.timedelta(seconds=duration)
+        property.minimum_bid = minimum_bid
+        property.transaction_hash = tx_hash
+        property.save()
+        get_auction_book().start(property.id, property.auction_end_time, minimum_bid)
+        return Response(auction_state(property), status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def bid(self, request, pk=None):
+        property = self.get_object()
+        if property.auction_end_time is None or property.is_sold or property.auction_end_time <= timezone.now():
+            return Response({'error': 'This property has no auction open for bids.'}, status=status.HTTP_409_CONFLICT)
+        if property.seller == request.user:
+            return Response({'error': 'Sellers cannot bid on their own property.'}, status=status.HTTP_403_FORBIDDEN)
+        serializer = AuctionBidSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        amount = serializer.validated_data['amount']
+
+        # Mirror the contract's checks from the bid index so a losing bid never costs gas
+        if amount < property.minimum_bid:
+            return Response({'error': f'Bid must be at least the minimum bid of {format_ether(property.minimum_bid)}.'}, status=status.HTTP_400_BAD_REQUEST)
+        book = get_auction_book()
+        highest = book.highest_bid(property.id)
+        if highest and amount <= highest[0]:
+            return Response({'error': f'Bid must be higher than the current highest bid of {format_ether(highest[0])}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            from RealEstateBackend.blockchain import bid_on_auction_on_blockchain
+            tx_hash = bid_on_auction_on_blockchain(
+                os.environ.get('BUYER_PRIVATE_KEY'),
+                property.id,
+                amount
+            )
+        except Exception as e:
+            message, status_code = describe_blockchain_error(e)
+            return Response({'error': message}, status=status_code)
+
+        offer = Offer.objects.create(
+            property=property,
+            buyer=request.user,
+            amount=amount,
+            expires_at=property.auction_end_time,
+            transaction_hash=tx_hash
+        )
+        book.bid(property.id, amount, getattr(getattr(request.user, 'userprofile', None), 'eth_address', None))
+        return Response(OfferSerializer(offer).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def price_history(self, request, pk=None):
+        """
+        PriceUpdated history, optionally between ?from_block= and ?to_block=.
+        ?points=N downsamples it to at most N open/close/low/high buckets.
+        """
+        property = self.get_object()
+        try:
+            from_block, to_block, points = (
+                int(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ('from_block', 'to_block', 'points')
+            )
+        except ValueError:
+            return Response({'error': 'from_block, to_block and points must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if points is not None and not 1 <= points <= MAX_POINTS:
+            return Response({'error': f'points must be between 1 and {MAX_POINTS}.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'property_id': property.id,
+            'current_price': format_ether(property.price),
+            'results': price_series(property.id, from_block, to_block, points),
+        })
+
+    @action(detail=True, methods=['get'])
+    def auction(self, request, pk=None):
+        return Response(auction_state(self.get_object()))
+
+    @action(detail=True, methods=['post'])
+    def end_auction(self, request, pk=None):
+        property = self.get_object()
+        if property.seller != request.user and not request.user.is_staff:
+            return Response({'error': 'You are not the seller of this property.'}, status=status.HTTP_403_FORBIDDEN)
+        if property.auction_end_time is None or property.is_sold:
+            return Response({'error': 'This property has no open auction.'}, status=status.HTTP_409_CONFLICT)
+        if property.auction_end_time > timezone.now():
+            return Response({'error': 'The auction has not ended yet.'}, status=status.HTTP_409_CONFLICT)
+
+        result = end_auctions([property.id])[0]
+        if result['status'] != 'confirmed':
+            return Response({'error': result['error'] or f"endAuction {result['status']}."}, status=status.HTTP_502_BAD_GATEWAY)
+        property.refresh_from_db()
+        return Response({**auction_state(property), 'transaction_hash': result['transaction_hash']})
+
     @action(detail=True, methods=['post'])
     def complete_transaction(self, request, pk=None):
         property = self.get_object()
@@ -103,33 +467,17 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 property.id
             )
 
-            property.is_sold = True
-            property.is_listed = False
-            property.transaction_hash = tx_hash
-            property.save()
-
-            Transaction.objects.create(
-                property=property,
-                seller=property.seller,
-                buyer=property.buyer,
-                price=property.offer_amount,
-                transaction_hash=tx_hash
-            )
+            record_completed_transaction(property, tx_hash)
 
             return Response({'status': 'transaction completed', 'transaction_hash': tx_hash})
-        except ContractLogicError as e:
-            return Response({'error': f"Blockchain contract error: {e.args[0]}"}, status=status.HTTP_400_BAD_REQUEST)
-        except TransactionNotFound:
-            return Response({'error': "Blockchain transaction not found. It might have failed or is still pending."}, status=status.HTTP_400_BAD_REQUEST)
-        except TimeExhausted:
-            return Response({'error': "Blockchain transaction timed out. Please try again."}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            return Response({'error': f"An unexpected blockchain error occurred: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            message, status_code = describe_blockchain_error(e)
+            return Response({'error': message}, status=status_code)
 
-class OfferViewSet(viewsets.ModelViewSet):
+class OfferViewSet(OutboxCreateMixin, viewsets.ModelViewSet):
     queryset = Offer.objects.all()
     serializer_class = OfferSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_permissions(self):
@@ -145,7 +493,6 @@ class OfferViewSet(viewsets.ModelViewSet):
         property_id = serializer.validated_data['property'].id
         amount = serializer.validated_data['amount']
         expires_at = serializer.validated_data['expires_at']
-        import datetime
         expires_in_seconds = int((expires_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
 
         try:
@@ -153,18 +500,15 @@ class OfferViewSet(viewsets.ModelViewSet):
             tx_hash = submit_offer_on_blockchain(
                 buyer_private_key,
                 property_id,
-                float(amount),
+                amount,
                 expires_in_seconds
             )
             serializer.save(buyer=self.request.user, transaction_hash=tx_hash)
-        except ContractLogicError as e:
-            raise serializers.ValidationError(f"Blockchain contract error: {e.args[0]}")
-        except TransactionNotFound:
-            raise serializers.ValidationError("Blockchain transaction not found. It might have failed or is still pending.")
-        except TimeExhausted:
-            raise serializers.ValidationError("Blockchain transaction timed out. Please try again.")
         except Exception as e:
-            raise serializers.ValidationError(f"An unexpected blockchain error occurred: {e}")
+            raise serializers.ValidationError(describe_blockchain_error(e)[0])
+
+    def perform_create_with_outbox(self, serializer, key):
+        return outbox.enqueue_offer(serializer.save(buyer=self.request.user), key)
 
     @action(detail=True, methods=['post'])
     def accept(self, request, pk=None):
@@ -175,35 +519,25 @@ class OfferViewSet(viewsets.ModelViewSet):
 
         seller_private_key = os.environ.get('SELLER_PRIVATE_KEY')
 
+        try:
+            claim_offer(offer)
+        except OfferNotAcceptable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+
         try:
             from RealEstateBackend.blockchain import accept_offer_on_blockchain
             tx_hash = accept_offer_on_blockchain(
                 seller_private_key,
                 property.id,
-                offer.buyer.userprofile.eth_address
+                eth_address_of(offer.buyer)
             )
-
-            offer.is_active = False
-            offer.transaction_hash = tx_hash
-            offer.save()
-
-            property.is_sold = True
-            property.buyer = offer.buyer
-            property.save()
-
-            for other_offer in property.offers.filter(is_active=True):
-                other_offer.is_active = False
-                other_offer.save()
-
-            return Response({'status': 'offer accepted', 'transaction_hash': tx_hash})
-        except ContractLogicError as e:
-            return Response({'error': f"Blockchain contract error: {e.args[0]}"}, status=status.HTTP_400_BAD_REQUEST)
-        except TransactionNotFound:
-            return Response({'error': "Blockchain transaction not found. It might have failed or is still pending."}, status=status.HTTP_400_BAD_REQUEST)
-        except TimeExhausted:
-            return Response({'error': "Blockchain transaction timed out. Please try again."}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            return Response({'error': f"An unexpected blockchain error occurred: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            release_offer_claim(offer)
+            message, status_code = describe_blockchain_error(e)
+            return Response({'error': message}, status=status_code)
+
+        record_accepted_offer(offer, tx_hash)
+        return Response({'status': 'offer accepted', 'transaction_hash': tx_hash})
 
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
@@ -220,5 +554,110 @@ class OfferViewSet(viewsets.ModelViewSet):
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
-    authentication_classes = [TokenAuthentication]
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+class ExportView(APIView):
+    """
+    GET /api/export/<properties|offers|transactions>/?output=csv|ndjson|parquet&compress=gzip
+
+    Streams the whole table; rows are never all held in memory.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, permissions.IsAdminUser]
+
+    def get(self, request, resource):
+        output = request.query_params.get('output', 'csv')
+        compress = request.query_params.get('compress') == 'gzip'
+        try:
+            chunks = export_stream(resource, output, compress)
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type = 'application/gzip' if compress else EXPORT_FORMATS[output][0]
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(resource, output, compress)}"'
+        return response
+
+class AnalyticsView(APIView):
+    """
+    GET /api/analytics/?dimension=type|day|location[&from=YYYY-MM-DD&to=YYYY-MM-DD]
+
+    Listing and sale aggregates per bucket, read from the MarketRollup table.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        dimension = request.query_params.get('dimension', 'type')
+        if dimension not in analytics.DIMENSIONS:
+            return Response({'error': f"Unknown dimension '{dimension}'. Choose from: {', '.join(analytics.DIMENSIONS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollups = MarketRollup.objects.filter(dimension=dimension).order_by('bucket')
+        if dimension == 'day':
+            # ISO dates sort and compare correctly as strings
+            if request.query_params.get('from'):
+                rollups = rollups.filter(bucket__gte=request.query_params['from'])
+            if request.query_params.get('to'):
+                rollups = rollups.filter(bucket__lte=request.query_params['to'])
+        return Response({'dimension': dimension, 'results': [analytics.summarize(rollup) for rollup in rollups]})
+
+class DashboardView(APIView):
+    """
+    GET /api/dashboard/<role>/ for role in buyer, seller, appraiser, inspector, admin
+
+    Everything one dashboard page shows, computed in a fixed number of queries
+    and cached per user until the next property, offer or transaction change.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, role):
+        if role not in dashboards.ROLES:
+            return Response({'error': f"Unknown dashboard '{role}'. Choose from: {', '.join(dashboards.ROLES)}."}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        # Superusers can open every dashboard, as in the frontend
+        if user.user_type != role and not user.is_superuser:
+            return Response({'error': f'The {role} dashboard is only available to {role} users.'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(dashboards.get_dashboard(role, user))
+
+
+TX_HASH_RE = re.compile(r'(?:0x)?([0-9a-fA-F]{64})')
+
+class TransactionStatusView(APIView):
+    """
+    GET /api/tx/<hash>/status/
+
+    Where a transaction is: pending, confirmed, reverted, replaced (by a
+    sped-up version, in replaced_by) or dropped, with its confirmations once
+    mined. Outbox transactions no node has accepted yet report their outbox
+    status.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, tx_hash):
+        match = TX_HASH_RE.fullmatch(tx_hash)
+        if not match:
+            return Response({'error': 'Expected a 32-byte transaction hash in hex.'}, status=status.HTTP_400_BAD_REQUEST)
+        tx_hash = match.group(1).lower()
+
+        from RealEstateBackend import blockchain
+        try:
+            result = blockchain.transaction_status(tx_hash)
+        except Exception as e:
+            message, status_code = describe_blockchain_error(e)
+            return Response({'error': message}, status=status_code)
+        if result is not None:
+            return Response(result)
+
+        entry = OutboxEntry.objects.filter(transaction_hash=tx_hash).first()
+        if entry is None:
+            return Response({'error': 'Unknown transaction.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'transaction_hash': '0x' + tx_hash,
+            'status': entry.status,
+            'block_number': entry.block_number,
+            'confirmations': None,
+            'replaced_by': None,
+        })
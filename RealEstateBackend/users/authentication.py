@@ -0,0 +1,105 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LocalTokenCache:
+    """
+    A small in-process LRU of token -> pickled user, each entry expiring after
+    ttl seconds. Entries are pickled so every request gets its own user
+    instance rather than one shared between threads.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, pickled user)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = LocalTokenCache(settings.TOKEN_CACHE_LOCAL_SIZE, settings.TOKEN_CACHE_LOCAL_TTL)
+
+
+def _cache_key(key):
+    # Raw tokens are credentials; keep them out of the shared cache's key space
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_token_user(key):
+    """
+    The active user owning token key, with its profile loaded, or None.
+
+    Looked up in this process's LRU, then the shared cache, and only then in
+    the database. invalidate_token() drops an entry from both; other workers
+    may keep a stale copy for at most TOKEN_CACHE_LOCAL_TTL seconds.
+    """
+    cache_key = _cache_key(key)
+    data = _local.get(cache_key)
+    if data is None:
+        data = cache.get(cache_key)
+        if data is None:
+            token = Token.objects.select_related('user', 'user__userprofile').filter(key=key).first()
+            if token is None or not token.user.is_active:
+                return None
+            data = pickle.dumps(token.user)
+            cache.set(cache_key, data, settings.TOKEN_CACHE_TTL)
+        _local.set(cache_key, data)
+    return pickle.loads(data)
+
+
+def invalidate_token(key):
+    cache_key = _cache_key(key)
+    _local.delete(cache_key)
+    cache.delete(cache_key)
+
+
+def invalidate_user_tokens(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication resolving token -> user (and profile) through get_token_user."""
+
+    def authenticate_credentials(self, key):
+        user = get_token_user(key)
+        if user is None:
+            # Same messages as TokenAuthentication; an inactive user's token is not cached
+            if Token.objects.filter(key=key).exists():
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return (user, key)
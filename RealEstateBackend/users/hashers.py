@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2id with its cost taken from settings. Hashes made with other
+    parameters still verify and are re-hashed at the user's next login.
+    Measure the cost with `python -m benchmarks.login`.
+    """
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST  # KiB
+    parallelism = settings.ARGON2_PARALLELISM
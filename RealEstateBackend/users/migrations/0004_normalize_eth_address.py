@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:28
+
+import re
+
+import users.models
+from django.db import migrations
+
+ETH_ADDRESS = re.compile(r"^0x[0-9a-f]{40}$")
+
+
+def normalize_addresses(apps, schema_editor):
+    # Lowercase every address before the unique index is built. Blank values
+    # become NULL; a value that is not an address, or that duplicates another
+    # profile's once lowercased, stops the migration so nothing is discarded
+    UserProfile = apps.get_model("users", "UserProfile")
+    owners = {}
+    conflicts = []
+    profiles = []
+    for profile in UserProfile.objects.exclude(eth_address__isnull=True).order_by("pk"):
+        address = profile.eth_address.strip().lower() or None
+        if address is None:
+            pass
+        elif not ETH_ADDRESS.match(address):
+            conflicts.append(f"profile {profile.pk} (user {profile.user_id}): {profile.eth_address!r} is not an address")
+            continue
+        elif address in owners:
+            conflicts.append(
+                f"profile {profile.pk} (user {profile.user_id}): {profile.eth_address!r} duplicates profile {owners[address]}"
+            )
+            continue
+        else:
+            owners[address] = profile.pk
+        if address != profile.eth_address:
+            profile.eth_address = address
+            profiles.append(profile)
+    if conflicts:
+        raise RuntimeError(
+            "Fix or clear these eth_address values before migrating; they cannot be made unique lowercase addresses:\n  "
+            + "\n  ".join(conflicts)
+        )
+    UserProfile.objects.bulk_update(profiles, ["eth_address"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_alter_customuser_user_type"),
+    ]
+
+    operations = [
+        # Not reversed: the original spelling of normalized addresses is not kept,
+        # and lowercase addresses are valid under the old field as well
+        migrations.RunPython(normalize_addresses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="eth_address",
+            field=users.models.EthAddressField(
+                blank=True, max_length=42, null=True, unique=True
+            ),
+        ),
+    ]
@@ -1,6 +1,55 @@
+import re
+
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
 
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+_ETH_ADDRESS = re.compile(r'^0x[0-9a-f]{40}$')
+
+
+def normalize_eth_address(address):
+    """Canonical (lowercase) form of a hex address; raises ValueError if it is not one."""
+    normalized = address.strip().lower() if isinstance(address, str) else ''
+    if not _ETH_ADDRESS.match(normalized):
+        raise ValueError(f'{address!r} is not an Ethereum address.')
+    return normalized
+
+
+def validate_eth_address(value):
+    try:
+        normalize_eth_address(value)
+    except ValueError:
+        raise ValidationError('Enter a valid Ethereum address.', code='invalid')
+    body = value.strip()[2:]
+    if body != body.lower() and body != body.upper():
+        # Mixed case is an EIP-55 checksum; reject typos it would catch
+        from eth_utils import is_checksum_address
+        if not is_checksum_address(value.strip()):
+            raise ValidationError('Invalid Ethereum address checksum.', code='checksum')
+
+
+class EthAddressField(models.CharField):
+    """
+    A hex address stored in canonical lowercase, so a checksummed address from
+    an event log and the address a user typed hit the same index entry. Blank
+    values are stored as NULL to keep the unique index usable.
+    """
+    default_validators = [validate_eth_address]
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if isinstance(value, str):
+            return value.strip().lower() or None
+        return value
+
+    def pre_save(self, model_instance, add):
+        value = self.get_prep_value(getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = (
         ('buyer', 'Buyer'),
@@ -15,7 +64,25 @@ class UserProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     address = models.CharField(max_length=255, blank=True, null=True)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
-    eth_address = models.CharField(max_length=42, blank=True, null=True) # Ethereum address
+    eth_address = EthAddressField(max_length=42, unique=True, blank=True, null=True)
 
     def __str__(self):
-        return self.user.username
\ No newline at end of file
+        return self.user.username
+
+
+def user_for_eth_address(address):
+    """The user whose profile holds address, in any letter case; None if there is none."""
+    try:
+        address = normalize_eth_address(address)
+    except ValueError:
+        return None
+    return CustomUser.objects.filter(userprofile__eth_address=address).first()
+
+
+def eth_address_of(user, default=None):
+    """The user's address in checksum form, as web3 requires for contract arguments."""
+    profile = getattr(user, 'userprofile', None)
+    if profile is None or not profile.eth_address:
+        return default
+    from eth_utils import to_checksum_address
+    return to_checksum_address(profile.eth_address)
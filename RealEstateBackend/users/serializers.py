@@ -1,7 +1,8 @@
 
 from django.contrib.auth import authenticate
 from rest_framework import serializers
-from .models import CustomUser, UserProfile
+from RealEstateBackend.metrics import TimedSerializerMixin
+from .models import CustomUser, UserProfile, normalize_eth_address
 
 class AuthTokenSerializer(serializers.Serializer):
     username = serializers.CharField()
@@ -31,7 +32,11 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = UserProfile
         fields = ('address', 'phone_number', 'eth_address')
 
-class CustomUserSerializer(serializers.ModelSerializer):
+    def validate_eth_address(self, value):
+        # The field validators have already rejected malformed addresses
+        return normalize_eth_address(value) if value else None
+
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     userprofile = UserProfileSerializer()
     password = serializers.CharField(write_only=True)
     is_staff = serializers.BooleanField(read_only=True)
@@ -1,7 +1,18 @@
+import importlib
+from unittest.mock import patch
+
+from django.apps import apps
+
+from django.core.cache import cache
+from django.db.models import Value
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
-from .models import CustomUser, UserProfile
+from .authentication import _local
+from .throttling import SlidingWindowLimiter
+from .models import CustomUser, UserProfile, eth_address_of, user_for_eth_address
 
 class UserTests(APITestCase):
     def test_create_buyer_user(self):
@@ -128,4 +139,219 @@ class UserTests(APITestCase):
 
 
 
-        
\ No newline at end of file
+        
+
+
+class EthAddressTests(APITestCase):
+    def create_user(self, username, eth_address):
+        return self.client.post(reverse('user-list'), {
+            'username': username,
+            'password': 'testpassword',
+            'user_type': 'buyer',
+            'userprofile': {'eth_address': eth_address},
+        }, format='json')
+
+    def test_address_is_stored_lowercase(self):
+        """
+        Ensure a checksummed address is stored in canonical lowercase and found from any case.
+        """
+        response = self.create_user('buyer', '0x70997970C51812dc3A010C7d01b50e0d17dc79C8')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['userprofile']['eth_address'], '0x70997970c51812dc3a010c7d01b50e0d17dc79c8')
+
+        user = CustomUser.objects.get(username='buyer')
+        self.assertEqual(user_for_eth_address('0x70997970C51812DC3A010C7D01B50E0D17DC79C8'), user)
+        self.assertEqual(eth_address_of(user), '0x70997970C51812dc3A010C7d01b50e0d17dc79C8')
+        self.assertIsNone(user_for_eth_address('0x' + '1' * 40))
+        self.assertIsNone(user_for_eth_address('not an address'))
+
+    def test_invalid_addresses_are_rejected(self):
+        """
+        Ensure malformed addresses and bad EIP-55 checksums are rejected.
+        """
+        for address in ['0x1234', '0x' + 'g' * 40, '70997970c51812dc3a010c7d01b50e0d17dc79c8', '0x70997970c51812dc3A010C7d01b50e0d17dc79C8']:
+            response = self.create_user('buyer', address)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, address)
+            self.assertIn('eth_address', response.data['userprofile'])
+        self.assertEqual(CustomUser.objects.count(), 0)
+
+    def test_address_is_unique_across_case(self):
+        """
+        Ensure an address already registered in another letter case is rejected.
+        """
+        self.assertEqual(self.create_user('first', '0x70997970c51812dc3a010c7d01b50e0d17dc79c8').status_code, status.HTTP_201_CREATED)
+        response = self.create_user('second', '0x70997970C51812dc3A010C7d01b50e0d17dc79C8')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_blank_addresses_do_not_collide(self):
+        """
+        Ensure several profiles can be created without an address.
+        """
+        self.assertEqual(self.create_user('first', '').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create_user('second', '').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(UserProfile.objects.values_list('eth_address', flat=True)), [None, None])
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        _local.clear()
+        self.user = CustomUser.objects.create_user(username='buyer', password='testpassword', user_type='buyer')
+        UserProfile.objects.create(user=self.user, phone_number='111-222-3333')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_needs_no_queries(self):
+        """
+        Ensure a repeated request resolves the token, user and profile without touching the database.
+        """
+        self.assertEqual(self.client.get('/api/users/me/').status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['userprofile']['phone_number'], '111-222-3333')
+
+        # A worker with an empty LRU falls back to the shared cache
+        _local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/users/me/').status_code, status.HTTP_200_OK)
+
+    def test_profile_and_user_changes_invalidate(self):
+        """
+        Ensure profile updates and deactivation are seen by the next request.
+        """
+        self.client.get('/api/users/me/')
+        self.user.userprofile.phone_number = '000-000-0000'
+        self.user.userprofile.save()
+        self.assertEqual(self.client.get('/api/users/me/').data['userprofile']['phone_number'], '000-000-0000')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates_token(self):
+        """
+        Ensure a token stops working as soon as the user logs out.
+        """
+        self.client.get('/api/users/me/')
+        self.assertEqual(self.client.post(reverse('logout')).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertEqual(self.client.get('/api/users/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(LOGIN_FAILURE_LIMIT_PER_USER=3, LOGIN_FAILURE_LIMIT_PER_IP=100)
+class LoginTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='buyer', password='testpassword', user_type='buyer')
+
+    def login(self, username='buyer', password='testpassword'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password}, format='json')
+
+    def test_failed_login_goes_through_authenticate(self):
+        """
+        Ensure failed logins use the authentication backends, which hash the password for unknown users too.
+        """
+        with patch.object(CustomUser, 'set_password') as mock_set_password:
+            response = self.login(username='nobody')
+        mock_set_password.assert_called_once_with('testpassword')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'User not found.')
+        response = self.login(password='wrong')
+        self.assertEqual(response.data['error'], 'Invalid password.')
+
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.user).key)
+
+    def test_repeated_failures_are_throttled_without_hashing(self):
+        """
+        Ensure failures past the per-username limit get 429 before any password check.
+        """
+        for _ in range(3):
+            self.assertEqual(self.login(password='wrong').status_code, status.HTTP_400_BAD_REQUEST)
+        with patch.object(CustomUser, 'check_password') as mock_check_password, self.assertNumQueries(0):
+            response = self.login()
+        mock_check_password.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        # Other usernames from the same client are still under their own limit
+        CustomUser.objects.create_user(username='seller', password='testpassword', user_type='seller')
+        self.assertEqual(self.login(username='seller').status_code, status.HTTP_200_OK)
+
+    def test_token_endpoint_shares_the_limits(self):
+        """
+        Ensure /api-token-auth/ counts failures against the same limits as /api/login/.
+        """
+        for _ in range(3):
+            response = self.client.post(reverse('api-token-auth'), {'username': 'buyer', 'password': 'wrong'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('api-token-auth'), {'username': 'buyer', 'password': 'testpassword'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_FAILURE_LIMIT_PER_USER=100, LOGIN_FAILURE_LIMIT_PER_IP=2, TRUSTED_PROXY_COUNT=1)
+    def test_clients_behind_the_proxy_are_limited_separately(self):
+        """
+        Ensure the per-IP limit keys on the address the trusted proxy forwarded, not on the proxy's.
+        """
+        def login(forwarded_for):
+            return self.client.post(reverse('login'), {'username': 'buyer', 'password': 'wrong'}, format='json',
+                                    REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for)
+
+        for _ in range(2):
+            self.assertEqual(login('203.0.113.5').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(login('203.0.113.5').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # A spoofed leading entry does not escape the limit; another client is not affected
+        self.assertEqual(login('198.51.100.9, 203.0.113.5').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(login('198.51.100.9').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sliding_window_weights_previous_window(self):
+        """
+        Ensure hits from the previous window count in proportion to their overlap.
+        """
+        limiter = SlidingWindowLimiter('test', limit=4, window=100)
+        for _ in range(4):
+            limiter.hit('subject', now=1050)
+        self.assertEqual(limiter.retry_after('subject', now=1099), 1)
+        self.assertEqual(limiter.count('subject', now=1125), 3)
+        self.assertEqual(limiter.retry_after('subject', now=1125), 0)
+        self.assertEqual(limiter.count('subject', now=1200), 0)
+
+
+class NormalizeEthAddressMigrationTests(APITestCase):
+    migration = importlib.import_module('users.migrations.0004_normalize_eth_address')
+
+    def profile(self, username, eth_address):
+        user = CustomUser.objects.create_user(username=username, password='testpassword', user_type='buyer')
+        # Written as a plain string to get past the field's own normalization, like rows from before it
+        profile = UserProfile.objects.create(user=user)
+        UserProfile.objects.filter(pk=profile.pk).update(eth_address=Value(eth_address))
+        return profile
+
+    def test_addresses_are_lowercased(self):
+        """
+        Ensure mixed-case and blank addresses are normalized in place.
+        """
+        mixed = self.profile('mixed', ' 0xF39FD6E51AAD88F6F4CE6AB8827279CFFFB92266 ')
+        blank = self.profile('blank', '')
+        self.migration.normalize_addresses(apps, None)
+        mixed.refresh_from_db()
+        blank.refresh_from_db()
+        self.assertEqual(mixed.eth_address, '0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266')
+        self.assertIsNone(blank.eth_address)
+
+    def test_invalid_and_duplicate_addresses_stop_the_migration(self):
+        """
+        Ensure values that cannot be kept are reported rather than cleared.
+        """
+        first = self.profile('first', '0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266')
+        duplicate = self.profile('duplicate', '0xF39FD6E51AAD88F6F4CE6AB8827279CFFFB92266')
+        invalid = self.profile('invalid', 'not an address')
+        with self.assertRaises(RuntimeError) as raised:
+            self.migration.normalize_addresses(apps, None)
+        self.assertIn(f'profile {duplicate.pk} (user {duplicate.user_id})', str(raised.exception))
+        self.assertIn(f'duplicates profile {first.pk}', str(raised.exception))
+        self.assertIn("'not an address' is not an address", str(raised.exception))
+        invalid.refresh_from_db()
+        self.assertEqual(invalid.eth_address, 'not an address')
@@ -0,0 +1,89 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SlidingWindowLimiter:
+    """
+    Counts events per subject over the last `window` seconds in the Django
+    cache, so limits are per process with the local-memory cache and shared
+    between workers with Redis.
+
+    Uses the sliding window counter approximation: the current fixed window's
+    count plus the previous window's, weighted by how much of it still falls
+    inside the sliding window. That is two cache keys per subject, updated
+    with add/incr, instead of a log of timestamps.
+    """
+
+    def __init__(self, prefix, limit, window):
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+
+    def _keys(self, subject, now):
+        slot = int(now // self.window)
+        base = f'{self.prefix}:{hashlib.sha256(str(subject).encode()).hexdigest()}'
+        return f'{base}:{slot}', f'{base}:{slot - 1}', now / self.window - slot
+
+    def count(self, subject, now=None):
+        current, previous, elapsed = self._keys(subject, time.time() if now is None else now)
+        counts = cache.get_many([current, previous])
+        return counts.get(current, 0) + counts.get(previous, 0) * (1 - elapsed)
+
+    def retry_after(self, subject, now=None):
+        """0 while under the limit, else whole seconds until the current window rolls over."""
+        now = time.time() if now is None else now
+        if self.count(subject, now) < self.limit:
+            return 0
+        return max(1, math.ceil(self.window - now % self.window))
+
+    def hit(self, subject, now=None):
+        current, _, _ = self._keys(subject, time.time() if now is None else now)
+        # Kept for two windows: this one, then as the previous one
+        if not cache.add(current, 1, timeout=2 * self.window):
+            try:
+                cache.incr(current)
+            except ValueError:  # expired between add and incr
+                cache.set(current, 1, timeout=2 * self.window)
+
+    def reset(self, subject, now=None):
+        current, previous, _ = self._keys(subject, time.time() if now is None else now)
+        cache.delete_many([current, previous])
+
+
+def client_ip(request):
+    """
+    The client's address. Behind TRUSTED_PROXY_COUNT reverse proxies that each
+    append to X-Forwarded-For, it is the entry the outermost one appended;
+    anything before it was sent by the client and cannot be trusted.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if address.strip()]
+    if proxies and forwarded:
+        return forwarded[-min(proxies, len(forwarded))]
+    return request.META.get('REMOTE_ADDR')
+
+
+class LoginThrottle:
+    """Failed-login limits for one attempt, per username and per client IP."""
+
+    def __init__(self, request, username):
+        window = settings.LOGIN_FAILURE_WINDOW
+        self.username = username
+        self.limiters = [
+            (SlidingWindowLimiter('login-failures:user', settings.LOGIN_FAILURE_LIMIT_PER_USER, window), username),
+            (SlidingWindowLimiter('login-failures:ip', settings.LOGIN_FAILURE_LIMIT_PER_IP, window), client_ip(request)),
+        ]
+
+    def retry_after(self):
+        return max(limiter.retry_after(subject) for limiter, subject in self.limiters)
+
+    def failed(self):
+        for limiter, subject in self.limiters:
+            limiter.hit(subject)
+
+    def succeeded(self):
+        self.limiters[0][0].reset(self.username)
@@ -6,9 +6,11 @@ from rest_framework.authtoken.models import Token
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.contrib.auth import authenticate, get_user_model
 from rest_framework import permissions
 from .permissions import IsOwnerOrReadOnly
+from .throttling import LoginThrottle
+from django.contrib.auth import authenticate
+from rest_framework import serializers
 from rest_framework.decorators import action
 
 
@@ -30,25 +32,35 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
+def too_many_failures(retry_after):
+    return Response({'error': 'Too many failed login attempts. Try again later.'},
+                    status=429, headers={'Retry-After': str(retry_after)})
+
 class LoginView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     authentication_classes = []
     permission_classes = []
 
     def post(self, request, *args, **kwargs):
-        serializer = self.serializer_class(data=request.data,
-                                           context={'request': request})
-        if not serializer.is_valid():
-            # Check if the user exists
-            User = get_user_model()
-            try:
-                user = User.objects.get(username=request.data.get('username'))
-                # If user exists, password must be wrong
-                return Response({'error': 'Invalid password.'}, status=400)
-            except User.DoesNotExist:
-                return Response({'error': 'User not found.'}, status=400)
-        
-        user = serializer.validated_data['user']
+        username = request.data.get('username')
+        password = request.data.get('password')
+        if not username or not password:
+            return Response({'error': 'Must include "username" and "password".'}, status=400)
+
+        # Throttled before any password is hashed, so a burst of bad logins costs cache reads only
+        throttle = LoginThrottle(request, username)
+        retry_after = throttle.retry_after()
+        if retry_after:
+            return too_many_failures(retry_after)
+
+        # authenticate() hashes the password for unknown users too, so timing tells nothing apart
+        user = authenticate(request, username=username, password=password)
+        if user is None:
+            throttle.failed()
+            found = CustomUser.objects.filter(username=username).exists()
+            return Response({'error': 'Invalid password.' if found else 'User not found.'}, status=400)
+        throttle.succeeded()
+
         token, created = Token.objects.get_or_create(user=user)
         return Response({
             'token': token.key,
@@ -56,6 +68,30 @@ class LoginView(ObtainAuthToken):
             'email': user.email
         })
 
+class ThrottledObtainAuthToken(ObtainAuthToken):
+    """DRF's obtain_auth_token behind the same failed-login limits as LoginView."""
+
+    def post(self, request, *args, **kwargs):
+        throttle = LoginThrottle(request, request.data.get('username'))
+        retry_after = throttle.retry_after()
+        if retry_after:
+            return too_many_failures(retry_after)
+        try:
+            response = super().post(request, *args, **kwargs)
+        except serializers.ValidationError:
+            throttle.failed()
+            raise
+        throttle.succeeded()
+        return response
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        # Deleting the token also drops it from the token cache (users.signals)
+        Token.objects.filter(key=request.auth).delete()
+        return Response(status=204)
+
 class UserDetailView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, *args, **kwargs):